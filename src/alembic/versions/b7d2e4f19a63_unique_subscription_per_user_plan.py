@@ -0,0 +1,35 @@
+"""Enforce one subscription per user, magazine and plan
+
+Revision ID: b7d2e4f19a63
+Revises: 5c1e7a9b3d20
+Create Date: 2026-10-17 11:02:17.530942
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e4f19a63'
+down_revision: Union[str, None] = '5c1e7a9b3d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Duplicates slipped in before uniqueness was enforced; keep the oldest.
+    op.execute(
+        "DELETE FROM subscriptions WHERE id NOT IN ("
+        "SELECT min(id) FROM subscriptions GROUP BY user_id, magazine_id, plan_id)"
+    )
+    with op.batch_alter_table('subscriptions') as batch_op:
+        batch_op.create_unique_constraint(
+            'uq_subscriptions_user_magazine_plan', ['user_id', 'magazine_id', 'plan_id']
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('subscriptions') as batch_op:
+        batch_op.drop_constraint('uq_subscriptions_user_magazine_plan', type_='unique')
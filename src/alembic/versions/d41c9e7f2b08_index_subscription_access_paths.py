@@ -0,0 +1,50 @@
+"""Index subscription access paths
+
+Revision ID: d41c9e7f2b08
+Revises: b7d2e4f19a63
+Create Date: 2026-10-17 14:26:51.208334
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41c9e7f2b08'
+down_revision: Union[str, None] = 'b7d2e4f19a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (user_id, magazine_id, plan_id) is already served by the unique constraint.
+INDEXES = [
+    ('ix_plans_magazine_id', 'plans', ['magazine_id'], {}),
+    ('ix_subscriptions_magazine_id', 'subscriptions', ['magazine_id'], {}),
+    ('ix_subscriptions_plan_id', 'subscriptions', ['plan_id'], {}),
+    (
+        'ix_subscriptions_active_user_id',
+        'subscriptions',
+        ['user_id'],
+        {
+            'postgresql_where': sa.text('is_active = true'),
+            'sqlite_where': sa.text('is_active = 1'),
+        },
+    ),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY cannot run inside a transaction, but keeps the tables
+    # writable while the indexes build.
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.create_index(
+                name, table, columns, postgresql_concurrently=True, **options
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,39 @@
+"""Index due renewals
+
+Revision ID: e8a05b3c71d4
+Revises: d41c9e7f2b08
+Create Date: 2026-10-17 15:48:09.613127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a05b3c71d4'
+down_revision: Union[str, None] = 'd41c9e7f2b08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_subscriptions_active_renewal_date',
+            'subscriptions',
+            ['renewal_date'],
+            postgresql_concurrently=True,
+            postgresql_where=sa.text('is_active = true'),
+            sqlite_where=sa.text('is_active = 1'),
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_subscriptions_active_renewal_date',
+            table_name='subscriptions',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from app.core.config import settings
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after ``ttl`` seconds.
+
+    ``maxsize`` bounds the summed ``size`` of all entries, which is 1 per entry
+    unless the caller weighs them (e.g. in bytes). A ``maxsize`` or ``ttl`` of 0
+    disables caching entirely.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value, size = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self._size -= size
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(
+        self, key: Hashable, value: Any, ttl: Optional[float] = None, size: int = 1
+    ):
+        """Store ``value``; ``ttl`` may shorten (never extend) the cache TTL."""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if not self.enabled or ttl <= 0 or size > self.maxsize:
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self._size -= previous[2]
+            self._data[key] = (time.monotonic() + ttl, value, size)
+            self._size += size
+            while self._size > self.maxsize:
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self._size -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                self._size -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._data),
+            "size": self._size,
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# Authenticated principals keyed by username. The TTL bounds how long another
+# worker process can keep serving a stale entry after a deactivation.
+principal_cache = TTLCache(
+    maxsize=settings.principal_cache_size,
+    ttl=settings.principal_cache_ttl_seconds,
+)
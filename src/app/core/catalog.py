@@ -0,0 +1,106 @@
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.pagination import NEXT_CURSOR_HEADER, Page
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    """One serialized catalog page and its strong validator."""
+
+    body: bytes
+    etag: str
+    next_cursor: Optional[str]
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        # If-None-Match uses the weak comparison (RFC 9110, 13.1.2).
+        tags = (tag.strip() for tag in if_none_match.split(","))
+        return self.etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+    def response(self, request: Request) -> Response:
+        headers = {"ETag": self.etag}
+        if self.next_cursor is not None:
+            headers[NEXT_CURSOR_HEADER] = self.next_cursor
+        if self.matches(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+        return Response(self.body, media_type="application/json", headers=headers)
+
+
+class CatalogCache:
+    """Serialized magazine and plan pages, keyed by the request parameters.
+
+    Each resource carries a generation that writers bump after committing. A
+    page's key includes the generations of every resource it was built from,
+    so invalidating one makes its pages unreachable without scanning the
+    cache; they then age out of the LRU. The generation is read before the
+    page is loaded, so a page built from pre-write data is never stored under
+    a post-write key.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, resource: str):
+        with self._lock:
+            self._generations[resource] = self._generations.get(resource, 0) + 1
+
+    def _key(self, resources: Tuple[str, ...], params: tuple) -> tuple:
+        with self._lock:
+            generations = tuple(self._generations.get(r, 0) for r in resources)
+        return resources, generations, params
+
+    async def page(
+        self,
+        request: Request,
+        page: Page,
+        load: Callable[[], Awaitable[list]],
+        schema: Any,
+        resources: Tuple[str, ...],
+        *params: Any,
+    ) -> Response:
+        """Serve a page from the cache, or ``load`` and serialize it first.
+
+        A conditional request whose ETag still matches gets a 304 without the
+        database being touched.
+        """
+        key = self._key(resources, (page.after_id, page.limit, *params))
+        entry = self._entries.get(key)
+        if entry is None:
+            items, next_cursor = page.trim(await load())
+            # ``schema`` is the response model, which items may only resemble
+            # (e.g. summaries standing in for full magazines).
+            adapter = TypeAdapter(schema)
+            body = adapter.dump_json(
+                adapter.validate_python(items, from_attributes=True)
+            )
+            etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+            entry = CatalogEntry(body=body, etag=etag, next_cursor=next_cursor)
+            self._entries.set(key, entry, size=len(body))
+        return entry.response(request)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            generations = dict(self._generations)
+        return {**self._entries.stats(), "generations": generations}
+
+
+catalog_cache = CatalogCache(
+    maxsize=settings.catalog_cache_max_bytes,
+    ttl=settings.catalog_cache_ttl_seconds,
+)
@@ -0,0 +1,128 @@
+from typing import List, Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    # One engine per process, sized per worker: each worker holds up to
+    # db_pool_size + db_max_overflow connections.
+    database_url: str = "postgresql+psycopg2://app_user:app_password@db/app"
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+
+    # GET and HEAD requests read from this replica (same schema, streaming
+    # from the primary) while it lags by at most replica_max_lag_seconds. Lag
+    # is probed every replica_lag_check_seconds; unset reads the primary.
+    database_replica_url: Optional[str] = None
+    replica_max_lag_seconds: float = 5.0
+    replica_lag_check_seconds: float = 1.0
+
+    # List endpoints page by id; the next page's cursor is sent in the
+    # X-Next-Cursor response header.
+    page_size_default: int = 100
+    page_size_max: int = 500
+
+    # Bulk subscription imports are validated and staged this many rows at a
+    # time; at most import_max_errors rejected rows are itemised. A row longer
+    # than import_max_row_bytes refuses the whole import.
+    import_chunk_size: int = 10_000
+    import_max_errors: int = 1000
+    import_max_row_bytes: int = 64 * 1024
+    # Rows fetched and encoded per chunk of GET /subscriptions/export.
+    export_batch_size: int = 1000
+
+    # Run database work on an AsyncSession (asyncpg / aiosqlite) instead of a
+    # sync Session in the threadpool. The async URL is derived from
+    # DATABASE_URL unless given.
+    database_async: bool = False
+    database_async_url: Optional[str] = None
+
+    # Token signing. HS256 signs with secret_key; EdDSA/ES256 read PEM private
+    # keys, either one file or a rotating directory of <kid>.pem files.
+    # jwt_backend is "jose", "pyjwt" or "auto".
+    secret_key: str = "VladySecret"
+    jwt_algorithm: str = "HS256"
+    jwt_private_key_file: Optional[str] = None
+    jwt_keys_dir: Optional[str] = None
+    # A new key signs only after downstream JWKS caches had time to fetch it;
+    # the key it replaces keeps verifying for the overlap (default: refresh
+    # token lifetime).
+    jwt_key_activation_delay_seconds: float = 600.0
+    jwt_key_overlap_seconds: Optional[float] = None
+    jwks_max_age_seconds: int = 300
+    jwt_backend: str = "auto"
+    access_token_expire_minutes: int = 30
+    refresh_token_expire_days: int = 7
+
+    # Refresh tokens are single use. Revoked token IDs are mirrored into an
+    # in-memory Bloom filter that re-syncs from the database at this interval.
+    revocation_filter_capacity: int = 100_000
+    revocation_filter_error_rate: float = 0.001
+    revocation_sync_interval_seconds: float = 5.0
+
+    # Password hashing runs in a dedicated process pool so bcrypt never blocks
+    # the event loop. 0 workers hashes inline in the calling thread.
+    password_hash_workers: int = 2
+    password_hash_queue_depth: int = 32
+    # New passwords are hashed with the first scheme ("argon2" is argon2id and
+    # needs argon2-cffi). Hashes in other schemes or with other costs are
+    # rehashed on the next successful login.
+    password_hash_schemes: List[str] = ["bcrypt"]
+    bcrypt_rounds: int = 12
+    argon2_time_cost: int = 3
+    argon2_memory_cost: int = 65536  # KiB
+    argon2_parallelism: int = 4
+
+    # Login attempts are throttled per client IP and per username before any
+    # password hashing. rate_limit_backend is "memory" (per process) or
+    # "redis" (shared between workers, needs the redis package).
+    rate_limit_backend: str = "memory"
+    rate_limit_redis_url: str = "redis://localhost:6379/0"
+    login_ip_per_minute: float = 300.0
+    login_ip_burst: int = 100
+    login_account_per_minute: float = 10.0
+    login_account_burst: int = 10
+
+    # get_current_user caches principals in-process; deactivations are
+    # invalidated locally and reach other workers within the TTL.
+    principal_cache_size: int = 10_000
+    principal_cache_ttl_seconds: float = 30.0
+
+    # Byte budget for verified JWT claims; 0 verifies every token from scratch.
+    claims_cache_max_bytes: int = 16 * 1024 * 1024
+
+    # Encode route results with orjson, skipping response_model validation of
+    # crud output (needs the orjson package).
+    fast_json: bool = False
+
+    # Serialized GET /magazines/ and /plans/ pages. Writes invalidate them in
+    # this process; other workers pick changes up within the TTL.
+    catalog_cache_max_bytes: int = 32 * 1024 * 1024
+    catalog_cache_ttl_seconds: float = 60.0
+
+    # Renewal workers (python -m app.services.renewals) claim this many due
+    # subscriptions per transaction and poll this often once caught up.
+    renewal_batch_size: int = 500
+    renewal_poll_seconds: float = 30.0
+
+    # Price changes to a magazine or plan reprice its subscriptions in id
+    # ranges of this size, inline or after the response.
+    reprice_batch_size: int = 1000
+    reprice_in_background: bool = False
+
+    # Requests with an X-Profile token signed by profile_secret (python -m
+    # app.core.profiling mints one), and a profile_sample_rate fraction of all
+    # requests, are sampled every profile_interval_ms into speedscope files in
+    # profile_dir. With neither set the middleware is not installed.
+    profile_secret: str = ""
+    profile_sample_rate: float = 0.0
+    profile_interval_ms: float = 2.0
+    profile_dir: str = "profiles"
+
+
+settings = Settings()
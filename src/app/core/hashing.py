@@ -0,0 +1,170 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+
+def build_context(
+    schemes: Sequence[str],
+    bcrypt_rounds: int,
+    argon2_time_cost: int,
+    argon2_memory_cost: int,
+    argon2_parallelism: int,
+) -> CryptContext:
+    """New hashes use the first scheme; hashes in any other scheme, or with
+    different cost parameters, are reported by ``needs_update``."""
+    return CryptContext(
+        schemes=list(schemes),
+        deprecated="auto",
+        bcrypt__rounds=bcrypt_rounds,
+        argon2__type="ID",
+        argon2__rounds=argon2_time_cost,
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__parallelism=argon2_parallelism,
+    )
+
+
+# Built at import time in the web process and in every pool worker alike.
+pwd_context = build_context(
+    settings.password_hash_schemes,
+    bcrypt_rounds=settings.bcrypt_rounds,
+    argon2_time_cost=settings.argon2_time_cost,
+    argon2_memory_cost=settings.argon2_memory_cost,
+    argon2_parallelism=settings.argon2_parallelism,
+)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _verify_and_update(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+class PasswordHasher:
+    """Runs password hashing in a bounded process pool.
+
+    At most ``workers + queue_depth`` operations are admitted at once; anything
+    beyond that is rejected with a 503 instead of queueing without bound.
+    """
+
+    def __init__(self, workers: int, queue_depth: int):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self._slots = threading.BoundedSemaphore(max(workers, 1) + queue_depth)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return self._executor
+
+    def _acquire(self):
+        if not self._slots.acquire(blocking=False):
+            with self._counter_lock:
+                self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Password hashing capacity exhausted, retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        with self._counter_lock:
+            self.in_flight += 1
+
+    def _release(self, *_):
+        with self._counter_lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    async def _submit(self, fn, *args):
+        self._acquire()
+        if self.workers <= 0:
+            try:
+                return fn(*args)
+            finally:
+                self._release()
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future, loop=loop)
+
+    def _submit_sync(self, fn, *args):
+        self._acquire()
+        if self.workers <= 0:
+            try:
+                return fn(*args)
+            finally:
+                self._release()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future.result()
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(_verify, plain_password, hashed_password)
+
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """Verify, and also return a fresh hash if the stored one is outdated."""
+        return await self._submit(_verify_and_update, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password)
+
+    def verify_sync(self, plain_password: str, hashed_password: str) -> bool:
+        """Blocking variant for code already running in a worker thread."""
+        return self._submit_sync(_verify, plain_password, hashed_password)
+
+    def hash_sync(self, password: str) -> str:
+        """Blocking variant for code already running in a worker thread."""
+        return self._submit_sync(_hash, password)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    queue_depth=settings.password_hash_queue_depth,
+)
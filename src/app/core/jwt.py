@@ -1,58 +1,293 @@
-from fastapi.security import OAuth2PasswordBearer
-from fastapi import Depends, HTTPException, status
-from passlib.context import CryptContext
-from jose import JWTError, jwt
-from datetime import datetime, timedelta
-from typing import Optional
-from sqlalchemy.orm import Session
-
-from app.dependencies import get_db
+from jose import JWTError, jwk
+from jose import jwt as jose_jwt
+from datetime import datetime, timedelta, timezone
+from types import MappingProxyType
+from typing import Mapping, Optional
+import base64
+import hashlib
+import importlib
+import json
+import sys
+import time
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.keys import ASYMMETRIC_ALGORITHMS, KeyRing
 from app.schemas import TokenData
-from app import models
 
-SECRET_KEY = "VladySecret"
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-REFRESH_TOKEN_EXPIRE_DAYS = 7
+REFRESH_TOKEN_TYPE = "refresh"
+
+# Verified claims keyed by a digest of the token, weighed in bytes. Entries
+# expire at the token's own ``exp`` so an expired token is never served.
+claims_cache = TTLCache(maxsize=settings.claims_cache_max_bytes, ttl=float("inf"))
+
+
+class JoseBackend:
+    """python-jose; always available but has no EdDSA support."""
+
+    name = "jose"
+    algorithms = {"HS256", "ES256"}
+
+    def load_signing_key(self, algorithm: str, material):
+        return jwk.construct(material, algorithm)
+
+    def load_verification_key(self, algorithm: str, material):
+        key = jwk.construct(material, algorithm)
+        if algorithm in ASYMMETRIC_ALGORITHMS and not key.is_public():
+            key = key.public_key()
+        return key
+
+    def encode(self, claims: dict, key, algorithm: str, headers=None) -> str:
+        return jose_jwt.encode(claims, key, algorithm=algorithm, headers=headers)
+
+    def decode(self, token: str, key, algorithm: str) -> dict:
+        return jose_jwt.decode(token, key, algorithms=[algorithm])
+
+
+class PyJWTBackend:
+    """PyJWT with ``cryptography`` keys; needed for EdDSA."""
+
+    name = "pyjwt"
+    algorithms = {"HS256", "ES256", "EdDSA"}
+
+    def __init__(self):
+        self._jwt = importlib.import_module("jwt")
+
+    def _load_private_key(self, material):
+        from cryptography.hazmat.primitives import serialization
+
+        return serialization.load_pem_private_key(_as_bytes(material), password=None)
+
+    def load_signing_key(self, algorithm: str, material):
+        if algorithm not in ASYMMETRIC_ALGORITHMS:
+            return _as_bytes(material)
+        return self._load_private_key(material)
+
+    def load_verification_key(self, algorithm: str, material):
+        if algorithm not in ASYMMETRIC_ALGORITHMS:
+            return _as_bytes(material)
+        from cryptography.hazmat.primitives import serialization
+
+        material = _as_bytes(material)
+        if b"PRIVATE KEY" in material:
+            return self._load_private_key(material).public_key()
+        return serialization.load_pem_public_key(material)
+
+    def encode(self, claims: dict, key, algorithm: str, headers=None) -> str:
+        return self._jwt.encode(claims, key, algorithm=algorithm, headers=headers)
+
+    def decode(self, token: str, key, algorithm: str) -> dict:
+        try:
+            return self._jwt.decode(token, key, algorithms=[algorithm])
+        except self._jwt.PyJWTError as e:
+            raise JWTError(str(e))
+
+
+BACKENDS = {"jose": JoseBackend, "pyjwt": PyJWTBackend}
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+def _as_bytes(material) -> bytes:
+    return material.encode() if isinstance(material, str) else material
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
 
+def get_backend(name: str, algorithm: str):
+    """Instantiate a backend by name; ``auto`` picks one supporting ``algorithm``."""
+    if name != "auto":
+        return BACKENDS[name]()
+    for candidate in BACKENDS.values():
+        if algorithm not in candidate.algorithms:
+            continue
+        try:
+            return candidate()
+        except ImportError:
+            continue
+    raise ValueError(f"No installed JWT backend supports {algorithm}")
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+
+def _unverified_kid(token: str) -> Optional[str]:
+    try:
+        segment = token.split(".", 1)[0]
+        header = json.loads(
+            base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+        )
+    except ValueError:
+        raise JWTError("Invalid token header")
+    if not isinstance(header, dict):
+        raise JWTError("Invalid token header")
+    return header.get("kid")
+
+
+def _claims_size(key: bytes, claims: dict) -> int:
+    size = sys.getsizeof(key) + sys.getsizeof(claims)
+    for name, value in claims.items():
+        size += sys.getsizeof(name) + sys.getsizeof(value)
+    return size
+
+
+class TokenService:
+    """Issues and verifies JWTs with key material prepared once up front.
+
+    Claims carry UTC ``iat``/``exp`` as integer timestamps. Asymmetric tokens
+    name their signing key in the ``kid`` header; the key ring is re-read every
+    ``key_refresh_interval`` seconds to pick up rotations. When ``cache`` is
+    given, verified claims are kept in it until the token expires.
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        signing_material=None,
+        backend=None,
+        access_token_ttl: timedelta = timedelta(minutes=30),
+        refresh_token_ttl: timedelta = timedelta(days=7),
+        cache: Optional[TTLCache] = None,
+        key_ring: Optional[KeyRing] = None,
+        key_refresh_interval: float = 60.0,
+    ):
+        self.algorithm = algorithm
+        self.backend = backend or get_backend("auto", algorithm)
+        if algorithm not in self.backend.algorithms:
+            raise ValueError(
+                f"JWT backend {self.backend.name!r} does not support {algorithm}"
+            )
+        if key_ring is None:
+            if algorithm in ASYMMETRIC_ALGORITHMS:
+                key_ring = KeyRing.from_pem(algorithm, signing_material)
+            else:
+                key_ring = KeyRing.from_secret(algorithm, signing_material)
+        self.key_ring = key_ring
+        self.key_refresh_interval = key_refresh_interval
+        self.access_token_ttl = access_token_ttl
+        self.refresh_token_ttl = refresh_token_ttl
+        self.cache = cache
+        self._prepared = {}
+        self._prepare_keys()
+
+    @classmethod
+    def from_settings(cls, settings, cache: Optional[TTLCache] = None):
+        algorithm = settings.jwt_algorithm
+        refresh_token_ttl = timedelta(days=settings.refresh_token_expire_days)
+        if settings.jwt_keys_dir:
+            overlap = settings.jwt_key_overlap_seconds
+            if overlap is None:
+                overlap = refresh_token_ttl.total_seconds()
+            key_ring = KeyRing.from_directory(
+                settings.jwt_keys_dir,
+                algorithm,
+                overlap=overlap,
+                activation_delay=settings.jwt_key_activation_delay_seconds,
+            )
+        elif algorithm in ASYMMETRIC_ALGORITHMS:
+            with open(settings.jwt_private_key_file, "rb") as f:
+                key_ring = KeyRing.from_pem(algorithm, f.read())
+        else:
+            key_ring = KeyRing.from_secret(algorithm, settings.secret_key)
+        return cls(
+            algorithm,
+            backend=get_backend(settings.jwt_backend, algorithm),
+            access_token_ttl=timedelta(minutes=settings.access_token_expire_minutes),
+            refresh_token_ttl=refresh_token_ttl,
+            cache=cache,
+            key_ring=key_ring,
+        )
+
+    def _prepare_keys(self):
+        now = time.time()
+        prepared = {}
+        for key in self.key_ring.verification_keys(now):
+            signing, verification = self._prepared.get(key.kid) or (
+                self.backend.load_signing_key(self.algorithm, key.material),
+                self.backend.load_verification_key(self.algorithm, key.material),
+            )
+            prepared[key.kid] = (signing, verification)
+        self._prepared = prepared
+        self._signing_kid = self.key_ring.active_key(now).kid
+        self._jwks = self.key_ring.jwks(now)
+        self._refresh_at = now + self.key_refresh_interval
+
+    def refresh_keys(self):
+        """Re-read the key ring and recompute the active signing key."""
+        self.key_ring.reload()
+        self._prepare_keys()
+
+    def _check_keys(self):
+        if time.time() >= self._refresh_at:
+            self.refresh_keys()
+
+    def jwks(self) -> dict:
+        self._check_keys()
+        return self._jwks
+
+    def issue(self, data: dict, ttl: timedelta) -> str:
+        self._check_keys()
+        now = datetime.now(timezone.utc)
+        claims = dict(data)
+        claims["iat"] = int(now.timestamp())
+        claims["exp"] = int((now + ttl).timestamp())
+        kid = self._signing_kid
+        headers = {"kid": kid} if kid else None
+        signing_key = self._prepared[kid][0]
+        return self.backend.encode(claims, signing_key, self.algorithm, headers)
+
+    def _verify(self, token: str) -> dict:
+        self._check_keys()
+        prepared = self._prepared.get(_unverified_kid(token))
+        if prepared is None:
+            raise JWTError("Unknown signing key")
+        return self.backend.decode(token, prepared[1], self.algorithm)
+
+    def create_access_token(
+        self, data: dict, expires_delta: Optional[timedelta] = None
+    ) -> str:
+        return self.issue(data, expires_delta or self.access_token_ttl)
+
+    def create_refresh_token(
+        self, data: dict, expires_delta: Optional[timedelta] = None
+    ) -> str:
+        return self.issue(
+            {**data, "typ": REFRESH_TOKEN_TYPE}, expires_delta or self.refresh_token_ttl
+        )
+
+    def decode(self, token: str) -> Mapping:
+        """Verify ``token`` and return its claims, raising ``JWTError`` if invalid."""
+        if self.cache is None:
+            return MappingProxyType(self._verify(token))
+        key = hashlib.sha256(token.encode()).digest()
+        claims = self.cache.get(key)
+        if claims is not None:
+            return claims
+        payload = self._verify(token)
+        claims = MappingProxyType(payload)
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            self.cache.set(
+                key, claims, ttl=exp - time.time(), size=_claims_size(key, payload)
+            )
+        return claims
+
+
+token_service = TokenService.from_settings(settings, cache=claims_cache)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.now() + expires_delta
-    else:
-        expire = datetime.now() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    return token_service.create_access_token(data, expires_delta)
 
 
 def create_refresh_token(data: dict):
-    to_encode = data.copy()
-    expire = datetime.now() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    return token_service.create_refresh_token(data)
+
+
+def decode_token(token: str) -> Mapping:
+    return token_service.decode(token)
 
 
 def decode_access_token(token: str):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise JWTError
         token_data = TokenData(username=username)
     except JWTError:
         return None
-    return token_data
\ No newline at end of file
+    return token_data
@@ -0,0 +1,206 @@
+"""Signing keys with key IDs, JWKS export and rotation.
+
+Asymmetric keys live as ``<kid>.pem`` files in a directory shared by all
+workers. Rotation is done by adding a new file: it is published in the JWKS
+straight away, starts signing once ``activation_delay`` has passed (so cached
+JWKS documents downstream already know it), and its predecessor keeps
+verifying for ``overlap`` seconds after that.
+
+Generate a key with::
+
+    python -m app.core.keys generate --dir keys --algorithm EdDSA
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+ASYMMETRIC_ALGORITHMS = {"EdDSA", "ES256"}
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _load_private_key(material: bytes):
+    from cryptography.hazmat.primitives import serialization
+
+    return serialization.load_pem_private_key(material, password=None)
+
+
+def public_jwk(algorithm: str, material: bytes) -> dict:
+    """Public JWK members (RFC 7517) for a PEM private key."""
+    from cryptography.hazmat.primitives import serialization
+
+    public_key = _load_private_key(material).public_key()
+    if algorithm == "EdDSA":
+        raw = public_key.public_bytes(
+            serialization.Encoding.Raw, serialization.PublicFormat.Raw
+        )
+        return {"kty": "OKP", "crv": "Ed25519", "x": _b64url(raw)}
+    numbers = public_key.public_numbers()
+    return {
+        "kty": "EC",
+        "crv": "P-256",
+        "x": _b64url(numbers.x.to_bytes(32, "big")),
+        "y": _b64url(numbers.y.to_bytes(32, "big")),
+    }
+
+
+def thumbprint(jwk: dict) -> str:
+    """RFC 7638 thumbprint, used as the key ID."""
+    required = {"OKP": ("crv", "kty", "x"), "EC": ("crv", "kty", "x", "y")}
+    members = {name: jwk[name] for name in required[jwk["kty"]]}
+    canonical = json.dumps(members, separators=(",", ":"), sort_keys=True)
+    return _b64url(hashlib.sha256(canonical.encode()).digest())
+
+
+@dataclass
+class Key:
+    kid: Optional[str]
+    algorithm: str
+    material: bytes
+    activates_at: float = 0.0
+    retires_at: Optional[float] = None
+
+    @property
+    def asymmetric(self) -> bool:
+        return self.algorithm in ASYMMETRIC_ALGORITHMS
+
+    def public_jwk(self) -> dict:
+        jwk = public_jwk(self.algorithm, self.material)
+        jwk.update({"kid": self.kid, "alg": self.algorithm, "use": "sig"})
+        return jwk
+
+
+class KeyRing:
+    def __init__(self, keys: List[Key], directory: Optional[str] = None, **options):
+        if not keys:
+            raise ValueError("A key ring needs at least one key")
+        self.keys = keys
+        self.directory = directory
+        self.options = options
+
+    @classmethod
+    def from_secret(cls, algorithm: str, secret) -> "KeyRing":
+        if isinstance(secret, str):
+            secret = secret.encode()
+        return cls([Key(kid=None, algorithm=algorithm, material=secret)])
+
+    @classmethod
+    def from_pem(cls, algorithm: str, material: bytes) -> "KeyRing":
+        kid = thumbprint(public_jwk(algorithm, material))
+        return cls([Key(kid=kid, algorithm=algorithm, material=material)])
+
+    @classmethod
+    def from_directory(
+        cls, directory: str, algorithm: str, overlap: float, activation_delay: float
+    ) -> "KeyRing":
+        return cls(
+            cls._read_directory(directory, algorithm, overlap, activation_delay),
+            directory=directory,
+            algorithm=algorithm,
+            overlap=overlap,
+            activation_delay=activation_delay,
+        )
+
+    @staticmethod
+    def _read_directory(directory, algorithm, overlap, activation_delay) -> List[Key]:
+        entries = []
+        for name in os.listdir(directory):
+            if not name.endswith(".pem"):
+                continue
+            path = os.path.join(directory, name)
+            with open(path, "rb") as f:
+                material = f.read()
+            entries.append((os.path.getmtime(path), material))
+        entries.sort(key=lambda entry: entry[0])
+
+        keys = []
+        for index, (created_at, material) in enumerate(entries):
+            kid = thumbprint(public_jwk(algorithm, material))
+            # The very first key signs immediately; later ones wait until
+            # downstream JWKS caches have had a chance to pick them up.
+            activates_at = created_at if index == 0 else created_at + activation_delay
+            keys.append(Key(kid, algorithm, material, activates_at=activates_at))
+        for current, successor in zip(keys, keys[1:]):
+            current.retires_at = successor.activates_at + overlap
+        return keys
+
+    def reload(self):
+        """Re-read the key directory, if this ring was loaded from one."""
+        if self.directory is not None:
+            keys = self._read_directory(self.directory, **self.options)
+            if keys:
+                self.keys = keys
+
+    def active_key(self, now: Optional[float] = None) -> Key:
+        now = time.time() if now is None else now
+        active = [key for key in self.keys if key.activates_at <= now]
+        return active[-1] if active else self.keys[0]
+
+    def verification_keys(self, now: Optional[float] = None) -> List[Key]:
+        now = time.time() if now is None else now
+        return [
+            key for key in self.keys if key.retires_at is None or key.retires_at > now
+        ]
+
+    def jwks(self, now: Optional[float] = None) -> dict:
+        """Public keys that verify tokens right now. Secrets are never published."""
+        return {
+            "keys": [
+                key.public_jwk()
+                for key in self.verification_keys(now)
+                if key.asymmetric
+            ]
+        }
+
+
+def generate_private_key(algorithm: str) -> bytes:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+
+    if algorithm == "EdDSA":
+        key = ed25519.Ed25519PrivateKey.generate()
+    elif algorithm == "ES256":
+        key = ec.generate_private_key(ec.SECP256R1())
+    else:
+        raise ValueError(f"{algorithm} is not an asymmetric algorithm")
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+
+
+def write_key(directory: str, algorithm: str) -> str:
+    """Generate a key into ``directory`` and return its key ID."""
+    material = generate_private_key(algorithm)
+    kid = thumbprint(public_jwk(algorithm, material))
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{kid}.pem")
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(material)
+    return kid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage JWT signing keys")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    generate = subparsers.add_parser("generate", help="add a new signing key")
+    generate.add_argument("--dir", required=True)
+    generate.add_argument(
+        "--algorithm", choices=sorted(ASYMMETRIC_ALGORITHMS), required=True
+    )
+    args = parser.parse_args()
+    print(write_key(args.dir, args.algorithm))
+
+
+if __name__ == "__main__":
+    main()
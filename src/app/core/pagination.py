@@ -0,0 +1,62 @@
+import base64
+import json
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Query, Response
+
+from app.core.config import settings
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: int) -> str:
+    payload = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        payload = json.loads(
+            base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        )
+        last_id = payload["id"]
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return last_id
+
+
+@dataclass
+class Page:
+    """Keyset page request: rows with ``id > after_id``, at most ``limit``."""
+
+    after_id: Optional[int]
+    limit: int
+
+    @property
+    def fetch(self) -> int:
+        # One extra row tells whether another page follows.
+        return self.limit + 1
+
+    def trim(self, items: list) -> Tuple[list, Optional[str]]:
+        """Drop the lookahead row; return the page and the next cursor, if any."""
+        if len(items) > self.limit:
+            items = items[: self.limit]
+            return items, encode_cursor(items[-1].id)
+        return items, None
+
+    def finish(self, response: Response, items: list) -> list:
+        """Trim the lookahead row and advertise the next cursor, if any."""
+        items, next_cursor = self.trim(items)
+        if next_cursor is not None:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return items
+
+
+def page_params(
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.page_size_default, ge=1, le=settings.page_size_max),
+) -> Page:
+    return Page(after_id=decode_cursor(cursor) if cursor else None, limit=limit)
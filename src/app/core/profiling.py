@@ -0,0 +1,199 @@
+"""On-demand sampling profiles of single requests, saved for speedscope.
+
+``ProfilingMiddleware`` is plain ASGI. A request is profiled when it carries a
+valid ``X-Profile`` token (see ``profile_token``) or falls in the
+``sample_rate`` fraction of requests. Its profile is written to
+``<directory>/<id>.speedscope.json`` and the id is sent back in the
+``X-Profile`` response header; open the file at https://www.speedscope.app.
+
+The sampler is a thread reading every thread's stack each ``interval``
+seconds, so handler code on the event loop and crud calls in the threadpool
+both show up, as one speedscope profile per thread. Requests running at the
+same time show up too. At most one request is profiled at a time.
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+PROFILE_HEADER = "X-Profile"
+
+# A thread whose innermost Python frame is in one of these is waiting for
+# work (the event loop in select, a threadpool worker on its queue).
+_IDLE_MODULES = {"threading.py", "selectors.py", "queue.py"}
+
+
+def _sign(secret: str, expires: str) -> str:
+    message = f"profile:{expires}".encode()
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def profile_token(secret: str, ttl: float = 300.0) -> str:
+    """An ``X-Profile`` header value, valid for ``ttl`` seconds."""
+    expires = str(int(time.time() + ttl))
+    return f"{expires}.{_sign(secret, expires)}"
+
+
+def verify_token(secret: str, token: str) -> bool:
+    expires, _, signature = token.partition(".")
+    if not secret or not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _sign(secret, expires))
+
+
+class Sampler(threading.Thread):
+    """Samples the stacks of all other threads until ``stop``, then writes
+    them to ``path`` in the speedscope file format and calls ``done``."""
+
+    def __init__(self, interval: float, path: str, name: str, done: Callable):
+        super().__init__(name="profiler", daemon=True)
+        self.interval = interval
+        self.path = path
+        self.profile_name = name
+        self.done = done
+        self._stopped = threading.Event()
+        self._frames: List[dict] = []
+        self._frame_index: Dict[tuple, int] = {}
+        # thread ident -> (stacks as frame indexes, root first; weights in ms)
+        self._samples: Dict[int, Tuple[List[List[int]], List[float]]] = {}
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        try:
+            me = threading.get_ident()
+            last = time.perf_counter()
+            while not self._stopped.wait(self.interval):
+                now = time.perf_counter()
+                weight, last = (now - last) * 1000, now
+                for ident, frame in sys._current_frames().items():
+                    if ident != me:
+                        self._sample(ident, frame, weight)
+            self._write()
+        finally:
+            self.done()
+
+    def _sample(self, ident: int, frame, weight: float):
+        if os.path.basename(frame.f_code.co_filename) in _IDLE_MODULES:
+            return
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            key = (code.co_name, code.co_filename, code.co_firstlineno)
+            index = self._frame_index.get(key)
+            if index is None:
+                index = self._frame_index[key] = len(self._frames)
+                self._frames.append({"name": key[0], "file": key[1], "line": key[2]})
+            stack.append(index)
+            frame = frame.f_back
+        stack.reverse()
+        stacks, weights = self._samples.setdefault(ident, ([], []))
+        stacks.append(stack)
+        weights.append(weight)
+
+    def _write(self):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        profile = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.profile_name,
+            "exporter": __name__,
+            "activeProfileIndex": 0,
+            "shared": {"frames": self._frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": names.get(ident, str(ident)),
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": stacks,
+                    "weights": weights,
+                }
+                for ident, (stacks, weights) in self._samples.items()
+            ],
+        }
+        partial = f"{self.path}.partial"
+        with open(partial, "w") as f:
+            json.dump(profile, f)
+        os.replace(partial, self.path)
+
+
+class ProfilingMiddleware:
+    """Profiles requests with a valid ``X-Profile`` token, and a random
+    ``sample_rate`` fraction of all others; other requests pass straight
+    through."""
+
+    def __init__(
+        self,
+        app,
+        secret: str = "",
+        sample_rate: float = 0.0,
+        interval: float = 0.002,
+        directory: str = "profiles",
+    ):
+        self.app = app
+        self.secret = secret
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._busy = threading.Lock()
+
+    def _wanted(self, scope) -> bool:
+        token = self._header(scope)
+        if token is not None and verify_token(self.secret, token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    @staticmethod
+    def _header(scope) -> Optional[str]:
+        name = PROFILE_HEADER.lower().encode()
+        for key, value in scope["headers"]:
+            if key == name:
+                return value.decode("latin-1")
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not self._wanted(scope)
+            or not self._busy.acquire(blocking=False)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        header = (PROFILE_HEADER.lower().encode(), profile_id.encode())
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                headers = [*message.get("headers", []), header]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        sampler = Sampler(
+            self.interval,
+            os.path.join(self.directory, f"{profile_id}.speedscope.json"),
+            f"{scope['method']} {scope['path']}",
+            done=self._busy.release,
+        )
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            # The sampler writes the file on its own thread, off the loop.
+            sampler.stop()
+
+
+if __name__ == "__main__":
+    from app.core.config import settings
+
+    print(profile_token(settings.profile_secret))
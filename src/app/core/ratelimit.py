@@ -0,0 +1,122 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+
+class MemoryBackend:
+    """Per-process token buckets, bounded to the ``max_keys`` most recent keys."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: int) -> Tuple[bool, float]:
+        """Take one token; returns ``(allowed, retry_after_seconds)``."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+
+class RedisBackend:
+    """Token buckets shared by every worker through Redis.
+
+    Requires the optional ``redis`` package. Buckets are updated atomically by
+    a Lua script using the Redis clock, so workers need not agree on time.
+    """
+
+    SCRIPT = """
+    local now = redis.call('TIME')
+    now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or burst
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + (now - updated) * rate)
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        import redis
+
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def take(self, key: str, rate: float, burst: int) -> Tuple[bool, float]:
+        allowed, tokens = self._script(keys=[self.prefix + key], args=[rate, burst])
+        if allowed:
+            return True, 0.0
+        return False, (1 - float(tokens)) / rate
+
+
+class RateLimiter:
+    """Token-bucket limiter with one bucket per (scope, key).
+
+    ``limits`` maps a scope name to ``(per_minute, burst)``; a ``per_minute`` of
+    0 turns that scope off. Rejections are counted per scope.
+    """
+
+    def __init__(self, backend, limits: Dict[str, Tuple[float, int]]):
+        self.backend = backend
+        self.limits = limits
+        self.allowed = 0
+        self.rejected = {scope: 0 for scope in limits}
+
+    def check(self, **keys: Optional[str]):
+        """Raise 429 if any scope in ``keys`` is over its limit."""
+        for scope, key in keys.items():
+            per_minute, burst = self.limits[scope]
+            if key is None or per_minute <= 0:
+                continue
+            allowed, retry_after = self.backend.take(
+                f"{scope}:{key}", per_minute / 60, burst
+            )
+            if not allowed:
+                self.rejected[scope] += 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many login attempts, retry later",
+                    headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+                )
+        self.allowed += 1
+
+    def stats(self) -> dict:
+        return {"allowed": self.allowed, "rejected": dict(self.rejected)}
+
+
+def get_backend(name: str):
+    if name == "redis":
+        return RedisBackend(settings.rate_limit_redis_url)
+    return MemoryBackend()
+
+
+login_limiter = RateLimiter(
+    get_backend(settings.rate_limit_backend),
+    limits={
+        "ip": (settings.login_ip_per_minute, settings.login_ip_burst),
+        "account": (settings.login_account_per_minute, settings.login_account_burst),
+    },
+)
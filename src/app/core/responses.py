@@ -0,0 +1,167 @@
+"""Opt-in fast JSON responses (``settings.fast_json``).
+
+FastAPI validates whatever an endpoint returns against its ``response_model``
+before serializing it, reading every ORM attribute through Pydantic. Crud
+output is trusted, so routes built by ``FastJSONRoute`` skip that step: each
+object's loaded state is read directly, following the response model's
+fields, and encoded to bytes by orjson. ``response_model`` still describes
+the response in the OpenAPI schema.
+
+Values are not validated, but ``float`` and ``Decimal`` fields are coerced as
+validation would: a price stored as the integer 5 is still sent as ``5.0``.
+"""
+
+import functools
+import inspect
+import types
+import typing
+from collections.abc import Mapping
+from decimal import Decimal
+from typing import Any, Callable
+
+from fastapi import Response
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+from app.core.config import settings
+
+_LISTS = (list, tuple, set, frozenset, typing.Sequence, typing.Iterable)
+
+
+@functools.lru_cache(maxsize=None)
+def encoder(annotation) -> Callable[[Any], Any]:
+    """A function turning trusted objects shaped like ``annotation`` into
+    plain values orjson can encode, without validating them."""
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union or origin is types.UnionType:
+        options = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        if len(options) == 1:
+            inner = encoder(options[0])
+            return lambda value: None if value is None else inner(value)
+        return _leaf
+    if origin in _LISTS or annotation in _LISTS:
+        args = typing.get_args(annotation)
+        item = encoder(args[0]) if args else _leaf
+        return lambda values: [item(value) for value in values]
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _model_encoder(annotation)
+    if annotation is float:
+        return float
+    if annotation is Decimal:
+        return _decimal
+    return _leaf
+
+
+def _leaf(value):
+    return value
+
+
+def _decimal(value) -> str:
+    # Pydantic sends Decimal as a string, so no precision is lost.
+    return str(value if isinstance(value, Decimal) else Decimal(str(value)))
+
+
+def _model_encoder(model) -> Callable[[Any], dict]:
+    fields = []
+    for name, field in model.model_fields.items():
+        default = (
+            None
+            if field.is_required()
+            else field.get_default(call_default_factory=True)
+        )
+        fields.append((name, field.is_required(), default, encoder(field.annotation)))
+
+    def encode(obj) -> dict:
+        if isinstance(obj, Mapping):
+            state, fallback = obj, None
+        else:
+            # Loaded ORM columns and Pydantic fields both live in __dict__;
+            # anything else (an unloaded attribute) goes through getattr.
+            state, fallback = getattr(obj, "__dict__", {}), obj
+        result = {}
+        for name, required, default, encode_field in fields:
+            if name in state:
+                value = state[name]
+            elif fallback is None:
+                if required:
+                    raise KeyError(name)
+                value = default
+            else:
+                value = (
+                    getattr(fallback, name)
+                    if required
+                    else getattr(fallback, name, default)
+                )
+            result[name] = encode_field(value)
+        return result
+
+    return encode
+
+
+def _dumps(content) -> bytes:
+    import orjson
+
+    return orjson.dumps(
+        content, default=jsonable_encoder, option=orjson.OPT_NON_STR_KEYS
+    )
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return _dumps(content)
+
+
+def fast_json_endpoint(endpoint, response_model, status_code=None):
+    """Wrap ``endpoint`` so its result is encoded without validation.
+
+    Responses the endpoint builds itself pass through untouched. Headers and
+    a status code set on an injected ``Response`` parameter are carried over,
+    as FastAPI would.
+    """
+    encode = encoder(response_model)
+
+    def respond(result, kwargs):
+        if isinstance(result, Response):
+            return result
+        response = FastJSONResponse(encode(result), status_code=status_code or 200)
+        for value in kwargs.values():
+            if isinstance(value, Response):
+                response.raw_headers.extend(value.raw_headers)
+                if value.status_code:
+                    response.status_code = value.status_code
+        return response
+
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            return respond(await endpoint(*args, **kwargs), kwargs)
+
+    else:
+
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            return respond(endpoint(*args, **kwargs), kwargs)
+
+    return wrapper
+
+
+class FastJSONRoute(APIRoute):
+    """Route class for routers whose endpoints return trusted crud output.
+
+    With ``settings.fast_json`` off this is a plain ``APIRoute``.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        response_model = kwargs.get("response_model")
+        if settings.fast_json and not isinstance(
+            response_model, (DefaultPlaceholder, type(None))
+        ):
+            endpoint = fast_json_endpoint(
+                endpoint, response_model, kwargs.get("status_code")
+            )
+        super().__init__(path, endpoint, **kwargs)
@@ -0,0 +1,118 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Optional, Tuple
+
+from app.core.config import settings
+
+# Revocations committed by other workers may carry a slightly older timestamp
+# than the newest one already seen, so each incremental sync re-reads a margin.
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        if item in self:
+            return
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+# (jti, revoked_at) pairs revoked at or after ``since``; everything when None.
+RevocationLoader = Callable[[Optional[datetime]], Iterable[Tuple[str, datetime]]]
+
+
+class RevocationFilter:
+    """In-memory set of revoked refresh token IDs, synced incrementally.
+
+    A negative answer is definitive for everything synced so far, so the hot
+    path needs no query. A positive answer may be a false positive and must be
+    confirmed against the database.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, sync_interval: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self._filter = BloomFilter(capacity, error_rate)
+        self._lock = threading.Lock()
+        self._watermark: Optional[datetime] = None
+        self._next_sync = 0.0
+        self.syncs = 0
+        self.rebuilds = 0
+        self.positives = 0
+
+    def add(self, jti: str):
+        with self._lock:
+            self._filter.add(jti)
+
+    def might_be_revoked(self, jti: str) -> bool:
+        if jti in self._filter:
+            self.positives += 1
+            return True
+        return False
+
+    def maybe_sync(self, load: RevocationLoader):
+        if time.monotonic() >= self._next_sync:
+            self.sync(load)
+
+    def sync(self, load: RevocationLoader):
+        with self._lock:
+            # Bloom filters cannot forget; once full, rebuild from the
+            # revocations whose tokens have not expired yet.
+            rebuild = self._watermark is None or self._filter.count >= self.capacity
+            since = None if rebuild else self._watermark - SYNC_OVERLAP
+            target = (
+                BloomFilter(self.capacity, self.error_rate) if rebuild else self._filter
+            )
+            for jti, revoked_at in load(since):
+                target.add(jti)
+                if self._watermark is None or revoked_at > self._watermark:
+                    self._watermark = revoked_at
+            if rebuild:
+                self._filter = target
+                self.rebuilds += 1
+            self.syncs += 1
+            self._next_sync = time.monotonic() + self.sync_interval
+
+    def stats(self) -> dict:
+        return {
+            "entries": self._filter.count,
+            "capacity": self.capacity,
+            "syncs": self.syncs,
+            "rebuilds": self.rebuilds,
+            "positives": self.positives,
+        }
+
+
+revocation_filter = RevocationFilter(
+    capacity=settings.revocation_filter_capacity,
+    error_rate=settings.revocation_filter_error_rate,
+    sync_interval=settings.revocation_sync_interval_seconds,
+)
@@ -1,88 +1,255 @@
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
-from passlib.context import CryptContext
-from datetime import datetime, timedelta
+from sqlalchemy import insert, literal, select, true, update
+from sqlalchemy.orm import Session, aliased, raiseload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 from . import models, schemas
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from .core.cache import principal_cache
+from .core.catalog import catalog_cache
+from .db.transaction import after_commit
 
 
 def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = pwd_context.hash(user.password)
-    db_user = models.User(
-        username=user.username, email=user.email, hashed_password=hashed_password
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+def _returning(db: Session, statement):
+    """Run an INSERT/UPDATE ... RETURNING the model; the row is the response.
+
+    Like every write here it only reaches the transaction: the request's unit
+    of work commits it once the response has been built.
+    """
+    return db.scalars(statement).first()
+
 
+def _invalidate(db: Session, *resources: str):
+    """Drop cached catalog pages once the transaction commits."""
 
-def reset_user_password(db: Session, email: str, new_password: str):
-    user = db.query(models.User).filter(models.User.email == email).first()
+    def invalidate():
+        for resource in resources:
+            catalog_cache.invalidate(resource)
 
+    after_commit(db, invalidate)
+
+
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: str):
+    return _returning(
+        db,
+        insert(models.User)
+        .values(
+            username=user.username,
+            email=user.email,
+            hashed_password=hashed_password,
+        )
+        .returning(models.User),
+    )
+
+
+def reset_user_password(db: Session, email: str, hashed_password: str):
+    user = db.scalars(
+        update(models.User)
+        .where(models.User.email == email)
+        .values(hashed_password=hashed_password)
+        .returning(models.User)
+    ).first()
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    hashed_password = pwd_context.hash(new_password)
-    user.hashed_password = hashed_password
-
-    db.commit()
-    db.refresh(user)
+    revoke_user_refresh_tokens(db, user.id)
+    after_commit(db, lambda: principal_cache.invalidate(user.username))
     return user
 
 
 def deactivate_user(db: Session, username: str):
-    user = db.query(models.User).filter(models.User.username == username).first()
-    user.is_active = False
-    db.commit()
+    user = db.scalars(
+        update(models.User)
+        .where(models.User.username == username)
+        .values(is_active=False)
+        .returning(models.User)
+    ).first()
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    revoke_user_refresh_tokens(db, user.id)
+    after_commit(db, lambda: principal_cache.invalidate(username))
     return user
 
 
-def get_magazines(db: Session):
-    return db.query(models.Magazine).all()
+def update_password_hash(db: Session, user_id: int, old_hash: str, new_hash: str):
+    # Only replace the hash that was verified, never a password reset since.
+    db.execute(
+        update(models.User)
+        .where(models.User.id == user_id, models.User.hashed_password == old_hash)
+        .values(hashed_password=new_hash)
+    )
 
 
-def create_magazine(db: Session, magazine: schemas.MagazineCreate):
-    db_magazine = models.Magazine(
-        name=magazine.name,
-        description=magazine.description,
-        base_price=magazine.base_price,
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def create_refresh_token_record(
+    db: Session, jti: str, family_id: str, user_id: int, expires_at: datetime
+):
+    db_token = models.RefreshToken(
+        jti=jti, family_id=family_id, user_id=user_id, expires_at=expires_at
+    )
+    db.add(db_token)
+    db.flush()
+    return db_token
+
+
+def rotate_refresh_token(
+    db: Session,
+    jti: str,
+    new_jti: str,
+    family_id: str,
+    user_id: int,
+    expires_at: datetime,
+) -> bool:
+    """Revoke ``jti`` and record its replacement.
+
+    Returns False, recording nothing, if ``jti`` is unknown or already revoked.
+    """
+    result = db.execute(
+        update(models.RefreshToken)
+        .where(
+            models.RefreshToken.jti == jti,
+            models.RefreshToken.revoked_at.is_(None),
+        )
+        .values(revoked_at=_utcnow(), replaced_by=new_jti)
+    )
+    if result.rowcount != 1:
+        return False
+    db.add(
+        models.RefreshToken(
+            jti=new_jti, family_id=family_id, user_id=user_id, expires_at=expires_at
+        )
+    )
+    db.flush()
+    return True
+
+
+def is_refresh_token_revoked(db: Session, jti: str) -> bool:
+    revoked_at = (
+        db.query(models.RefreshToken.revoked_at)
+        .filter(models.RefreshToken.jti == jti)
+        .scalar()
+    )
+    return revoked_at is not None
+
+
+def revoke_refresh_token_family(db: Session, family_id: str):
+    db.execute(
+        update(models.RefreshToken)
+        .where(
+            models.RefreshToken.family_id == family_id,
+            models.RefreshToken.revoked_at.is_(None),
+        )
+        .values(revoked_at=_utcnow())
     )
-    db.add(db_magazine)
-    db.commit()
-    db.refresh(db_magazine)
+
+
+def revoke_user_refresh_tokens(db: Session, user_id: int):
+    db.execute(
+        update(models.RefreshToken)
+        .where(
+            models.RefreshToken.user_id == user_id,
+            models.RefreshToken.revoked_at.is_(None),
+        )
+        .values(revoked_at=_utcnow())
+    )
+
+
+def get_revoked_refresh_tokens(db: Session, since=None):
+    query = db.query(models.RefreshToken.jti, models.RefreshToken.revoked_at).filter(
+        models.RefreshToken.revoked_at.is_not(None),
+        models.RefreshToken.expires_at > _utcnow(),
+    )
+    if since is not None:
+        query = query.filter(models.RefreshToken.revoked_at >= since)
+    return query.all()
+
+
+def _keyset(query, column, after_id: Optional[int], limit: Optional[int]):
+    if after_id is not None:
+        query = query.filter(column > after_id)
+    query = query.order_by(column)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+
+def _magazines(db: Session, include_plans: bool):
+    # Plans arrive in one extra SELECT ... IN for all rows, or are never
+    # loaded: touching them then raises instead of issuing a query per row.
+    plans = models.Magazine.plans
+    loader = selectinload(plans) if include_plans else raiseload(plans)
+    return db.query(models.Magazine).options(loader)
+
+
+def get_magazines(
+    db: Session,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    include_plans: bool = False,
+):
+    return _keyset(_magazines(db, include_plans), models.Magazine.id, after_id, limit)
+
+
+def create_magazine(db: Session, magazine: schemas.MagazineCreate):
+    db_magazine = db.scalars(
+        insert(models.Magazine)
+        .values(
+            name=magazine.name,
+            description=magazine.description,
+            base_price=magazine.base_price,
+        )
+        .returning(models.Magazine)
+    ).one()
+    # A new magazine has no plans; say so rather than query for them.
+    set_committed_value(db_magazine, "plans", [])
+    _invalidate(db, "magazines")
     return db_magazine
 
 
-def get_magazine(db: Session, magazine_id: int):
+def get_magazine(db: Session, magazine_id: int, include_plans: bool = False):
     magazine = (
-        db.query(models.Magazine).filter(models.Magazine.id == magazine_id).first()
+        _magazines(db, include_plans).filter(models.Magazine.id == magazine_id).first()
     )
     if magazine is None:
         raise HTTPException(status_code=404, detail="Magazine not found")
+    return magazine
+
+
+def get_magazine_base_price(db: Session, magazine_id: int) -> Optional[float]:
+    """The price an update is about to replace, locked until the request
+    commits so the repricing decision cannot race another update."""
+    return db.scalar(
+        select(models.Magazine.base_price)
+        .where(models.Magazine.id == magazine_id)
+        .with_for_update()
+    )
 
 
 def update_magazine(
     db: Session, magazine_id: int, magazine_update: schemas.MagazineUpdate
 ):
-    db_magazine = (
-        db.query(models.Magazine).filter(models.Magazine.id == magazine_id).first()
+    db_magazine = _returning(
+        db,
+        update(models.Magazine)
+        .where(models.Magazine.id == magazine_id)
+        .values(
+            description=magazine_update.description,
+            name=magazine_update.name,
+            base_price=magazine_update.base_price,
+        )
+        .returning(models.Magazine)
+        .options(selectinload(models.Magazine.plans)),
     )
-
     if db_magazine is None:
-        return None
-
-    db_magazine.description = magazine_update.description
-    db_magazine.name = magazine_update.name
-    db_magazine.base_price = magazine_update.base_price
-
-    db.commit()
-    db.refresh(db_magazine)
+        raise HTTPException(status_code=404, detail="Magazine not found")
+    _invalidate(db, "magazines")
     return db_magazine
 
 
@@ -92,10 +259,12 @@ def delete_magazine(db: Session, magazine_id: int):
     )
 
     if db_magazine is None:
-        raise None
+        raise HTTPException(status_code=404, detail="Magazine not found")
 
     db.delete(db_magazine)
-    db.commit()
+    db.flush()
+    # Its plans are detached (magazine_id set to NULL) along with it.
+    _invalidate(db, "magazines", "plans")
     return db_magazine
 
 
@@ -103,90 +272,126 @@ def calculate_subscription_price(base_price: float, discount: float) -> float:
     return base_price * (1 - discount)
 
 
+def _insert(db: Session, model):
+    """Dialect-specific INSERT, for ON CONFLICT support."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
+
+
 def create_subscription(db: Session, subscription: schemas.SubscriptionCreate):
-    db_subscription = (
-        db.query(models.Subscription)
-        .filter(
-            models.Subscription.user_id == subscription.user_id,
-            models.Subscription.magazine_id == subscription.magazine_id,
-            models.Subscription.plan_id == subscription.plan_id,
+    # One statement: the price is computed from the magazine and plan (a
+    # deliberate cross join, plans are not tied to a magazine), and the unique
+    # constraint rather than a prior SELECT rejects duplicates.
+    price = models.Magazine.base_price * (1 - models.Plan.discount)
+    source = (
+        select(
+            literal(subscription.user_id),
+            models.Magazine.id,
+            models.Plan.id,
+            price,
+            literal(subscription.renewal_date, models.Subscription.renewal_date.type),
+            true(),
+        )
+        .join(models.Plan, true())
+        .where(
+            models.Magazine.id == subscription.magazine_id,
+            models.Plan.id == subscription.plan_id,
+            price > 0,
         )
-        .first()
     )
+    statement = (
+        _insert(db, models.Subscription)
+        .from_select(
+            ["user_id", "magazine_id", "plan_id", "price", "renewal_date", "is_active"],
+            source,
+        )
+        .on_conflict_do_nothing(index_elements=["user_id", "magazine_id", "plan_id"])
+        .returning(models.Subscription)
+    )
+    db_subscription = db.scalars(statement).first()
+    if db_subscription is None:
+        _raise_subscription_conflict(db, subscription)
+    return db_subscription
 
-    if db_subscription:
-        raise HTTPException(status_code=422, detail="Subscription already exists")
 
-    magazine = (
-        db.query(models.Magazine)
-        .filter(models.Magazine.id == subscription.magazine_id)
-        .first()
+def _subscription_exists(subscription, other_than: Optional[int] = None):
+    """The subscription, if any, holding ``subscription``'s user, magazine and
+    plan: the combination the unique constraint allows once. Aliased, so it
+    does not correlate with an UPDATE of subscriptions it is nested in."""
+    other = aliased(models.Subscription)
+    query = select(other.id).where(
+        other.user_id == subscription.user_id,
+        other.magazine_id == subscription.magazine_id,
+        other.plan_id == subscription.plan_id,
     )
-    plan = db.query(models.Plan).filter(models.Plan.id == subscription.plan_id).first()
+    if other_than is not None:
+        query = query.where(other.id != other_than)
+    return query
+
 
+def _raise_subscription_conflict(db: Session, subscription: schemas.SubscriptionCreate):
+    """Work out why nothing was inserted; only runs on the failure path."""
+    if db.scalar(_subscription_exists(subscription)) is not None:
+        raise HTTPException(status_code=422, detail="Subscription already exists")
+    magazine = db.get(models.Magazine, subscription.magazine_id)
+    plan = db.get(models.Plan, subscription.plan_id)
     if not magazine or not plan:
         raise HTTPException(status_code=404, detail="Magazine or Plan not found")
-
-    price = calculate_subscription_price(magazine.base_price, plan.discount)
-
-    if price <= 0:
-        raise HTTPException(status_code=422, detail="Price must be greater than zero")
-
-    db_subscription = models.Subscription(
-        user_id=subscription.user_id,
-        magazine_id=subscription.magazine_id,
-        plan_id=subscription.plan_id,
-        price=price,
-        renewal_date=subscription.renewal_date,
-    )
-    db.add(db_subscription)
-    db.commit()
-    db.refresh(db_subscription)
-    return db_subscription
+    raise HTTPException(status_code=422, detail="Price must be greater than zero")
 
 
 def update_subscription(
     db: Session, subscription_id: int, subscription_update: schemas.SubscriptionUpdate
 ):
-    db_subscription = (
-        db.query(models.Subscription)
-        .filter(models.Subscription.id == subscription_id)
-        .first()
-    )
-
-    if db_subscription is None:
-        raise HTTPException(status_code=404, detail="Subscription not found")
-
-    magazine = (
-        db.query(models.Magazine)
-        .filter(models.Magazine.id == db_subscription.magazine_id)
-        .first()
+    # One statement: the price comes from the magazine and plan being moved
+    # to, and is NULL (so nothing is updated) if either does not exist. Moving
+    # onto a combination another subscription holds updates nothing either,
+    # rather than fail the unique constraint.
+    price = (
+        select(models.Magazine.base_price * (1 - models.Plan.discount))
+        .join(models.Plan, true())
+        .where(
+            models.Magazine.id == subscription_update.magazine_id,
+            models.Plan.id == subscription_update.plan_id,
+        )
+        .scalar_subquery()
     )
-    plan = (
-        db.query(models.Plan).filter(models.Plan.id == db_subscription.plan_id).first()
+    taken = _subscription_exists(subscription_update, other_than=subscription_id)
+    db_subscription = _returning(
+        db,
+        update(models.Subscription)
+        .where(
+            models.Subscription.id == subscription_id,
+            price.is_not(None),
+            ~taken.exists(),
+        )
+        .values(
+            user_id=subscription_update.user_id,
+            magazine_id=subscription_update.magazine_id,
+            plan_id=subscription_update.plan_id,
+            price=price,
+            renewal_date=subscription_update.renewal_date,
+        )
+        .returning(models.Subscription),
     )
-
-    if not magazine or not plan:
+    if db_subscription is None:
+        if db.get(models.Subscription, subscription_id) is None:
+            raise HTTPException(status_code=404, detail="Subscription not found")
+        if db.scalar(taken) is not None:
+            raise HTTPException(status_code=422, detail="Subscription already exists")
         raise HTTPException(status_code=404, detail="Magazine or Plan not found")
-
-    price = calculate_subscription_price(magazine.base_price, plan.discount)
-
-    db_subscription.user_id = subscription_update.user_id
-    db_subscription.magazine_id = subscription_update.magazine_id
-    db_subscription.plan_id = subscription_update.plan_id
-    db_subscription.price = price
-    db_subscription.renewal_date = subscription_update.renewal_date
-
-    db.commit()
-    db.refresh(db_subscription)
     return db_subscription
 
 
-def get_subscriptions(db: Session):
-    subscriptions = db.query(models.Subscription).all()
-    for subscription in subscriptions:
-        db.delete(subscription)
-    return subscriptions
+def get_subscriptions(
+    db: Session, after_id: Optional[int] = None, limit: Optional[int] = None
+):
+    return _keyset(
+        db.query(models.Subscription), models.Subscription.id, after_id, limit
+    )
 
 
 def get_subscription(db: Session, subscription_id: int):
@@ -212,21 +417,23 @@ def get_subscriptions_by_user(db: Session, user_id: int):
 
 
 def deactivate_subscription(db: Session, subscription_id: int, user_id: int):
-    subscription = (
-        db.query(models.Subscription)
-        .filter(
+    subscription = _returning(
+        db,
+        update(models.Subscription)
+        .where(
             models.Subscription.id == subscription_id,
             models.Subscription.user_id == user_id,
         )
-        .first()
+        .values(is_active=False)
+        .returning(models.Subscription),
     )
-    subscription.is_active = False
-    db.commit()
+    if subscription is None:
+        raise HTTPException(status_code=404, detail="Subscription not found")
     return subscription
 
 
-def get_plans(db: Session):
-    return db.query(models.Plan).all()
+def get_plans(db: Session, after_id: Optional[int] = None, limit: Optional[int] = None):
+    return _keyset(db.query(models.Plan), models.Plan.id, after_id, limit)
 
 
 def create_plan(db: Session, plan: schemas.PlanCreate):
@@ -234,17 +441,20 @@ def create_plan(db: Session, plan: schemas.PlanCreate):
         raise HTTPException(
             status_code=422, detail="Renewal period must be greater than zero"
         )
-    db_plan = models.Plan(
-        title=plan.title,
-        description=plan.description,
-        renewal_period=plan.renewal_period,
-        tier=plan.tier,
-        discount=plan.discount,
-        magazine_id=plan.magazine_id,
+    db_plan = _returning(
+        db,
+        insert(models.Plan)
+        .values(
+            title=plan.title,
+            description=plan.description,
+            renewal_period=plan.renewal_period,
+            tier=plan.tier,
+            discount=plan.discount,
+            magazine_id=plan.magazine_id,
+        )
+        .returning(models.Plan),
     )
-    db.add(db_plan)
-    db.commit()
-    db.refresh(db_plan)
+    _invalidate(db, "plans")
     return db_plan
 
 
@@ -255,20 +465,31 @@ def get_plan(db: Session, plan_id: int):
     return plan
 
 
+def get_plan_discount(db: Session, plan_id: int) -> Optional[float]:
+    """The discount an update is about to replace; see get_magazine_base_price."""
+    return db.scalar(
+        select(models.Plan.discount).where(models.Plan.id == plan_id).with_for_update()
+    )
+
+
 def update_plan(db: Session, plan_id: int, plan_update: schemas.PlanUpdate):
-    db_plan = db.query(models.Plan).filter(models.Plan.id == plan_id).first()
+    db_plan = _returning(
+        db,
+        update(models.Plan)
+        .where(models.Plan.id == plan_id)
+        .values(
+            title=plan_update.title,
+            description=plan_update.description,
+            renewal_period=plan_update.renewal_period,
+            tier=plan_update.tier,
+            discount=plan_update.discount,
+            magazine_id=plan_update.magazine_id,
+        )
+        .returning(models.Plan),
+    )
     if db_plan is None:
         raise HTTPException(status_code=404, detail="Plan not found")
-
-    db_plan.title = plan_update.title
-    db_plan.description = plan_update.description
-    db_plan.renewal_period = plan_update.renewal_period
-    db_plan.tier = plan_update.tier
-    db_plan.discount = plan_update.discount
-    db_plan.magazine_id = plan_update.magazine_id
-
-    db.commit()
-    db.refresh(db_plan)
+    _invalidate(db, "plans")
     return db_plan
 
 
@@ -278,5 +499,6 @@ def delete_plan(db: Session, plan_id: int):
         raise HTTPException(status_code=404, detail="Plan not found")
 
     db.delete(db_plan)
-    db.commit()
+    db.flush()
+    _invalidate(db, "plans")
     return db_plan
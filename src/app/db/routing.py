@@ -0,0 +1,170 @@
+"""Read-replica routing.
+
+``RoutingSession`` sends a read-only session's queries to a replica and
+everything else to the primary. ``get_db`` marks sessions of GET and HEAD
+requests read-only; a session that writes (a flush or an INSERT, UPDATE or
+DELETE) is pinned to the primary from then on, so it reads its own writes.
+
+``ReplicaRouter`` decides, once per session, whether the replica is fresh
+enough. It probes the replica's lag at most every ``check_interval`` seconds
+and falls back to the primary when the replica is unreachable, lags more than
+``max_lag`` seconds, or may not yet have a transaction that the session's
+client (``info[CLIENT]``) wrote through this process. Only transactions that
+flushed or ran an INSERT, UPDATE or DELETE count as writes. Other clients'
+writes, and those of other processes, reach the replica within ``max_lag``.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+READ_ONLY = "read_only"
+CLIENT = "client"
+_BIND = "routed_bind"
+_WROTE = "routed_wrote"
+
+# Seconds the replica trails the primary. A standby with nothing left to
+# replay is current, however old its last replayed transaction.
+LAG_QUERIES = {
+    "postgresql": """
+        SELECT CASE
+            WHEN NOT pg_is_in_recovery()
+                OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+            THEN 0
+            ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+        END
+    """,
+}
+
+
+def replica_lag(connection) -> float:
+    """The replica's lag in seconds; 0 for databases that do not replicate."""
+    query = LAG_QUERIES.get(connection.dialect.name, "SELECT 0")
+    return float(connection.execute(text(query)).scalar() or 0)
+
+
+class ReplicaRouter:
+    """Chooses the engine a read-only session reads from."""
+
+    def __init__(
+        self,
+        primary: Engine,
+        replica: Engine,
+        max_lag: float = 5.0,
+        check_interval: float = 1.0,
+        probe: Callable[[Engine], float] = None,
+        max_clients: int = 100_000,
+    ):
+        self.primary = primary
+        self.replica = replica
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.probe = probe or self._probe
+        self._lock = threading.Lock()
+        self._checked_at = float("-inf")
+        self._lag: Optional[float] = None
+        self.max_clients = max_clients
+        # client -> when its last write committed, least recent first
+        self._writes: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._writes_lock = threading.Lock()
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.probe_errors = 0
+
+    @staticmethod
+    def _probe(replica: Engine) -> float:
+        with replica.connect() as connection:
+            return replica_lag(connection)
+
+    def record_write(self, client: Optional[Hashable]):
+        if client is None:
+            return
+        with self._writes_lock:
+            self._writes.pop(client, None)
+            self._writes[client] = time.monotonic()
+            while len(self._writes) > self.max_clients:
+                self._writes.popitem(last=False)
+
+    def _refresh(self):
+        # One thread probes at a time; the others use the last reading.
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            started = time.monotonic()
+            try:
+                self._lag = self.probe(self.replica)
+            except Exception:
+                self._lag = None
+                self.probe_errors += 1
+            self._checked_at = started
+        finally:
+            self._lock.release()
+
+    def read_bind(self, client: Optional[Hashable] = None) -> Engine:
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self._refresh()
+        lag = self._lag
+        last_write = self._writes.get(client, float("-inf"))
+        # The replica held everything committed up to checked_at - lag.
+        if lag is None or lag > self.max_lag or last_write >= self._checked_at - lag:
+            self.primary_reads += 1
+            return self.primary
+        self.replica_reads += 1
+        return self.replica
+
+    def stats(self) -> dict:
+        return {
+            "lag_seconds": self._lag,
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "probe_errors": self.probe_errors,
+        }
+
+
+class RoutingSession(Session):
+    """A session that reads from ``router``'s replica while read-only."""
+
+    def __init__(self, *args, router: Optional[ReplicaRouter] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.router = router
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.router is None or not self.info.get(READ_ONLY):
+            return super().get_bind(mapper, clause=clause, **kwargs)
+        if self._flushing or (clause is not None and clause.is_dml):
+            self.info[READ_ONLY] = False
+            return self.router.primary
+        if _BIND not in self.info:
+            self.info[_BIND] = self.router.read_bind(self.info.get(CLIENT))
+        return self.info[_BIND]
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _flushed(session, flush_context):
+    session.info[_WROTE] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _executed(state):
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info[_WROTE] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _committed(session):
+    # Releasing a savepoint is not the commit that makes writes visible.
+    if session.in_nested_transaction() or not session.info.pop(_WROTE, False):
+        return
+    if session.router is not None:
+        session.router.record_write(session.info.get(CLIENT))
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _ended(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_WROTE, None)
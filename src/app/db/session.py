@@ -1,21 +1,185 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request
+from pydantic import TypeAdapter
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
-import os
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+from app.db.routing import CLIENT, READ_ONLY, ReplicaRouter, RoutingSession
+
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_database_url(url: str) -> str:
+    """The asyncpg / aiosqlite flavour of a sync database URL."""
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()]).render_as_string(
+        hide_password=False
+    )
+
+
+def _pool_options(url: str, asynchronous: bool) -> dict:
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # In-memory SQLite is one connection per thread; there is no pool to size.
+        return {}
+    return {
+        "poolclass": (
+            InstrumentedAsyncQueuePool if asynchronous else InstrumentedQueuePool
+        ),
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def create_db_engine(url: str, asynchronous: bool = False, **options):
+    """The one place engines are built, sized from the pool settings.
+
+    Passing ``poolclass`` opts out of the configured pool entirely.
+    """
+    if "poolclass" not in options:
+        options = {**_pool_options(url, asynchronous), **options}
+    if asynchronous:
+        return create_async_engine(url, **options)
+    return create_engine(url, **options)
 
-load_dotenv()
 
-SQLALCHEMY_DATABASE_URL = os.getenv(
-    "DATABASE_URL", "postgresql+psycopg2://app_user:app_password@db/app"
+def pool_metrics(engine) -> dict:
+    pool = getattr(engine, "sync_engine", engine).pool
+    if hasattr(pool, "metrics"):
+        return pool.metrics()
+    return {"status": pool.status()}
+
+
+def replica_router(primary, replica):
+    """Route reads between sync engines, or the sync side of async ones."""
+    return ReplicaRouter(
+        getattr(primary, "sync_engine", primary),
+        getattr(replica, "sync_engine", replica),
+        max_lag=settings.replica_max_lag_seconds,
+        check_interval=settings.replica_lag_check_seconds,
+    )
+
+
+engine = create_db_engine(settings.database_url)
+replica_engine = (
+    create_db_engine(settings.database_replica_url)
+    if settings.database_replica_url
+    else None
+)
+read_router = replica_router(engine, replica_engine) if replica_engine else None
+SessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    class_=RoutingSession,
+    router=read_router,
 )
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = (
+    create_db_engine(
+        settings.database_async_url or async_database_url(settings.database_url),
+        asynchronous=True,
+    )
+    if settings.database_async
+    else None
+)
+async_replica_engine = (
+    create_db_engine(
+        async_database_url(settings.database_replica_url), asynchronous=True
+    )
+    if settings.database_async and settings.database_replica_url
+    else None
+)
+async_read_router = (
+    replica_router(async_engine, async_replica_engine) if async_replica_engine else None
+)
+# Objects outlive the session's greenlet context, so nothing may expire.
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+    sync_session_class=RoutingSession,
+    router=async_read_router,
+)
 
 
-def get_db():
+def read_only(request: Request) -> bool:
+    return request.method in ("GET", "HEAD")
+
+
+def client_key(request: Request) -> Optional[bytes]:
+    """Whose writes a request's reads must see: its bearer credentials, or
+    else its address."""
+    identity = request.headers.get("authorization") or (
+        request.client.host if request.client else None
+    )
+    if identity is None:
+        return None
+    return hashlib.blake2b(identity.encode(), digest_size=16).digest()
+
+
+def get_sync_db(request: Request):
     db = SessionLocal()
+    db.info[READ_ONLY] = read_only(request)
+    db.info[CLIENT] = client_key(request)
     try:
         yield db
+        db.commit()
     finally:
         db.close()
+
+
+async def get_async_db(request: Request):
+    async with AsyncSessionLocal() as db:
+        db.info[READ_ONLY] = read_only(request)
+        db.info[CLIENT] = client_key(request)
+        yield db
+        await db.commit()
+
+
+# The request's unit of work: crud functions only flush, and the session
+# commits once, after the handler returned and its response was built; an
+# exception rolls everything back. Handlers depend on it with
+# Depends(get_db, scope="function") so the commit happens before the response
+# is sent rather than after.
+get_db = get_async_db if settings.database_async else get_sync_db
+
+
+async def run_db(db, fn, *args, schema=None, **kwargs):
+    """Run sync ``fn(session, *args, **kwargs)`` without blocking the event loop.
+
+    An ``AsyncSession`` runs it through ``run_sync`` on its async driver; a
+    plain ``Session`` runs it in the threadpool. With ``schema``, the result is
+    converted while the session is still usable, so relationships can load.
+    """
+
+    def call(session):
+        result = fn(session, *args, **kwargs)
+        if schema is not None:
+            result = TypeAdapter(schema).validate_python(result, from_attributes=True)
+        return result
+
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(call)
+    return await run_in_threadpool(call, db)
+
+
+async def release_db(db):
+    """Return the session's connection to the pool; the session stays usable.
+
+    Anything not yet committed is rolled back, so release before writing.
+    """
+    if isinstance(db, AsyncSession):
+        await db.close()
+    else:
+        db.close()
@@ -0,0 +1,33 @@
+"""Work to run once a session's transaction has committed.
+
+Crud functions only flush; the request's unit of work (``get_db``) commits.
+Side effects that must not run for a transaction that never commits, such as
+invalidating caches, are registered with ``after_commit`` and run after the
+outermost commit. A rollback drops them.
+"""
+
+from typing import Callable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_CALLBACKS = "after_commit"
+
+
+def after_commit(db: Session, callback: Callable[[], None]):
+    """Run ``callback`` once ``db``'s current transaction commits."""
+    db.info.setdefault(_CALLBACKS, []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_callbacks(session: Session):
+    if session.in_nested_transaction():
+        return  # a savepoint was released
+    for callback in session.info.pop(_CALLBACKS, ()):
+        callback()
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_callbacks(session: Session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_CALLBACKS, None)
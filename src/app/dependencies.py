@@ -1,85 +1,104 @@
-from fastapi.security import OAuth2PasswordBearer
-from fastapi import Depends, HTTPException, status
-from passlib.context import CryptContext
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from jose import JWTError, jwt
 from typing import Optional
 
-from app.database import SessionLocal
-from app.schemas import TokenData
-from app import models
+from fastapi.security import OAuth2PasswordBearer
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from jose import JWTError
 
-SECRET_KEY = "VladySecret"
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+from app.core.cache import principal_cache
+from app.core.jwt import REFRESH_TOKEN_TYPE, token_service
+from app.core.hashing import password_hasher
+from app.core.ratelimit import login_limiter
+from app.db.session import get_db, release_db, run_db
+from app.schemas import User
+from app import crud, models
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def client_ip(request: Request) -> Optional[str]:
+    return request.client.host if request.client else None
 
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = db.query(models.User).filter(models.User.username == username).first()
-    if not user or not verify_password(password, user.hashed_password):
+async def authenticate_user(
+    db: Session, username: str, password: str, client_ip: Optional[str] = None
+):
+    # Throttle before touching the database or spending any time on bcrypt.
+    login_limiter.check(ip=client_ip, account=username)
+    user = await run_db(db, crud.get_user_by_username, username)
+    # A deactivated account is refused like a wrong password, before hashing.
+    if not user or not user.is_active:
+        return False
+    # Hand the connection back to the pool while the hash is being checked.
+    await release_db(db)
+    valid, new_hash = await password_hasher.verify_and_update(
+        password, user.hashed_password
+    )
+    if not valid:
         return False
+    if new_hash is not None:
+        await run_db(db, rehash_password, user.id, user.hashed_password, new_hash)
     return user
 
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
-
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.now() + expires_delta
-    else:
-        expire = datetime.now() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+def rehash_password(db: Session, user_id: int, old_hash: str, new_hash: str):
+    # A savepoint inside the request's unit of work: if the upgrade fails the
+    # login still succeeds, and the next login tries again.
+    try:
+        with db.begin_nested():
+            crud.update_password_hash(db, user_id, old_hash, new_hash)
+    except SQLAlchemyError:
+        pass
 
 
-def decode_access_token(token: str):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise JWTError
-        token_data = TokenData(username=username)
-    except JWTError:
-        return None
-    return token_data
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db, scope="function")
+):
+    return await resolve_user(token, db)
 
 
-def get_current_user(
+async def get_streaming_user(
     token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
 ):
+    """``get_current_user`` on the request-scoped session, for routes whose
+    response streams from that session after the handler returns: dependency
+    results are cached per scope, so mixing scopes would open two sessions."""
+    return await resolve_user(token, db)
+
+
+async def resolve_user(token: str, db: Session):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = token_service.decode(token)
         username = payload.get("sub")
-        if username is None:
+        if username is None or payload.get("typ") == REFRESH_TOKEN_TYPE:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = db.query(models.User).filter(models.User.username == username).first()
+    user = principal_cache.get(username)
     if user is None:
+        user = await run_db(db, load_principal, username)
+    if user is None or not user.is_active:
         raise credentials_exception
     return user
+
+
+def get_principal(db: Session, username: str):
+    user = principal_cache.get(username)
+    if user is None:
+        user = load_principal(db, username)
+    return user
+
+
+def load_principal(db: Session, username: str):
+    db_user = db.query(models.User).filter(models.User.username == username).first()
+    if db_user is None:
+        return None
+    user = User.model_validate(db_user, from_attributes=True)
+    principal_cache.set(username, user)
+    return user
@@ -1,16 +1,30 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.routers import token, users, magazines, plans, subscriptions
-from app.database import engine
+from app.routers import token, users, magazines, plans, subscriptions, metrics
+from app.core.config import settings
+from app.core.hashing import password_hasher
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.profiling import PROFILE_HEADER, ProfilingMiddleware
+from app.db.session import engine
 from app import models
 
 models.Base.metadata.create_all(bind=engine)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    password_hasher.shutdown()
+
+
 app = FastAPI(
     title="Magazine Subscription Service",
     description="A simplified magazine subscription service API",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 origins = [
@@ -24,14 +38,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", PROFILE_HEADER],
 )
 
+# Added last so it is outermost and profiles the whole stack.
+if settings.profile_secret or settings.profile_sample_rate:
+    app.add_middleware(
+        ProfilingMiddleware,
+        secret=settings.profile_secret,
+        sample_rate=settings.profile_sample_rate,
+        interval=settings.profile_interval_ms / 1000,
+        directory=settings.profile_dir,
+    )
+
 # Include routers
 app.include_router(token.router)
 app.include_router(users.router)
 app.include_router(magazines.router)
 app.include_router(plans.router)
 app.include_router(subscriptions.router)
+app.include_router(metrics.router)
 
 if __name__ == "__main__":
     import uvicorn
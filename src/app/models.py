@@ -1,6 +1,17 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Float,
+    Boolean,
+    ForeignKey,
+    DateTime,
+    Index,
+    UniqueConstraint,
+    text,
+)
 from sqlalchemy.orm import relationship
-from .database import Base
+from .db.base import Base
 import datetime
 
 
@@ -36,7 +47,7 @@ class Plan(Base):
     renewal_period = Column(Integer)
     tier = Column(Integer)
     discount = Column(Float)
-    magazine_id = Column(Integer, ForeignKey("magazines.id"))
+    magazine_id = Column(Integer, ForeignKey("magazines.id"), index=True)
 
     magazine = relationship("Magazine", back_populates="plans")
     subscriptions = relationship("Subscription", back_populates="plan")
@@ -44,11 +55,33 @@ class Plan(Base):
 
 class Subscription(Base):
     __tablename__ = "subscriptions"
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id",
+            "magazine_id",
+            "plan_id",
+            name="uq_subscriptions_user_magazine_plan",
+        ),
+        # get_subscriptions_by_user only ever asks for active subscriptions.
+        Index(
+            "ix_subscriptions_active_user_id",
+            "user_id",
+            postgresql_where=text("is_active = true"),
+            sqlite_where=text("is_active = 1"),
+        ),
+        # Renewal workers claim the oldest due active subscriptions first.
+        Index(
+            "ix_subscriptions_active_renewal_date",
+            "renewal_date",
+            postgresql_where=text("is_active = true"),
+            sqlite_where=text("is_active = 1"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
-    magazine_id = Column(Integer, ForeignKey("magazines.id"))
-    plan_id = Column(Integer, ForeignKey("plans.id"))
+    magazine_id = Column(Integer, ForeignKey("magazines.id"), index=True)
+    plan_id = Column(Integer, ForeignKey("plans.id"), index=True)
     price = Column(Float)
     renewal_date = Column(DateTime)
     is_active = Column(Boolean, default=True)
@@ -56,3 +89,17 @@ class Subscription(Base):
     user = relationship("User", back_populates="subscriptions")
     magazine = relationship("Magazine")
     plan = relationship("Plan", back_populates="subscriptions")
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String, unique=True, index=True)
+    family_id = Column(String, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    expires_at = Column(DateTime)
+    revoked_at = Column(DateTime, nullable=True, index=True)
+    replaced_by = Column(String, nullable=True)
+
+    user = relationship("User")
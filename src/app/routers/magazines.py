@@ -1,35 +1,99 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, BackgroundTasks, Depends, Request
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Union
 
 from app import schemas, models, crud
-from app.database import get_db
+from app.core.catalog import catalog_cache
+from app.core.pagination import Page, page_params
+from app.core.responses import FastJSONRoute
+from app.db.session import get_db, run_db
+from app.services.repricing import reprice_after_update
 
-router = APIRouter(tags=["magazines"])
+router = APIRouter(tags=["magazines"], route_class=FastJSONRoute)
 
 
-@router.get("/magazines/", response_model=List[schemas.Magazine])
-def get_magazines(db: Session = Depends(get_db)):
-    return crud.get_magazines(db)
+def include_plans(include: Optional[str] = None) -> bool:
+    """``?include=plans`` embeds each magazine's plans; otherwise they are
+    neither queried nor returned (summaries have no ``plans`` field, so an
+    empty list always means a magazine without plans)."""
+    return "plans" in (include or "").split(",")
+
+
+def magazine_schema(plans: bool):
+    return schemas.Magazine if plans else schemas.MagazineSummary
+
+
+# Reads answer with full magazines or summaries, depending on ?include.
+MagazineRead = Union[schemas.Magazine, schemas.MagazineSummary]
+
+
+@router.get("/magazines/", response_model=List[MagazineRead])
+async def get_magazines(
+    request: Request,
+    page: Page = Depends(page_params),
+    plans: bool = Depends(include_plans),
+    db: Session = Depends(get_db, scope="function"),
+):
+    async def load():
+        return await run_db(
+            db,
+            crud.get_magazines,
+            page.after_id,
+            page.fetch,
+            include_plans=plans,
+            schema=List[magazine_schema(plans)],
+        )
+
+    resources = ("magazines", "plans") if plans else ("magazines",)
+    return await catalog_cache.page(
+        request, page, load, List[magazine_schema(plans)], resources, plans
+    )
 
 
 @router.post("/magazines/", response_model=schemas.Magazine)
-def create_magazine(magazine: schemas.MagazineCreate, db: Session = Depends(get_db)):
-    return crud.create_magazine(db=db, magazine=magazine)
+async def create_magazine(
+    magazine: schemas.MagazineCreate, db: Session = Depends(get_db, scope="function")
+):
+    return await run_db(
+        db, crud.create_magazine, magazine=magazine, schema=schemas.Magazine
+    )
 
 
-@router.get("/magazines/{magazine_id}", response_model=schemas.Magazine)
-def get_magazine(magazine_id: int, db: Session = Depends(get_db)):
-    return crud.get_magazine(db, magazine_id)
+@router.get("/magazines/{magazine_id}", response_model=MagazineRead)
+async def get_magazine(
+    magazine_id: int,
+    plans: bool = Depends(include_plans),
+    db: Session = Depends(get_db, scope="function"),
+):
+    return await run_db(
+        db,
+        crud.get_magazine,
+        magazine_id,
+        include_plans=plans,
+        schema=magazine_schema(plans),
+    )
 
 
 @router.put("/magazines/{magazine_id}", response_model=schemas.Magazine)
-def update_magazine(
-    magazine_id: int, magazine: schemas.MagazineUpdate, db: Session = Depends(get_db)
+async def update_magazine(
+    magazine_id: int,
+    magazine: schemas.MagazineUpdate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db, scope="function"),
 ):
-    return crud.update_magazine(db, magazine_id, magazine)
+    base_price = await run_db(db, crud.get_magazine_base_price, magazine_id)
+    updated = await run_db(
+        db, crud.update_magazine, magazine_id, magazine, schema=schemas.Magazine
+    )
+    # Only a price change touches subscriptions; name or description edits
+    # stay a single-row write.
+    if updated.base_price != base_price:
+        await reprice_after_update(db, background_tasks, magazine_id=magazine_id)
+    return updated
 
 
 @router.delete("/magazines/{magazine_id}")
-def delete_magazine(magazine_id: int, db: Session = Depends(get_db)):
-    return crud.delete_magazine(db, magazine_id)
+async def delete_magazine(
+    magazine_id: int, db: Session = Depends(get_db, scope="function")
+):
+    return await run_db(db, crud.delete_magazine, magazine_id)
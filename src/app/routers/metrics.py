@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends
+
+from app.core.cache import principal_cache
+from app.core.catalog import catalog_cache
+from app.core.hashing import password_hasher
+from app.core.jwt import claims_cache
+from app.core.ratelimit import login_limiter
+from app.core.revocation import revocation_filter
+from app.db.session import (
+    async_engine,
+    async_read_router,
+    engine,
+    pool_metrics,
+    read_router,
+    replica_engine,
+)
+from app.dependencies import get_current_user
+
+# Pool sizes and cache counters describe the deployment; signed-in users only.
+router = APIRouter(tags=["metrics"], dependencies=[Depends(get_current_user)])
+
+
+@router.get("/metrics/")
+def get_metrics():
+    pools = {"sync": pool_metrics(engine)}
+    if replica_engine is not None:
+        pools["replica"] = pool_metrics(replica_engine)
+    if async_engine is not None:
+        pools["async"] = pool_metrics(async_engine)
+    replicas = {}
+    if read_router is not None:
+        replicas["sync"] = read_router.stats()
+    if async_read_router is not None:
+        replicas["async"] = async_read_router.stats()
+    return {
+        "db_pool": pools,
+        "db_replica": replicas,
+        "principal_cache": principal_cache.stats(),
+        "claims_cache": claims_cache.stats(),
+        "catalog_cache": catalog_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "login_limiter": login_limiter.stats(),
+        "revocation_filter": revocation_filter.stats(),
+    }
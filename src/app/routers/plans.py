@@ -1,28 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from typing import List
 
 from app import schemas, models, crud
-from app.database import get_db
+from app.core.catalog import catalog_cache
+from app.core.pagination import Page, page_params
+from app.core.responses import FastJSONRoute
+from app.db.session import get_db, run_db
+from app.services.repricing import reprice_after_update
+
+router = APIRouter(tags=["plans"], route_class=FastJSONRoute)
 
-router = APIRouter(tags=["plans"])
 
 @router.get("/plans/", response_model=List[schemas.Plan])
-def get_plans(db: Session = Depends(get_db)):
-    return crud.get_plans(db)
+async def get_plans(
+    request: Request,
+    page: Page = Depends(page_params),
+    db: Session = Depends(get_db, scope="function"),
+):
+    async def load():
+        return await run_db(
+            db, crud.get_plans, page.after_id, page.fetch, schema=List[schemas.Plan]
+        )
+
+    return await catalog_cache.page(request, page, load, List[schemas.Plan], ("plans",))
+
 
 @router.post("/plans/", response_model=schemas.Plan)
-def create_plan(plan: schemas.PlanCreate, db: Session = Depends(get_db)):
-    return crud.create_plan(db=db, plan=plan)
+async def create_plan(
+    plan: schemas.PlanCreate, db: Session = Depends(get_db, scope="function")
+):
+    return await run_db(db, crud.create_plan, plan=plan)
+
 
 @router.get("/plans/{plan_id}", response_model=schemas.Plan)
-def get_plan(plan_id: int, db: Session = Depends(get_db)):
-    return crud.get_plan(db, plan_id)
+async def get_plan(plan_id: int, db: Session = Depends(get_db, scope="function")):
+    return await run_db(db, crud.get_plan, plan_id)
+
 
 @router.put("/plans/{plan_id}", response_model=schemas.Plan)
-def update_plan(plan_id: int, plan: schemas.PlanUpdate, db: Session = Depends(get_db)):
-    return crud.update_plan(db, plan_id, plan)
+async def update_plan(
+    plan_id: int,
+    plan: schemas.PlanUpdate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db, scope="function"),
+):
+    discount = await run_db(db, crud.get_plan_discount, plan_id)
+    updated = await run_db(db, crud.update_plan, plan_id, plan, schema=schemas.Plan)
+    if updated.discount != discount:
+        await reprice_after_update(db, background_tasks, plan_id=plan_id)
+    return updated
+
 
 @router.delete("/plans/{plan_id}", response_model=schemas.Plan)
-def delete_plan(plan_id: int, db: Session = Depends(get_db)):
-    return crud.delete_plan(db, plan_id)
+async def delete_plan(plan_id: int, db: Session = Depends(get_db, scope="function")):
+    return await run_db(db, crud.delete_plan, plan_id)
@@ -1,49 +1,135 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from datetime import datetime
+from typing import List, Literal, Optional
 
 from app import schemas, models, crud
-from app.dependencies import get_db, get_current_user
+from app.core.config import settings
+from app.core.pagination import Page, page_params
+from app.core.responses import FastJSONRoute
+from app.db.session import get_db, run_db
+from app.dependencies import get_current_user, get_streaming_user
+from app.services.repricing import reprice
+from app.services.subscription_export import MEDIA_TYPES, export_query, stream_export
+from app.services.subscription_import import SubscriptionImport, detect_format
 
-router = APIRouter(tags=["subscriptions"])
+router = APIRouter(tags=["subscriptions"], route_class=FastJSONRoute)
 
 
 @router.get("/subscriptions/", response_model=List[schemas.Subscription])
-def get_subscriptions(
+async def get_subscriptions(
+    response: Response,
+    page: Page = Depends(page_params),
     current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
 ):
-    return crud.get_subscriptions(db)
+    subscriptions = await run_db(db, crud.get_subscriptions, page.after_id, page.fetch)
+    return page.finish(response, subscriptions)
 
 
 @router.post("/subscriptions/", response_model=schemas.Subscription)
-def create_subscription(
+async def create_subscription(
     subscription: schemas.SubscriptionCreate,
     current_user: schemas.User = Depends(get_current_user),
+    db: Session = Depends(get_db, scope="function"),
+):
+    return await run_db(db, crud.create_subscription, subscription=subscription)
+
+
+@router.post("/subscriptions/import", response_model=schemas.SubscriptionImportResult)
+async def import_subscriptions(
+    request: Request,
+    current_user: schemas.User = Depends(get_current_user),
+    db: Session = Depends(get_db, scope="function"),
+):
+    """Bulk-create subscriptions from a ``text/csv`` (with a header row;
+    quoted fields may span lines) or ``application/x-ndjson`` request body."""
+    fmt = detect_format(request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(
+            status_code=415, detail="Send text/csv or application/x-ndjson"
+        )
+    job = SubscriptionImport(
+        fmt,
+        chunk_size=settings.import_chunk_size,
+        max_errors=settings.import_max_errors,
+        max_row_bytes=settings.import_max_row_bytes,
+    )
+    await run_db(db, job.begin)
+    async for rows in job.chunks(request.stream()):
+        await run_db(db, job.load, rows)
+    return await run_db(db, job.finish)
+
+
+@router.post("/subscriptions/reprice", response_model=schemas.RepricingResult)
+async def reprice_subscriptions(
+    repricing: schemas.RepricingRequest,
+    current_user: schemas.User = Depends(get_current_user),
+    db: Session = Depends(get_db, scope="function"),
+):
+    """Recompute active subscription prices for a magazine and/or plan;
+    ``dry_run`` reports the price deltas without writing them."""
+    return await run_db(
+        db,
+        reprice,
+        magazine_id=repricing.magazine_id,
+        plan_id=repricing.plan_id,
+        dry_run=repricing.dry_run,
+    )
+
+
+@router.get("/subscriptions/export")
+async def export_subscriptions(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    user_id: Optional[int] = None,
+    magazine_id: Optional[int] = None,
+    is_active: Optional[bool] = None,
+    renewal_from: Optional[datetime] = None,
+    renewal_to: Optional[datetime] = None,
+    current_user: schemas.User = Depends(get_streaming_user),
+    # The body streams after the handler returns; a request-scoped session
+    # stays open until it is sent, and authentication shares it.
     db: Session = Depends(get_db),
 ):
-    return crud.create_subscription(db=db, subscription=subscription)
+    """Stream every matching subscription as NDJSON or CSV; declared before
+    ``/subscriptions/{subscription_id}`` so ``export`` is not taken for an id."""
+    statement = export_query(
+        user_id=user_id,
+        magazine_id=magazine_id,
+        is_active=is_active,
+        renewal_from=renewal_from,
+        renewal_to=renewal_to,
+    )
+    return StreamingResponse(
+        stream_export(db, statement, format, settings.export_batch_size),
+        media_type=MEDIA_TYPES[format],
+    )
 
 
 @router.get("/subscriptions/{subscription_id}", response_model=schemas.Subscription)
-def get_subscription(subscription_id: int, db: Session = Depends(get_db)):
-    return crud.get_subscription(db, subscription_id)
+async def get_subscription(
+    subscription_id: int, db: Session = Depends(get_db, scope="function")
+):
+    return await run_db(db, crud.get_subscription, subscription_id)
 
 
 @router.put("/subscriptions/{subscription_id}", response_model=schemas.Subscription)
-def update_subscription(
+async def update_subscription(
     subscription_id: int,
     subscription: schemas.SubscriptionUpdate,
     current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
 ):
-    return crud.update_subscription(db, subscription_id, subscription)
+    return await run_db(db, crud.update_subscription, subscription_id, subscription)
 
 
 @router.delete("/subscriptions/{subscription_id}", response_model=schemas.Subscription)
-def delete_subscription(
+async def delete_subscription(
     subscription_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: schemas.User = Depends(get_current_user),
 ):
-    return crud.deactivate_subscription(db, subscription_id, user_id=current_user.id)
+    return await run_db(
+        db, crud.deactivate_subscription, subscription_id, user_id=current_user.id
+    )
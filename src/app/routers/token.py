@@ -1,28 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException
+import hashlib
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from datetime import timedelta
-from jose import JWTError, jwt
 
 from app import schemas, models, crud
-from app.database import get_db
-from app.core.jwt import create_access_token
-from app.dependencies import authenticate_user
+from app.db.session import get_db
+from app.core.config import settings
+from app.core.jwt import token_service
+from app.core.responses import FastJSONRoute
+from app.dependencies import authenticate_user, client_ip
 
-router = APIRouter(tags=["token"])
+router = APIRouter(tags=["token"], route_class=FastJSONRoute)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
 @router.post("/token/", response_model=schemas.Token)
 async def login_for_access_token(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+    request: Request,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_db, scope="function"),
 ):
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(
+        db, form_data.username, form_data.password, client_ip(request)
+    )
     if not user:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
-    access_token_expires = timedelta(minutes=30)  # adjust as necessary
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    access_token = token_service.create_access_token(data={"sub": user.username})
+    return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.get("/.well-known/jwks.json")
+def get_jwks(request: Request):
+    body = json.dumps(token_service.jwks(), separators=(",", ":")).encode()
+    headers = {
+        "Cache-Control": f"public, max-age={settings.jwks_max_age_seconds}",
+        "ETag": f'"{hashlib.sha256(body).hexdigest()}"',
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
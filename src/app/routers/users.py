@@ -1,23 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from jose import JWTError, jwt
+from jose import JWTError
 from typing import List
 from pydantic import BaseModel
-from datetime import timedelta
+from datetime import datetime, timezone
+import uuid
 
 from app import schemas, models, crud
-from app.database import get_db
-from app.dependencies import get_current_user
-from app.core.jwt import (
-    create_access_token,
-    create_refresh_token,
-    verify_password,
-    SECRET_KEY,
-    ALGORITHM,
+from app.db.session import get_db, run_db
+from app.dependencies import (
+    authenticate_user,
+    client_ip,
+    get_current_user,
+    get_principal,
 )
+from app.core.hashing import password_hasher
+from app.core.jwt import REFRESH_TOKEN_TYPE, token_service
+from app.core.responses import FastJSONRoute
+from app.core.revocation import revocation_filter
 
-router = APIRouter(tags=["users"])
+router = APIRouter(tags=["users"], route_class=FastJSONRoute)
 
 
 class UserLogin(BaseModel):
@@ -26,24 +29,36 @@ class UserLogin(BaseModel):
 
 
 @router.post("/users/register", response_model=schemas.User)
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    return crud.create_user(db=db, user=user)
+async def register_user(
+    user: schemas.UserCreate, db: Session = Depends(get_db, scope="function")
+):
+    # Hashed here, on the process pool, rather than inside run_db: with an
+    # AsyncSession crud runs on the event loop thread.
+    hashed_password = await password_hasher.hash(user.password)
+    return await run_db(db, crud.create_user, user, hashed_password)
 
 
 @router.post("/users/login")
-def login_user(user_login: UserLogin, db: Session = Depends(get_db)):
-    user = authenticate_user(db, user_login.username, user_login.password)
+async def login_user(
+    request: Request,
+    user_login: UserLogin,
+    db: Session = Depends(get_db, scope="function"),
+):
+    user = await authenticate_user(
+        db, user_login.username, user_login.password, client_ip(request)
+    )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(minutes=30)
-    access_token = create_access_token(
-        data={"sub": str(user.username)}, expires_delta=access_token_expires
+    access_token = token_service.create_access_token(data={"sub": str(user.username)})
+    family_id = uuid.uuid4().hex
+    refresh_token, jti, expires_at = issue_refresh_token(user.username, family_id)
+    await run_db(
+        db, crud.create_refresh_token_record, jti, family_id, user.id, expires_at
     )
-    refresh_token = create_refresh_token(data={"sub": str(user.username)})
     return {
         "access_token": access_token,
         "token_type": "bearer",
@@ -51,31 +66,40 @@ def login_user(user_login: UserLogin, db: Session = Depends(get_db)):
     }
 
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = db.query(models.User).filter(models.User.username == username).first()
-    if not user or not verify_password(password, user.hashed_password):
-        return None
-    return user
+def issue_refresh_token(username: str, family_id: str):
+    jti = uuid.uuid4().hex
+    refresh_token = token_service.create_refresh_token(
+        data={"sub": str(username), "jti": jti, "fam": family_id}
+    )
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return refresh_token, jti, now + token_service.refresh_token_ttl
 
 
 @router.post("/users/reset-password", response_model=schemas.User)
-def reset_password(email: str, db: Session = Depends(get_db)):
-    return crud.reset_user_password(db, email, "")
+async def reset_password(email: str, db: Session = Depends(get_db, scope="function")):
+    # Hashing up front also keeps unknown emails from answering faster.
+    hashed_password = await password_hasher.hash("")
+    return await run_db(db, crud.reset_user_password, email, hashed_password)
 
 
 @router.delete("/users/deactivate/{username}", response_model=schemas.User)
-def deactivate_user(
+async def deactivate_user(
     username: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user: schemas.User = Depends(get_current_user),
 ):
-    return crud.deactivate_user(db, username)
+    return await run_db(db, crud.deactivate_user, username)
 
 
 @router.post("/users/token/refresh")
-def refresh_token(
-    request: Request, current_user: schemas.User = Depends(get_current_user)
+async def refresh_token(
+    request: Request, db: Session = Depends(get_db, scope="function")
 ):
+    invalid_token_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
     auth_header = request.headers.get("Authorization")
     if not auth_header:
         raise HTTPException(
@@ -92,24 +116,61 @@ def refresh_token(
                 detail="Invalid token type",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = token_service.decode(refresh_token)
         username: str = payload.get("sub")
-        if username is None:
+        jti: str = payload.get("jti")
+        family_id: str = payload.get("fam")
+        if username is None or jti is None or payload.get("typ") != REFRESH_TOKEN_TYPE:
             raise JWTError
     except (JWTError, ValueError):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid refresh token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    new_access_token = create_access_token(data={"sub": username})
+        raise invalid_token_exception
+
+    new_refresh_token = await run_db(db, rotate_refresh_token, username, jti, family_id)
+    if new_refresh_token is None:
+        raise invalid_token_exception
+
+    new_access_token = token_service.create_access_token(data={"sub": username})
     return {
         "access_token": new_access_token,
         "token_type": "bearer",
-        "refresh_token": refresh_token,
+        "refresh_token": new_refresh_token,
     }
 
 
+def rotate_refresh_token(db: Session, username: str, jti: str, family_id: str):
+    """Swap a refresh token for its successor; None if it may not be used."""
+    # Refresh tokens are single use. The filter answers "not revoked" without a
+    # query; a hit is confirmed in the database because it may be a false
+    # positive. Replaying a rotated token revokes the whole family.
+    revocation_filter.maybe_sync(
+        lambda since: crud.get_revoked_refresh_tokens(db, since)
+    )
+    if revocation_filter.might_be_revoked(jti) and crud.is_refresh_token_revoked(
+        db, jti
+    ):
+        revoke_family(db, family_id)
+        return None
+
+    user = get_principal(db, username)
+    if user is None or not user.is_active:
+        return None
+    new_refresh_token, new_jti, expires_at = issue_refresh_token(username, family_id)
+    if not crud.rotate_refresh_token(db, jti, new_jti, family_id, user.id, expires_at):
+        revoke_family(db, family_id)
+        return None
+    revocation_filter.add(jti)
+    return new_refresh_token
+
+
+def revoke_family(db: Session, family_id: str):
+    # The request fails with 401 and its unit of work rolls back, so the
+    # revocation commits here on its own.
+    crud.revoke_refresh_token_family(db, family_id)
+    db.commit()
+
+
 @router.get("/users/me", response_model=schemas.User)
-def get_current_user_profile(current_user: schemas.User = Depends(get_current_user)):
+async def get_current_user_profile(
+    current_user: schemas.User = Depends(get_current_user),
+):
     return current_user
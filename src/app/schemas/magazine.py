@@ -4,12 +4,19 @@ from datetime import datetime
 
 from app.schemas.plan import Plan
 
+
 class MagazineBase(BaseModel):
     name: str
     description: str
     base_price: float
 
 
+class MagazineSummary(MagazineBase):
+    """A magazine without its plans, for reads that did not load them."""
+
+    id: int
+
+
 class Magazine(MagazineBase):
     id: int
     plans: List[Plan] = []
@@ -25,4 +32,4 @@ class MagazineCreate(MagazineBase):
 class MagazineUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
-    base_price: Optional[float] = None
\ No newline at end of file
+    base_price: Optional[float] = None
@@ -27,4 +27,32 @@ class SubscriptionUpdate(BaseModel):
     user_id: Optional[int] = None
     magazine_id: Optional[int] = None
     plan_id: Optional[int] = None
-    renewal_date: Optional[datetime] = None
\ No newline at end of file
+    renewal_date: Optional[datetime] = None
+
+
+class SubscriptionImportError(BaseModel):
+    row: int
+    error: str
+
+
+class SubscriptionImportResult(BaseModel):
+    received: int
+    inserted: int
+    rejected: int
+    errors: List[SubscriptionImportError]
+    errors_truncated: bool
+
+
+class RepricingRequest(BaseModel):
+    magazine_id: Optional[int] = None
+    plan_id: Optional[int] = None
+    dry_run: bool = False
+
+
+class RepricingResult(BaseModel):
+    dry_run: bool
+    batches: int
+    repriced: int
+    total_delta: float
+    min_delta: Optional[float] = None
+    max_delta: Optional[float] = None
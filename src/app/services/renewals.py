@@ -0,0 +1,182 @@
+"""Subscription renewal worker.
+
+Run any number of workers side by side from ``src/``::
+
+    python -m app.services.renewals --batch-size 500
+
+Each batch claims the oldest due subscriptions (active, ``renewal_date`` in
+the past) with ``FOR UPDATE SKIP LOCKED``, so concurrent workers split the
+backlog instead of queueing on the same rows. Every claimed subscription has
+its ``renewal_date`` advanced by its plan's ``renewal_period`` (in months) and
+its price recomputed from the current magazine price and plan discount, and
+the batch commits as a whole.
+
+SQLite has no row locks and ignores the claim; the renewal UPDATE only applies
+while ``renewal_date`` is still the value that was read, so a row claimed by
+two workers is renewed once.
+"""
+
+import argparse
+import calendar
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional, Tuple
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+
+from app import crud, models
+from app.core.config import settings
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """``value`` moved on by ``months`` calendar months, clamped to month end."""
+    month = value.month - 1 + months
+    year, month = value.year + month // 12, month % 12 + 1
+    return value.replace(
+        year=year, month=month, day=min(value.day, calendar.monthrange(year, month)[1])
+    )
+
+
+class RenewalStats:
+    """Throughput and lag of one worker since it started."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.batches = 0
+        self.renewed = 0
+        self.skipped = 0
+        self.lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+
+    def record(self, claimed: int, renewed: int, lag_seconds: float):
+        with self._lock:
+            if claimed:
+                self.batches += 1
+            self.renewed += renewed
+            self.skipped += claimed - renewed
+            self.lag_seconds = lag_seconds
+            self.max_lag_seconds = max(self.max_lag_seconds, lag_seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            return {
+                "batches": self.batches,
+                "renewed": self.renewed,
+                "skipped": self.skipped,
+                "renewals_per_sec": (
+                    round(self.renewed / elapsed, 1) if elapsed else 0.0
+                ),
+                "lag_seconds": round(self.lag_seconds, 3),
+                "max_lag_seconds": round(self.max_lag_seconds, 3),
+            }
+
+
+def renew_batch(
+    db: Session, batch_size: int, now: Optional[datetime] = None
+) -> Tuple[int, int, float]:
+    """Renew up to ``batch_size`` due subscriptions in one transaction.
+
+    Returns how many rows were claimed, how many of them were renewed, and the
+    lag: how long the oldest claimed subscription has been overdue.
+    """
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    due = db.execute(
+        select(
+            models.Subscription.id,
+            models.Subscription.renewal_date,
+            models.Plan.renewal_period,
+            models.Plan.discount,
+            models.Magazine.base_price,
+        )
+        .join(models.Plan, models.Plan.id == models.Subscription.plan_id)
+        .join(models.Magazine, models.Magazine.id == models.Subscription.magazine_id)
+        .where(
+            models.Subscription.is_active == True,
+            models.Subscription.renewal_date <= now,
+            models.Plan.renewal_period > 0,
+        )
+        .order_by(models.Subscription.renewal_date)
+        .limit(batch_size)
+        .with_for_update(of=models.Subscription, skip_locked=True)
+    ).all()
+    if not due:
+        db.rollback()
+        return 0, 0, 0.0
+
+    subscriptions = models.Subscription.__table__
+    result = db.execute(
+        update(subscriptions)
+        .where(
+            subscriptions.c.id == bindparam("b_id"),
+            subscriptions.c.renewal_date == bindparam("b_due"),
+        )
+        .values(renewal_date=bindparam("b_next"), price=bindparam("b_price")),
+        [
+            {
+                "b_id": row.id,
+                "b_due": row.renewal_date,
+                "b_next": add_months(row.renewal_date, row.renewal_period),
+                "b_price": crud.calculate_subscription_price(
+                    row.base_price, row.discount
+                ),
+            }
+            for row in due
+        ],
+    )
+    # Drivers that cannot count an executemany held the row locks anyway.
+    renewed = result.rowcount if result.supports_sane_multi_rowcount() else len(due)
+    db.commit()
+    return len(due), renewed, (now - due[0].renewal_date).total_seconds()
+
+
+def run(
+    session_factory: Callable[[], Session],
+    batch_size: int = settings.renewal_batch_size,
+    poll_seconds: float = settings.renewal_poll_seconds,
+    once: bool = False,
+    now: Optional[Callable[[], datetime]] = None,
+    report: Optional[Callable[[dict], None]] = None,
+) -> RenewalStats:
+    """Renew batches until nothing is due; then exit (``once``) or poll."""
+    stats = RenewalStats()
+    while True:
+        with session_factory() as db:
+            claimed, renewed, lag = renew_batch(db, batch_size, now() if now else None)
+        stats.record(claimed, renewed, lag)
+        if claimed:
+            if report is not None:
+                report(stats.snapshot())
+            continue
+        if once:
+            return stats
+        time.sleep(poll_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Renew due subscriptions.")
+    parser.add_argument("--batch-size", type=int, default=settings.renewal_batch_size)
+    parser.add_argument(
+        "--poll-seconds", type=float, default=settings.renewal_poll_seconds
+    )
+    parser.add_argument("--once", action="store_true", help="exit once nothing is due")
+    args = parser.parse_args()
+
+    from app.db.session import SessionLocal
+
+    stats = run(
+        SessionLocal,
+        batch_size=args.batch_size,
+        poll_seconds=args.poll_seconds,
+        once=args.once,
+        report=lambda snapshot: print(json.dumps(snapshot), flush=True),
+    )
+    print(json.dumps(stats.snapshot()), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Set-based repricing of subscriptions after a pricing input changes.
+
+A magazine's ``base_price`` and a plan's ``discount`` feed every subscription
+price. Rather than loading subscriptions, repricing walks the affected ones in
+id ranges of ``batch_size`` and rewrites each range with one
+``UPDATE ... FROM`` join against magazines and plans. Run on its own it
+commits per range so locks stay short; inline after an update it joins the
+request's unit of work instead. Rows whose price is already right are left
+untouched.
+"""
+
+from typing import Optional
+
+from fastapi import BackgroundTasks, HTTPException
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, SessionLocal, run_db
+
+# The same formula as crud.calculate_subscription_price, evaluated in SQL.
+PRICE = models.Magazine.base_price * (1 - models.Plan.discount)
+
+
+def _scope(magazine_id: Optional[int], plan_id: Optional[int]) -> list:
+    if magazine_id is None and plan_id is None:
+        raise HTTPException(
+            status_code=422, detail="Give a magazine_id or plan_id to reprice"
+        )
+    scope = [models.Subscription.is_active == True]
+    if magazine_id is not None:
+        scope.append(models.Subscription.magazine_id == magazine_id)
+    if plan_id is not None:
+        scope.append(models.Subscription.plan_id == plan_id)
+    return scope
+
+
+def _next_bound(db: Session, scope: list, after_id: int, batch_size: int):
+    """The highest id among the next ``batch_size`` subscriptions in scope."""
+    ids = (
+        select(models.Subscription.id)
+        .where(*scope, models.Subscription.id > after_id)
+        .order_by(models.Subscription.id)
+        .limit(batch_size)
+        .subquery()
+    )
+    return db.execute(select(func.max(ids.c.id))).scalar()
+
+
+def reprice(
+    db: Session,
+    magazine_id: Optional[int] = None,
+    plan_id: Optional[int] = None,
+    dry_run: bool = False,
+    batch_size: Optional[int] = None,
+    commit: bool = True,
+) -> schemas.RepricingResult:
+    """Bring active subscriptions of a magazine and/or plan up to date.
+
+    With ``dry_run`` nothing is written; the result reports what would change.
+    Without ``commit`` the batches are left to the caller's transaction.
+    """
+    scope = _scope(magazine_id, plan_id)
+    batch_size = batch_size or settings.reprice_batch_size
+    batches, repriced, total_delta, deltas = 0, 0, 0.0, []
+    after_id = 0
+    while (upper := _next_bound(db, scope, after_id, batch_size)) is not None:
+        stale = [
+            *scope,
+            models.Subscription.id > after_id,
+            models.Subscription.id <= upper,
+            models.Subscription.magazine_id == models.Magazine.id,
+            models.Subscription.plan_id == models.Plan.id,
+            models.Subscription.price.is_distinct_from(PRICE),
+        ]
+        delta = PRICE - func.coalesce(models.Subscription.price, 0)
+        count, total, smallest, largest = db.execute(
+            select(func.count(), func.sum(delta), func.min(delta), func.max(delta))
+            .select_from(models.Subscription, models.Magazine, models.Plan)
+            .where(*stale)
+        ).one()
+        if count and not dry_run:
+            db.execute(
+                update(models.Subscription)
+                .where(*stale)
+                .values(price=PRICE)
+                .execution_options(synchronize_session=False)
+            )
+            if commit:
+                db.commit()
+        batches += 1
+        if count:
+            repriced += count
+            total_delta += total
+            deltas += [smallest, largest]
+        after_id = upper
+    if dry_run:
+        db.rollback()
+    elif commit:
+        db.commit()
+    return schemas.RepricingResult(
+        dry_run=dry_run,
+        batches=batches,
+        repriced=repriced,
+        total_delta=round(total_delta, 2),
+        min_delta=min(deltas, default=None),
+        max_delta=max(deltas, default=None),
+    )
+
+
+async def reprice_in_own_session(**kwargs) -> schemas.RepricingResult:
+    """``reprice`` on a session of its own, committing per batch: background
+    tasks run after the request's session has committed and closed."""
+    if settings.database_async:
+        async with AsyncSessionLocal() as db:
+            return await run_db(db, reprice, **kwargs)
+    with SessionLocal() as db:
+        return await run_db(db, reprice, **kwargs)
+
+
+async def reprice_after_update(
+    db: Session,
+    background_tasks: BackgroundTasks,
+    magazine_id: Optional[int] = None,
+    plan_id: Optional[int] = None,
+):
+    """Reprice with the update, or after the response (committing per batch)
+    when ``reprice_in_background``."""
+    if settings.reprice_in_background:
+        background_tasks.add_task(
+            reprice_in_own_session, magazine_id=magazine_id, plan_id=plan_id
+        )
+    else:
+        await run_db(
+            db, reprice, magazine_id=magazine_id, plan_id=plan_id, commit=False
+        )
@@ -0,0 +1,240 @@
+"""Bulk subscription import.
+
+Rows arrive as a CSV or NDJSON stream and are validated in chunks. The body
+is split into records on newlines, except inside a quoted CSV field; a record
+longer than ``max_row_bytes`` refuses the import with a 413. Valid rows
+are loaded into a per-connection staging table (COPY on psycopg2, executemany
+elsewhere). One set-wise statement then merges them into ``subscriptions``,
+computing each price from the joined magazine and plan, and a single query
+reports why each rejected row was refused.
+"""
+
+import csv
+import io
+from typing import AsyncIterable, List, Optional
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table, text
+from sqlalchemy.orm import Session
+
+from app import schemas
+
+FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+CSV_COLUMNS = ("user_id", "magazine_id", "plan_id", "renewal_date")
+
+staging = Table(
+    "subscription_import",
+    MetaData(),
+    Column("row_number", Integer, primary_key=True),
+    Column("user_id", Integer),
+    Column("magazine_id", Integer),
+    Column("plan_id", Integer),
+    Column("renewal_date", DateTime),
+    prefixes=["TEMPORARY"],
+)
+
+# Every staged row with the reason it cannot be merged, or NULL if it can.
+# Repeats of the same combination within one import keep the first row only.
+CHECKED = """
+WITH checked AS (
+    SELECT s.row_number, s.user_id, s.magazine_id, s.plan_id, s.renewal_date,
+           m.base_price * (1 - p.discount) AS price,
+           CASE
+               WHEN u.id IS NULL THEN 'User not found'
+               WHEN m.id IS NULL OR p.id IS NULL THEN 'Magazine or Plan not found'
+               WHEN m.base_price * (1 - p.discount) <= 0
+                   THEN 'Price must be greater than zero'
+               WHEN x.id IS NOT NULL OR s.occurrence > 1
+                   THEN 'Subscription already exists'
+           END AS error
+    FROM (
+        SELECT subscription_import.*, ROW_NUMBER() OVER (
+            PARTITION BY user_id, magazine_id, plan_id ORDER BY row_number
+        ) AS occurrence
+        FROM subscription_import
+    ) AS s
+    LEFT JOIN users u ON u.id = s.user_id
+    LEFT JOIN magazines m ON m.id = s.magazine_id
+    LEFT JOIN plans p ON p.id = s.plan_id
+    LEFT JOIN subscriptions x ON x.user_id = s.user_id
+        AND x.magazine_id = s.magazine_id AND x.plan_id = s.plan_id
+)
+"""
+REJECTED = CHECKED + """
+SELECT row_number, error FROM checked WHERE error IS NOT NULL
+ORDER BY row_number LIMIT :limit
+"""
+# The statement leads with INSERT so every driver reports its rowcount.
+MERGE = (
+    """
+INSERT INTO subscriptions (user_id, magazine_id, plan_id, price, renewal_date, is_active)
+"""
+    + CHECKED
+    + """
+SELECT user_id, magazine_id, plan_id, price, renewal_date, TRUE
+FROM checked WHERE error IS NULL
+ON CONFLICT (user_id, magazine_id, plan_id) DO NOTHING
+"""
+)
+
+
+def _describe(error: ValidationError) -> str:
+    first = error.errors()[0]
+    location = ".".join(str(part) for part in first["loc"])
+    return f"{location}: {first['msg']}" if location else first["msg"]
+
+
+class SubscriptionImport:
+    """One import run; all of its database work shares a single session."""
+
+    def __init__(self, fmt: str, chunk_size: int, max_errors: int, max_row_bytes: int):
+        self.fmt = fmt
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.max_row_bytes = max_row_bytes
+        self.received = 0
+        self.errors: List[schemas.SubscriptionImportError] = []
+        self._header: Optional[List[str]] = None
+
+    def _reject(self, row_number: int, error: str):
+        if len(self.errors) < self.max_errors:
+            self.errors.append(
+                schemas.SubscriptionImportError(row=row_number, error=error)
+            )
+
+    def _parse(self, raw: bytes) -> Optional[schemas.SubscriptionCreate]:
+        line = raw.decode()
+        if self.fmt == "ndjson":
+            return schemas.SubscriptionCreate.model_validate_json(line)
+        values = next(csv.reader([line]))
+        if self._header is None:
+            self._header = [value.strip() for value in values]
+            missing = set(CSV_COLUMNS) - set(self._header)
+            if missing:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"CSV header is missing {', '.join(sorted(missing))}",
+                )
+            return None
+        return schemas.SubscriptionCreate.model_validate(
+            dict(zip(self._header, values))
+        )
+
+    def _rows(self, lines: List[bytes]) -> List[dict]:
+        rows = []
+        for line in lines:
+            if not line.strip():
+                continue
+            row_number = self.received + 1
+            try:
+                subscription = self._parse(line)
+            except ValidationError as e:
+                self.received += 1
+                self._reject(row_number, _describe(e))
+                continue
+            except (csv.Error, UnicodeDecodeError) as e:
+                if self.fmt == "csv" and self._header is None:
+                    raise HTTPException(
+                        status_code=400, detail=f"CSV header is unreadable: {e}"
+                    )
+                self.received += 1
+                self._reject(row_number, str(e))
+                continue
+            if subscription is None:
+                continue
+            self.received += 1
+            rows.append({"row_number": row_number, **subscription.model_dump()})
+        return rows
+
+    async def chunks(self, stream: AsyncIterable[bytes]):
+        """Validated rows from the request body, ``chunk_size`` at a time."""
+        # ``record`` holds the lines of a CSV record whose quoted field is
+        # still open: an odd number of quotes so far (an escaped "" counts
+        # twice), so its newlines are part of the field.
+        pending, record, quoted, lines = b"", b"", False, []
+        async for data in stream:
+            pending += data
+            *complete, pending = pending.split(b"\n")
+            for line in complete:
+                record += line
+                self._check_size(len(record))
+                if self.fmt == "csv":
+                    quoted ^= line.count(b'"') % 2 == 1
+                if quoted:
+                    record += b"\n"
+                    continue
+                lines.append(record)
+                record = b""
+            self._check_size(len(record) + len(pending))
+            if len(lines) >= self.chunk_size:
+                yield self._rows(lines)
+                lines = []
+        if record or pending:
+            lines.append(record + pending)
+        if lines:
+            yield self._rows(lines)
+
+    def _check_size(self, size: int):
+        if size > self.max_row_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Import rows are limited to {self.max_row_bytes} bytes",
+            )
+
+    def begin(self, db: Session):
+        connection = db.connection()
+        staging.drop(connection, checkfirst=True)
+        staging.create(connection)
+
+    def load(self, db: Session, rows: List[dict]):
+        if not rows:
+            return
+        connection = db.connection()
+        cursor = connection.connection.dbapi_connection.cursor()
+        if hasattr(cursor, "copy_expert"):
+            # psycopg2: stream the chunk through COPY instead of INSERTs.
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow(
+                    [row["row_number"], *(row[column] for column in CSV_COLUMNS)]
+                )
+            buffer.seek(0)
+            cursor.copy_expert(
+                "COPY subscription_import (row_number, user_id, magazine_id,"
+                " plan_id, renewal_date) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+            cursor.close()
+        else:
+            cursor.close()
+            connection.execute(staging.insert(), rows)
+
+    def finish(self, db: Session) -> schemas.SubscriptionImportResult:
+        connection = db.connection()
+        limit = max(self.max_errors - len(self.errors), 0)
+        rejected = connection.execute(text(REJECTED), {"limit": limit}).all()
+        inserted = connection.execute(text(MERGE)).rowcount
+        staging.drop(connection)
+
+        errors = self.errors + [
+            schemas.SubscriptionImportError(row=row_number, error=error)
+            for row_number, error in rejected
+        ]
+        errors.sort(key=lambda error: error.row)
+        return schemas.SubscriptionImportResult(
+            received=self.received,
+            inserted=inserted,
+            rejected=self.received - inserted,
+            errors=errors,
+            errors_truncated=self.received - inserted > len(errors),
+        )
+
+
+def detect_format(content_type: Optional[str]) -> Optional[str]:
+    return FORMATS.get((content_type or "").split(";")[0].strip().lower())
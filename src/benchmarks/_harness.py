@@ -0,0 +1,78 @@
+import os
+import socket
+import threading
+import time
+
+BENCH_DATABASE_URL = "sqlite:///./bench.db"
+
+
+def use_bench_database():
+    """Point the app at a throwaway database unless one is configured."""
+    os.environ.setdefault("DATABASE_URL", BENCH_DATABASE_URL)
+    return os.environ["DATABASE_URL"]
+
+
+def cleanup_bench_database():
+    if os.environ.get("DATABASE_URL") == BENCH_DATABASE_URL and os.path.exists(
+        "bench.db"
+    ):
+        os.remove("bench.db")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class ServerThread:
+    """Runs the app under uvicorn in a background thread."""
+
+    def __init__(self, app, port: int = 0):
+        import uvicorn
+
+        self.port = port or free_port()
+        # Keep-alive outlasts any queueing so pooled client connections are
+        # never closed under the client mid-run.
+        config = uvicorn.Config(
+            app,
+            host="127.0.0.1",
+            port=self.port,
+            log_level="warning",
+            timeout_keep_alive=120,
+        )
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples) -> dict:
+    """Latency summary in milliseconds."""
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "max_ms": round(max(samples, default=0) * 1000, 2),
+    }
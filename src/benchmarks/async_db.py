@@ -0,0 +1,117 @@
+"""Request throughput of the sync Session path vs the AsyncSession path.
+
+Run from ``src/``::
+
+    python -m benchmarks.async_db --requests 4000 --concurrency 200
+
+Uses a throwaway SQLite database through aiosqlite unless ``DATABASE_URL``
+points at Postgres (then asyncpg). Both modes serve the same app in the same
+process; only the ``get_db`` dependency differs.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from benchmarks._harness import (
+    ServerThread,
+    cleanup_bench_database,
+    summarize,
+    use_bench_database,
+)
+
+
+async def hammer(base_url, path, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    samples, statuses = [], {}
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=60, limits=limits
+    ) as client:
+
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path)
+                samples.append(time.perf_counter() - started)
+                statuses[response.status_code] = (
+                    statuses.get(response.status_code, 0) + 1
+                )
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+    return {
+        "statuses": statuses,
+        "requests_per_sec": round(requests / elapsed, 1),
+        "latency": summarize(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--path", default="/plans/")
+    args = parser.parse_args()
+
+    url = use_bench_database()
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    from app import models
+    from app.db.session import (
+        SessionLocal,
+        async_database_url,
+        create_db_engine,
+        get_db,
+    )
+    from app.main import app
+
+    with SessionLocal() as db:
+        db.add_all(
+            models.Plan(
+                title=f"Plan {i}",
+                description="benchmark",
+                renewal_period=1,
+                tier=1,
+                discount=0.0,
+            )
+            for i in range(args.rows)
+        )
+        db.commit()
+
+    async_engine = create_db_engine(async_database_url(url), asynchronous=True)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+
+    async def get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    results = {}
+    try:
+        with ServerThread(app) as server:
+            results["sync"] = asyncio.run(
+                hammer(server.base_url, args.path, args.requests, args.concurrency)
+            )
+            app.dependency_overrides[get_db] = get_async_db
+            results["async"] = asyncio.run(
+                hammer(server.base_url, args.path, args.requests, args.concurrency)
+            )
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        cleanup_bench_database()
+    print(
+        json.dumps(
+            {"path": args.path, "concurrency": args.concurrency, **results}, indent=2
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Bulk subscription import throughput.
+
+Run from ``src/``::
+
+    python -m benchmarks.bulk_import --rows 100000
+
+One user subscribes to ``--rows`` distinct (magazine, plan) combinations,
+posted as a single CSV body to ``/subscriptions/import``. On PostgreSQL with
+psycopg2 the rows are staged through COPY; elsewhere through executemany.
+"""
+
+import argparse
+import json
+import math
+import time
+
+import httpx
+from sqlalchemy import text
+
+from benchmarks._harness import ServerThread, cleanup_bench_database, use_bench_database
+
+
+def seed(engine, rows: int):
+    """A user plus enough magazines and plans to give ``rows`` combinations."""
+    side = math.isqrt(rows - 1) + 1
+    with engine.begin() as connection:
+        user_id = connection.execute(
+            text(
+                "INSERT INTO users (username, email, hashed_password, is_active)"
+                " VALUES ('importer', 'importer@example.com', 'x', TRUE) RETURNING id"
+            )
+        ).scalar()
+        magazine_ids = [
+            connection.execute(
+                text(
+                    "INSERT INTO magazines (name, description, base_price)"
+                    " VALUES (:name, 'bench', 10) RETURNING id"
+                ),
+                {"name": f"Imported {i}"},
+            ).scalar()
+            for i in range(side)
+        ]
+        plan_ids = [
+            connection.execute(
+                text(
+                    "INSERT INTO plans (title, description, renewal_period, tier, discount)"
+                    " VALUES (:title, 'bench', 1, 1, 0.1) RETURNING id"
+                ),
+                {"title": f"Imported {i}"},
+            ).scalar()
+            for i in range(side)
+        ]
+    return user_id, [(m, p) for m in magazine_ids for p in plan_ids][:rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    use_bench_database()
+    from app.db.session import engine
+    from app.main import app
+
+    try:
+        user_id, combinations = seed(engine, args.rows)
+        body = "user_id,magazine_id,plan_id,renewal_date\n" + "".join(
+            f"{user_id},{magazine_id},{plan_id},2030-01-01\n"
+            for magazine_id, plan_id in combinations
+        )
+        with ServerThread(app) as server:
+            with httpx.Client(base_url=server.base_url, timeout=600) as client:
+                response = client.post(
+                    "/users/register",
+                    json={
+                        "username": "bulkadmin",
+                        "email": "bulkadmin@example.com",
+                        "password": "benchpassword",
+                    },
+                )
+                response = client.post(
+                    "/token/",
+                    data={"username": "bulkadmin", "password": "benchpassword"},
+                )
+                headers = {
+                    "Authorization": f"Bearer {response.json()['access_token']}",
+                    "Content-Type": "text/csv",
+                }
+                started = time.perf_counter()
+                response = client.post(
+                    "/subscriptions/import", content=body, headers=headers
+                )
+                elapsed = time.perf_counter() - started
+        result = response.json()
+        summary = {
+            "dialect": engine.dialect.name,
+            "driver": engine.dialect.driver,
+            "rows": args.rows,
+            "inserted": result["inserted"],
+            "rejected": result["rejected"],
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(args.rows / elapsed, 1),
+        }
+    finally:
+        cleanup_bench_database()
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
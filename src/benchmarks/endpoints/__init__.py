@@ -0,0 +1,20 @@
+"""Per-route throughput and latency of every router, for release baselines.
+
+Run from ``src/``::
+
+    python -m benchmarks.endpoints --scale 1 --output bench-1.4.0.json
+    python -m benchmarks.endpoints --baseline bench-1.4.0.json --output bench-1.5.0.json
+
+A fresh database is seeded at ``--scale`` (see ``dataset.PER_SCALE``), then
+every route of the token, users, magazines, plans and subscriptions routers
+is driven in turn with ``--concurrency`` requests in flight. Rows and request
+choices come from ``--seed``, so runs with the same arguments send the same
+requests. The report holds RPS, status counts and p50/p95/p99 per route; with
+``--baseline`` routes that regressed beyond ``--tolerance`` are listed and
+the exit status is 1.
+
+By default the app runs in-process under uvicorn against ``bench.db``. With
+``--url`` an already running server is driven instead; DATABASE_URL and the
+JWT settings must then match that server's, since seeding and token minting
+happen here.
+"""
@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from benchmarks._harness import (
+    ServerThread,
+    cleanup_bench_database,
+    use_bench_database,
+)
+from benchmarks.endpoints import __doc__ as DOC
+from benchmarks.endpoints.load import compare, run
+from benchmarks.endpoints.scenarios import ROUTERS, SCENARIOS
+
+
+def revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=DOC.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument(
+        "--hash-requests",
+        type=int,
+        default=20,
+        help="requests for routes that hash a password",
+    )
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--routers", nargs="+", choices=sorted(ROUTERS), default=sorted(ROUTERS)
+    )
+    parser.add_argument("--url", help="drive this server instead of an in-process one")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="a previous report to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    # Every run starts from an empty database.
+    database_url = use_bench_database()
+    database = database_url.split(":", 1)[0].split("+", 1)[0]
+    cleanup_bench_database()
+    # Every request comes from one address; the per-IP login limit would turn
+    # the hashing routes into a 429 benchmark.
+    os.environ.setdefault("LOGIN_IP_PER_MINUTE", "1000000")
+    os.environ.setdefault("LOGIN_IP_BURST", "1000000")
+    from app.db.session import SessionLocal
+    from app.main import app
+    from benchmarks.endpoints.dataset import seed
+
+    scenarios = [s for s in SCENARIOS if s.router in args.routers]
+    pool = args.warmup + max(args.requests, args.hash_requests)
+    try:
+        started = time.perf_counter()
+        data = seed(SessionLocal, args.scale, pool, random.Random(args.seed))
+        seconds = round(time.perf_counter() - started, 1)
+        print(json.dumps({"seeded": args.scale, "seconds": seconds}), flush=True)
+
+        def report(name, result):
+            print(json.dumps({name: result}), flush=True)
+
+        def drive(base_url):
+            return asyncio.run(
+                run(
+                    base_url,
+                    scenarios,
+                    data,
+                    args.seed,
+                    args.requests,
+                    args.hash_requests,
+                    args.warmup,
+                    args.concurrency,
+                    report,
+                    database=database,
+                )
+            )
+
+        if args.url:
+            routes = drive(args.url)
+        else:
+            with ServerThread(app) as server:
+                routes = drive(server.base_url)
+    finally:
+        cleanup_bench_database()
+
+    result = {
+        "meta": {
+            "revision": revision(),
+            "database": database,
+            "python": platform.python_version(),
+            "scale": args.scale,
+            "requests": args.requests,
+            "hash_requests": args.hash_requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+        },
+        "routes": routes,
+    }
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            result["regressions"] = compare(json.load(baseline), result, args.tolerance)
+    body = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(body + "\n")
+    print(body)
+    if result.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Seeding the benchmark database at a given scale."""
+
+import random
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from sqlalchemy import insert, select
+
+# Rows per unit of --scale.
+PER_SCALE = {"users": 100, "magazines": 50, "plans": 200, "subscriptions": 2000}
+PASSWORD = "benchpassword"
+# Subscriptions per POST /subscriptions/import request.
+IMPORT_ROWS = 100
+
+
+@dataclass
+class Dataset:
+    """What the seeded database holds, for building requests against it.
+
+    Pools hold rows that a request uses up (a deleted plan, a consumed refresh
+    token), one per request including warmup.
+    """
+
+    username: str
+    user_id: int
+    access_token: str
+    magazine_ids: List[int]
+    plan_ids: List[int]
+    subscription_ids: List[int]
+    # The bench user's subscriptions: (id, magazine_id, plan_id)
+    owned: List[Tuple[int, int, int]]
+    # Other seeded users, to spread logins under the per-account limit.
+    logins: List[str] = field(default_factory=list)
+    free_combos: List[Tuple[int, int]] = field(default_factory=list)
+    refresh_tokens: List[str] = field(default_factory=list)
+    doomed_usernames: List[str] = field(default_factory=list)
+    doomed_emails: List[str] = field(default_factory=list)
+    doomed_magazine_ids: List[int] = field(default_factory=list)
+    doomed_plan_ids: List[int] = field(default_factory=list)
+    # (user_id, magazine_id, plan_id) rows not yet subscribed, IMPORT_ROWS
+    # per import request
+    import_batches: List[List[Tuple[int, int, int]]] = field(default_factory=list)
+
+
+def _ids(db, model, column, values) -> List[int]:
+    rows = db.execute(select(model.id, column).where(column.in_(values))).all()
+    by_value = {value: id_ for id_, value in rows}
+    return [by_value[value] for value in values]
+
+
+def seed(session_factory, scale: int, pool: int, rng: random.Random) -> Dataset:
+    """Fill an empty database with ``scale`` units of data and ``pool`` rows
+    for every pool. ``rng`` makes the data, and so every run, reproducible."""
+    from app import models
+    from app.core.hashing import password_hasher
+    from app.core.jwt import token_service
+    from app.routers.users import issue_refresh_token
+
+    counts = {name: count * scale for name, count in PER_SCALE.items()}
+    # One hash for everyone: seeding should not take minutes of bcrypt.
+    hashed_password = password_hasher.hash_sync(PASSWORD)
+    with session_factory() as db:
+        usernames = [f"bench{i}" for i in range(counts["users"] + pool)]
+        db.execute(
+            insert(models.User),
+            [
+                {
+                    "username": username,
+                    "email": f"{username}@example.com",
+                    "hashed_password": hashed_password,
+                    "is_active": True,
+                }
+                for username in usernames
+            ],
+        )
+        user_ids = _ids(db, models.User, models.User.username, usernames)
+
+        names = [f"Magazine {i}" for i in range(counts["magazines"] + pool)]
+        db.execute(
+            insert(models.Magazine),
+            [
+                {
+                    "name": name,
+                    "description": "benchmark",
+                    "base_price": rng.randint(5, 50),
+                }
+                for name in names
+            ],
+        )
+        magazine_ids = _ids(db, models.Magazine, models.Magazine.name, names)
+        magazine_ids, doomed_magazine_ids = (
+            magazine_ids[: counts["magazines"]],
+            magazine_ids[counts["magazines"] :],
+        )
+
+        titles = [f"Plan {i}" for i in range(counts["plans"] + pool)]
+        db.execute(
+            insert(models.Plan),
+            [
+                {
+                    "title": title,
+                    "description": "benchmark",
+                    "renewal_period": rng.choice((1, 3, 6, 12)),
+                    "tier": rng.randint(1, 3),
+                    "discount": rng.choice((0.0, 0.05, 0.1, 0.2)),
+                    "magazine_id": rng.choice(magazine_ids),
+                }
+                for title in titles
+            ],
+        )
+        plan_ids = _ids(db, models.Plan, models.Plan.title, titles)
+        plan_ids, doomed_plan_ids = (
+            plan_ids[: counts["plans"]],
+            plan_ids[counts["plans"] :],
+        )
+
+        # The bench user is user 0: it owns a pool of subscriptions and has a
+        # pool of (magazine, plan) combinations left to subscribe to.
+        user_id = user_ids[0]
+        combos = set()
+        while len(combos) < counts["subscriptions"] + 2 * pool:
+            combos.add(
+                (
+                    user_id if len(combos) < 2 * pool else rng.choice(user_ids),
+                    rng.choice(magazine_ids),
+                    rng.choice(plan_ids),
+                )
+            )
+        fresh = set()
+        while len(fresh) < pool * IMPORT_ROWS:
+            combo = (
+                rng.choice(user_ids),
+                rng.choice(magazine_ids),
+                rng.choice(plan_ids),
+            )
+            if combo not in combos:
+                fresh.add(combo)
+        fresh = sorted(fresh)
+        rng.shuffle(fresh)
+        combos = sorted(combos)
+        rng.shuffle(combos)
+        owned = [combo for combo in combos if combo[0] == user_id]
+        free_combos = [(magazine, plan) for _, magazine, plan in owned[:pool]]
+        taken = set(owned[:pool])
+        start = datetime(2030, 1, 1)
+        db.execute(
+            insert(models.Subscription),
+            [
+                {
+                    "user_id": user,
+                    "magazine_id": magazine,
+                    "plan_id": plan,
+                    "price": 10.0,
+                    "renewal_date": start + timedelta(days=rng.randrange(365)),
+                    "is_active": True,
+                }
+                for user, magazine, plan in combos
+                if (user, magazine, plan) not in taken
+            ],
+        )
+        subscriptions = db.execute(
+            select(
+                models.Subscription.id,
+                models.Subscription.user_id,
+                models.Subscription.magazine_id,
+                models.Subscription.plan_id,
+            ).order_by(models.Subscription.id)
+        ).all()
+
+        username = usernames[0]
+        refresh_tokens, records = [], []
+        for _ in range(pool):
+            family_id = uuid.UUID(int=rng.getrandbits(128)).hex
+            token, jti, expires_at = issue_refresh_token(username, family_id)
+            refresh_tokens.append(token)
+            records.append(
+                {
+                    "jti": jti,
+                    "family_id": family_id,
+                    "user_id": user_id,
+                    "expires_at": expires_at,
+                }
+            )
+        db.execute(insert(models.RefreshToken), records)
+        db.commit()
+
+    doomed = usernames[counts["users"] :]
+    return Dataset(
+        username=username,
+        user_id=user_id,
+        access_token=token_service.create_access_token(data={"sub": username}),
+        magazine_ids=magazine_ids,
+        plan_ids=plan_ids,
+        subscription_ids=[row.id for row in subscriptions],
+        owned=[
+            (row.id, row.magazine_id, row.plan_id)
+            for row in subscriptions
+            if row.user_id == user_id
+        ],
+        logins=usernames[1 : counts["users"]],
+        free_combos=free_combos,
+        refresh_tokens=refresh_tokens,
+        doomed_usernames=doomed,
+        doomed_emails=[f"{username}@example.com" for username in doomed],
+        doomed_magazine_ids=doomed_magazine_ids,
+        doomed_plan_ids=doomed_plan_ids,
+        import_batches=[
+            fresh[i * IMPORT_ROWS : (i + 1) * IMPORT_ROWS] for i in range(pool)
+        ],
+    )
@@ -0,0 +1,142 @@
+"""Driving scenarios concurrently and comparing reports."""
+
+import asyncio
+import random
+import time
+from typing import Dict, List
+from urllib.parse import parse_qsl
+
+import httpx
+
+from benchmarks._harness import summarize
+from benchmarks.endpoints.dataset import Dataset
+from benchmarks.endpoints.scenarios import Scenario
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    data: Dataset,
+    rng: random.Random,
+    first: int,
+    count: int,
+    concurrency: int,
+) -> dict:
+    """Send requests ``first`` to ``first + count - 1`` of ``scenario``,
+    ``concurrency`` at a time, and summarise them."""
+    path, _, query = scenario.route.partition("?")
+    # Built up front, in order, so the seeded choices never depend on timing.
+    requests = []
+    for i in range(first, first + count):
+        spec = scenario.build(i, data, rng)
+        requests.append(
+            {
+                "method": scenario.method,
+                "url": path.format(**spec.get("path", {})),
+                "params": {**dict(parse_qsl(query)), **spec.get("params", {})},
+                "headers": spec.get("headers"),
+                "json": spec.get("json"),
+                "data": spec.get("data"),
+                "content": spec.get("content"),
+            }
+        )
+
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    async def send(request):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.request(**request)
+                await response.aread()
+                status = str(response.status_code)
+            except httpx.HTTPError as exc:
+                status = type(exc).__name__
+            samples.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(send(request) for request in requests))
+    elapsed = time.perf_counter() - started
+    return {
+        "router": scenario.router,
+        "requests": count,
+        "concurrency": concurrency,
+        "statuses": statuses,
+        "errors": sum(
+            n for status, n in statuses.items() if not status.startswith("2")
+        ),
+        "rps": round(count / elapsed, 1),
+        "latency": summarize(samples),
+    }
+
+
+async def run(
+    base_url: str,
+    scenarios: List[Scenario],
+    data: Dataset,
+    seed: int,
+    requests: int,
+    hash_requests: int,
+    warmup: int,
+    concurrency: int,
+    report=None,
+    database: str = "sqlite",
+) -> Dict[str, dict]:
+    limits = httpx.Limits(max_connections=concurrency)
+    results = {}
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=120, limits=limits
+    ) as client:
+        for scenario in scenarios:
+            # Each scenario gets its own stream of choices, so running a
+            # subset of routes sends exactly the requests a full run would.
+            rng = random.Random(f"{seed}:{scenario.name}")
+            count = hash_requests if scenario.hashes else requests
+            limit = concurrency
+            if database == "sqlite" and scenario.sqlite_concurrency:
+                limit = min(concurrency, scenario.sqlite_concurrency)
+            await run_scenario(client, scenario, data, rng, 0, warmup, limit)
+            result = await run_scenario(
+                client, scenario, data, rng, warmup, count, limit
+            )
+            results[scenario.name] = result
+            if report is not None:
+                report(scenario.name, result)
+    return results
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> List[dict]:
+    """Routes that got slower than ``baseline`` by more than ``tolerance``
+    (0.2 is 20%) in p95 latency or throughput, or that fail more often."""
+    regressions = []
+    for name, result in current["routes"].items():
+        before = baseline.get("routes", {}).get(name)
+        if before is None:
+            continue
+        p95, p95_before = result["latency"]["p95_ms"], before["latency"]["p95_ms"]
+        if p95_before and p95 > p95_before * (1 + tolerance):
+            regressions.append(
+                {"route": name, "metric": "p95_ms", "before": p95_before, "now": p95}
+            )
+        if before["rps"] and result["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(
+                {
+                    "route": name,
+                    "metric": "rps",
+                    "before": before["rps"],
+                    "now": result["rps"],
+                }
+            )
+        if result["errors"] > before["errors"]:
+            regressions.append(
+                {
+                    "route": name,
+                    "metric": "errors",
+                    "before": before["errors"],
+                    "now": result["errors"],
+                }
+            )
+    return regressions
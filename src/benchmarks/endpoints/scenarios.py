@@ -0,0 +1,299 @@
+"""One scenario per route of every router.
+
+A scenario builds its ``i``-th request. Requests that use something up take
+the ``i``-th item of a dataset pool; the rest pick rows with the run's seeded
+``random.Random``, so the request sequence is the same on every run.
+"""
+
+import json
+import random
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.endpoints.dataset import PASSWORD, Dataset
+
+Build = Callable[[int, Dataset, random.Random], dict]
+
+
+@dataclass
+class Scenario:
+    router: str
+    method: str
+    route: str
+    build: Build
+    # Hashes a password per request: run --hash-requests of these instead.
+    hashes: bool = False
+    # In-flight requests on SQLite, whose single writer makes transactions
+    # that read before they write fail with "database is locked" when run
+    # side by side.
+    sqlite_concurrency: Optional[int] = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.route}"
+
+
+def _auth(data: Dataset) -> dict:
+    return {"Authorization": f"Bearer {data.access_token}"}
+
+
+def _login(i, data: Dataset) -> dict:
+    return {"username": data.logins[i % len(data.logins)], "password": PASSWORD}
+
+
+def _magazine(i, data, rng) -> dict:
+    return {"name": f"Bench {i}", "description": "bench", "base_price": 10 + i % 7}
+
+
+def _plan(i, data, rng) -> dict:
+    return {
+        "title": f"Bench {i}",
+        "description": "bench",
+        "renewal_period": 1,
+        "tier": 1,
+        "discount": 0.1,
+    }
+
+
+def _import(i, data) -> str:
+    return "".join(
+        json.dumps(
+            {
+                "user_id": user_id,
+                "magazine_id": magazine_id,
+                "plan_id": plan_id,
+                "renewal_date": "2030-01-01",
+            }
+        )
+        + "\n"
+        for user_id, magazine_id, plan_id in data.import_batches[i]
+    )
+
+
+def _owned(i, data, rng) -> dict:
+    subscription_id, magazine_id, plan_id = data.owned[-1 - i % len(data.owned)]
+    return {
+        "id": subscription_id,
+        "body": {
+            "user_id": data.user_id,
+            "magazine_id": magazine_id,
+            "plan_id": plan_id,
+            "renewal_date": f"2031-{i % 12 + 1:02d}-01",
+        },
+    }
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario(
+        "token",
+        "POST",
+        "/token/",
+        lambda i, data, rng: {"data": _login(i, data)},
+        hashes=True,
+    ),
+    Scenario("token", "GET", "/.well-known/jwks.json", lambda i, data, rng: {}),
+    Scenario(
+        "users",
+        "POST",
+        "/users/register",
+        lambda i, data, rng: {
+            "json": {
+                "username": f"registered{i}",
+                "email": f"registered{i}@example.com",
+                "password": PASSWORD,
+            }
+        },
+        hashes=True,
+    ),
+    Scenario(
+        "users",
+        "POST",
+        "/users/login",
+        lambda i, data, rng: {"json": _login(i, data)},
+        hashes=True,
+    ),
+    Scenario(
+        "users",
+        "GET",
+        "/users/me",
+        lambda i, data, rng: {"headers": _auth(data)},
+    ),
+    Scenario(
+        "users",
+        "POST",
+        "/users/token/refresh",
+        lambda i, data, rng: {
+            "headers": {"Authorization": f"Bearer {data.refresh_tokens[i]}"}
+        },
+    ),
+    Scenario(
+        "users",
+        "POST",
+        "/users/reset-password",
+        lambda i, data, rng: {"params": {"email": data.doomed_emails[i]}},
+        hashes=True,
+    ),
+    Scenario(
+        "users",
+        "DELETE",
+        "/users/deactivate/{username}",
+        lambda i, data, rng: {
+            "path": {"username": data.doomed_usernames[i]},
+            "headers": _auth(data),
+        },
+    ),
+    Scenario(
+        "magazines",
+        "GET",
+        "/magazines/",
+        lambda i, data, rng: {"params": {"limit": 50}},
+    ),
+    Scenario(
+        "magazines",
+        "GET",
+        "/magazines/?include=plans",
+        lambda i, data, rng: {"params": {"limit": 50}},
+    ),
+    Scenario(
+        "magazines",
+        "GET",
+        "/magazines/{magazine_id}",
+        lambda i, data, rng: {"path": {"magazine_id": rng.choice(data.magazine_ids)}},
+    ),
+    Scenario(
+        "magazines",
+        "POST",
+        "/magazines/",
+        lambda i, data, rng: {"json": _magazine(i, data, rng)},
+    ),
+    Scenario(
+        "magazines",
+        "PUT",
+        "/magazines/{magazine_id}",
+        lambda i, data, rng: {
+            "path": {"magazine_id": rng.choice(data.magazine_ids)},
+            "json": _magazine(i, data, rng),
+        },
+    ),
+    Scenario(
+        "magazines",
+        "DELETE",
+        "/magazines/{magazine_id}",
+        lambda i, data, rng: {"path": {"magazine_id": data.doomed_magazine_ids[i]}},
+    ),
+    Scenario(
+        "plans",
+        "GET",
+        "/plans/",
+        lambda i, data, rng: {"params": {"limit": 50}},
+    ),
+    Scenario(
+        "plans",
+        "GET",
+        "/plans/{plan_id}",
+        lambda i, data, rng: {"path": {"plan_id": rng.choice(data.plan_ids)}},
+    ),
+    Scenario(
+        "plans",
+        "POST",
+        "/plans/",
+        lambda i, data, rng: {"json": _plan(i, data, rng)},
+    ),
+    Scenario(
+        "plans",
+        "PUT",
+        "/plans/{plan_id}",
+        lambda i, data, rng: {
+            "path": {"plan_id": rng.choice(data.plan_ids)},
+            "json": {
+                **_plan(i, data, rng),
+                "magazine_id": rng.choice(data.magazine_ids),
+            },
+        },
+    ),
+    Scenario(
+        "plans",
+        "DELETE",
+        "/plans/{plan_id}",
+        lambda i, data, rng: {"path": {"plan_id": data.doomed_plan_ids[i]}},
+    ),
+    Scenario(
+        "subscriptions",
+        "GET",
+        "/subscriptions/",
+        lambda i, data, rng: {"params": {"limit": 50}, "headers": _auth(data)},
+    ),
+    Scenario(
+        "subscriptions",
+        "GET",
+        "/subscriptions/{subscription_id}",
+        lambda i, data, rng: {
+            "path": {"subscription_id": rng.choice(data.subscription_ids)}
+        },
+    ),
+    Scenario(
+        "subscriptions",
+        "POST",
+        "/subscriptions/",
+        lambda i, data, rng: {
+            "json": {
+                "user_id": data.user_id,
+                "magazine_id": data.free_combos[i][0],
+                "plan_id": data.free_combos[i][1],
+                "renewal_date": "2030-01-01",
+            },
+            "headers": _auth(data),
+        },
+    ),
+    Scenario(
+        "subscriptions",
+        "PUT",
+        "/subscriptions/{subscription_id}",
+        lambda i, data, rng: {
+            "path": {"subscription_id": _owned(i, data, rng)["id"]},
+            "json": _owned(i, data, rng)["body"],
+            "headers": _auth(data),
+        },
+    ),
+    Scenario(
+        "subscriptions",
+        "DELETE",
+        "/subscriptions/{subscription_id}",
+        lambda i, data, rng: {
+            "path": {"subscription_id": _owned(i, data, rng)["id"]},
+            "headers": _auth(data),
+        },
+    ),
+    Scenario(
+        "subscriptions",
+        "GET",
+        "/subscriptions/export",
+        lambda i, data, rng: {
+            "params": {"user_id": data.user_id},
+            "headers": _auth(data),
+        },
+    ),
+    Scenario(
+        "subscriptions",
+        "POST",
+        "/subscriptions/import",
+        lambda i, data, rng: {
+            "content": _import(i, data),
+            "headers": {**_auth(data), "Content-Type": "application/x-ndjson"},
+        },
+        sqlite_concurrency=1,
+    ),
+    Scenario(
+        "subscriptions",
+        "POST",
+        "/subscriptions/reprice",
+        lambda i, data, rng: {
+            "json": {"magazine_id": rng.choice(data.magazine_ids)},
+            "headers": _auth(data),
+        },
+    ),
+]
+
+ROUTERS: Dict[str, List[Scenario]] = {}
+for _scenario in SCENARIOS:
+    ROUTERS.setdefault(_scenario.router, []).append(_scenario)
@@ -0,0 +1,124 @@
+"""Memory and throughput of the streaming subscription export.
+
+Run from ``src/``::
+
+    python -m benchmarks.export --sizes 10000 100000 1000000
+
+For each table size it streams ``GET /subscriptions/export`` and reports the
+rows per second and the peak Python heap (tracemalloc) while streaming. The
+peak should stay flat as the table grows.
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+import httpx
+from sqlalchemy import text
+
+from benchmarks._harness import ServerThread, cleanup_bench_database, use_bench_database
+
+SEQUENCE = {
+    "sqlite": """
+        WITH RECURSIVE seq(i) AS (
+            SELECT :start UNION ALL SELECT i + 1 FROM seq WHERE i < :stop
+        )
+        SELECT i FROM seq
+    """,
+    "postgresql": "SELECT i FROM generate_series(:start, :stop) AS i",
+}
+
+
+def seed(engine, user_id: int, magazine_id: int, start: int, stop: int):
+    """One plan and one subscription to it per row number in [start, stop]."""
+    sequence = SEQUENCE[engine.dialect.name]
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO plans (title, description, renewal_period, tier, discount)"
+                f" SELECT 'Export ' || i, 'bench', 1, 1, 0.1 FROM ({sequence}) AS seq"
+            ),
+            {"start": start, "stop": stop},
+        )
+        connection.execute(
+            text(
+                "INSERT INTO subscriptions"
+                " (user_id, magazine_id, plan_id, price, renewal_date, is_active)"
+                " SELECT :user_id, :magazine_id, id, 9, :renewal_date, :active"
+                " FROM plans WHERE title LIKE 'Export %' AND id NOT IN"
+                " (SELECT plan_id FROM subscriptions WHERE user_id = :user_id)"
+            ),
+            {
+                "user_id": user_id,
+                "magazine_id": magazine_id,
+                "renewal_date": "2030-01-01 00:00:00.000000",
+                "active": True,
+            },
+        )
+
+
+def measure(client, params, headers) -> dict:
+    tracemalloc.start()
+    started = time.perf_counter()
+    received = 0
+    with client.stream(
+        "GET", "/subscriptions/export", params=params, headers=headers
+    ) as response:
+        for chunk in response.iter_bytes():
+            received += len(chunk)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "seconds": round(elapsed, 3),
+        "body_mb": round(received / 2**20, 1),
+        "peak_heap_mb": round(peak / 2**20, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    args = parser.parse_args()
+
+    use_bench_database()
+    from app.db.session import engine
+    from app.main import app
+
+    results = []
+    try:
+        with ServerThread(app) as server, httpx.Client(
+            base_url=server.base_url, timeout=600
+        ) as client:
+            credentials = {"username": "exporter", "password": "benchpassword"}
+            user_id = client.post(
+                "/users/register",
+                json={**credentials, "email": "exporter@example.com"},
+            ).json()["id"]
+            token = client.post("/token/", data=credentials).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            magazine_id = client.post(
+                "/magazines/",
+                json={"name": "Exported", "description": "bench", "base_price": 10},
+            ).json()["id"]
+
+            seeded = 0
+            for size in sorted(args.sizes):
+                seed(engine, user_id, magazine_id, seeded + 1, size)
+                seeded = size
+                row = {
+                    "rows": size,
+                    **measure(client, {"format": args.format}, headers),
+                }
+                row["rows_per_sec"] = round(size / row["seconds"], 1)
+                results.append(row)
+                print(json.dumps(row), flush=True)
+    finally:
+        cleanup_bench_database()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
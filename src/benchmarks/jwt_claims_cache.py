@@ -0,0 +1,57 @@
+"""Cold vs warm JWT verification throughput on a single core.
+
+Run from ``src/``::
+
+    python -m benchmarks.jwt_claims_cache --seconds 2
+"""
+
+import argparse
+import json
+import time
+
+from app.core.jwt import claims_cache, create_access_token, decode_token
+
+
+def measure(fn, seconds: float) -> float:
+    ops = 0
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            fn()
+        ops += 100
+    return ops / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    token = create_access_token({"sub": "benchmark-user"})
+
+    def cold():
+        claims_cache.clear()
+        decode_token(token)
+
+    def warm():
+        decode_token(token)
+
+    cold_ops = measure(cold, args.seconds)
+    decode_token(token)
+    warm_ops = measure(warm, args.seconds)
+    print(
+        json.dumps(
+            {
+                "cold_ops_per_sec": round(cold_ops),
+                "warm_ops_per_sec": round(warm_ops),
+                "speedup": round(warm_ops / cold_ops, 1),
+                "cache": claims_cache.stats(),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
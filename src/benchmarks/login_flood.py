@@ -0,0 +1,119 @@
+"""p99 latency of an unrelated endpoint while /token/ is flooded with logins.
+
+Run from ``src/``::
+
+    python -m benchmarks.login_flood --logins 200 --concurrency 50
+
+Compare against the old inline behaviour with ``PASSWORD_HASH_WORKERS=0``.
+The login throttles are lifted unless configured, so every login is hashed;
+the run fails if any of them was answered with a 429.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import httpx
+
+from benchmarks._harness import (
+    ServerThread,
+    cleanup_bench_database,
+    summarize,
+    use_bench_database,
+)
+
+
+async def probe(client, path, stop, interval, samples):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get(path)
+        samples.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+
+
+async def flood(client, username, password, logins, concurrency, statuses):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            response = await client.post(
+                "/token/", data={"username": username, "password": password}
+            )
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    await asyncio.gather(*(login() for _ in range(logins)))
+
+
+async def run(base_url, args):
+    username, password = f"bench{int(time.time())}", "benchpassword"
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        await client.post(
+            "/users/register",
+            json={
+                "username": username,
+                "email": f"{username}@example.com",
+                "password": password,
+            },
+        )
+
+        idle = []
+        stop = asyncio.Event()
+        task = asyncio.create_task(probe(client, args.probe_path, stop, 0.01, idle))
+        await asyncio.sleep(args.warmup)
+        stop.set()
+        await task
+
+        loaded, statuses = [], {}
+        stop = asyncio.Event()
+        task = asyncio.create_task(probe(client, args.probe_path, stop, 0.01, loaded))
+        started = time.perf_counter()
+        await flood(client, username, password, args.logins, args.concurrency, statuses)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await task
+
+    return {
+        "probe_path": args.probe_path,
+        "logins": args.logins,
+        "concurrency": args.concurrency,
+        "login_statuses": statuses,
+        "logins_per_sec": round(args.logins / elapsed, 1),
+        "probe_idle": summarize(idle),
+        "probe_under_flood": summarize(loaded),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--probe-path", default="/magazines/")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    args = parser.parse_args()
+
+    use_bench_database()
+    # The flood is one account from one address; the login limits would
+    # answer most of it with 429s before any hashing.
+    for limit in (
+        "LOGIN_IP_PER_MINUTE",
+        "LOGIN_IP_BURST",
+        "LOGIN_ACCOUNT_PER_MINUTE",
+        "LOGIN_ACCOUNT_BURST",
+    ):
+        os.environ.setdefault(limit, "1000000")
+    from app.main import app
+
+    try:
+        with ServerThread(app) as server:
+            result = asyncio.run(run(server.base_url, args))
+    finally:
+        cleanup_bench_database()
+    print(json.dumps(result, indent=2))
+    if result["login_statuses"].get(429):
+        raise SystemExit("Logins were throttled; the flood did not measure hashing")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Per-page latency of keyset pagination as the plans table grows.
+
+Run from ``src/``::
+
+    python -m benchmarks.pagination --sizes 10000 100000 1000000 10000000
+
+For each table size it times the first page, a page from the middle and the
+last page. Keyset pages should stay flat; the OFFSET column is shown for
+contrast. Seeding 10M rows takes a few minutes on SQLite.
+"""
+
+import argparse
+import json
+import time
+
+from sqlalchemy import text
+
+from benchmarks._harness import cleanup_bench_database, use_bench_database
+
+SEED = {
+    "sqlite": """
+        INSERT INTO plans (title, description, renewal_period, tier, discount)
+        WITH RECURSIVE seq(i) AS (
+            SELECT 1 UNION ALL SELECT i + 1 FROM seq WHERE i < :count
+        )
+        SELECT 'Plan ' || i, 'benchmark', 1, 1, 0.0 FROM seq
+    """,
+    "postgresql": """
+        INSERT INTO plans (title, description, renewal_period, tier, discount)
+        SELECT 'Plan ' || i, 'benchmark', 1, 1, 0.0
+        FROM generate_series(1, :count) AS i
+    """,
+}
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return round(samples[len(samples) // 2] * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    use_bench_database()
+    from app import crud, models
+    from app.db.session import SessionLocal, engine
+    from app.main import app  # noqa: F401  creates the tables
+
+    seed = SEED[engine.dialect.name]
+    results = []
+    try:
+        with SessionLocal() as db:
+            for size in sorted(args.sizes):
+                current = db.query(models.Plan).count()
+                if size > current:
+                    db.execute(text(seed), {"count": size - current})
+                    db.commit()
+                ids = db.execute(text("SELECT min(id), max(id) FROM plans")).one()
+                positions = {
+                    "first": None,
+                    "middle": (ids[0] + ids[1]) // 2,
+                    "last": ids[1] - args.limit,
+                }
+                row = {"rows": size}
+                for name, after_id in positions.items():
+                    row[f"keyset_{name}_ms"] = timed(
+                        lambda: crud.get_plans(db, after_id, args.limit + 1),
+                        args.repeat,
+                    )
+                offset = size - args.limit
+                row["offset_last_ms"] = timed(
+                    lambda: db.query(models.Plan)
+                    .order_by(models.Plan.id)
+                    .offset(offset)
+                    .limit(args.limit)
+                    .all(),
+                    args.repeat,
+                )
+                results.append(row)
+                print(json.dumps(row), flush=True)
+    finally:
+        cleanup_bench_database()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Password hashes/sec per core for each scheme and cost setting.
+
+Run from ``src/``::
+
+    python -m benchmarks.password_hashing --bcrypt-rounds 10 11 12 13 --argon2 2:19456:1 3:65536:4
+
+Each ``--argon2`` setting is ``time_cost:memory_cost_kib:parallelism``. Login
+capacity is roughly the per-core rate times ``password_hash_workers``. Schemes
+whose backend is not installed (argon2 needs argon2-cffi) are skipped.
+"""
+
+import argparse
+import json
+import time
+
+from passlib.exc import MissingBackendError
+
+from app.core.config import settings
+from app.core.hashing import build_context
+
+
+def hashes_per_second(context, seconds: float) -> float:
+    ops = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds or ops < 3:
+        context.hash("benchmark-password")
+        ops += 1
+    return ops / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument(
+        "--bcrypt-rounds", type=int, nargs="*", default=[settings.bcrypt_rounds]
+    )
+    parser.add_argument(
+        "--argon2",
+        nargs="*",
+        default=[
+            f"{settings.argon2_time_cost}:{settings.argon2_memory_cost}"
+            f":{settings.argon2_parallelism}"
+        ],
+    )
+    args = parser.parse_args()
+
+    candidates = [
+        ({"scheme": "bcrypt", "rounds": rounds}, dict(bcrypt_rounds=rounds))
+        for rounds in args.bcrypt_rounds
+    ]
+    for setting in args.argon2:
+        time_cost, memory_cost, parallelism = (int(part) for part in setting.split(":"))
+        candidates.append(
+            (
+                {
+                    "scheme": "argon2id",
+                    "time_cost": time_cost,
+                    "memory_cost_kib": memory_cost,
+                    "parallelism": parallelism,
+                },
+                dict(
+                    argon2_time_cost=time_cost,
+                    argon2_memory_cost=memory_cost,
+                    argon2_parallelism=parallelism,
+                ),
+            )
+        )
+
+    results = []
+    for label, costs in candidates:
+        options = dict(
+            bcrypt_rounds=settings.bcrypt_rounds,
+            argon2_time_cost=settings.argon2_time_cost,
+            argon2_memory_cost=settings.argon2_memory_cost,
+            argon2_parallelism=settings.argon2_parallelism,
+        )
+        options.update(costs)
+        scheme = "argon2" if label["scheme"] == "argon2id" else "bcrypt"
+        context = build_context([scheme], **options)
+        try:
+            rate = hashes_per_second(context, args.seconds)
+        except MissingBackendError:
+            continue
+        results.append(
+            {
+                **label,
+                "hashes_per_sec_per_core": round(rate, 1),
+                "ms_per_hash": round(1000 / rate, 1),
+                "logins_per_sec_with_pool": round(
+                    rate * max(settings.password_hash_workers, 1), 1
+                ),
+            }
+        )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Response serialization cost: FastAPI's validating path vs ``fast_json``.
+
+Run from ``src/``::
+
+    python -m benchmarks.serialization --sizes 1 100 10000
+
+For lists of ORM subscriptions and of magazines with their plans, it times
+what FastAPI does with a ``response_model`` (validate from attributes, then
+dump JSON) against the ``FastJSONRoute`` path (read loaded state, orjson).
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import List
+
+from benchmarks._harness import use_bench_database
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return round(samples[len(samples) // 2] * 1_000_000, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    use_bench_database()
+    from pydantic import TypeAdapter
+
+    from app import models, schemas
+    from app.core.responses import _dumps, encoder
+
+    def subscriptions(count):
+        return [
+            models.Subscription(
+                id=i,
+                user_id=i,
+                magazine_id=i,
+                plan_id=i,
+                price=9.5,
+                renewal_date=datetime(2030, 1, 1),
+                is_active=True,
+            )
+            for i in range(count)
+        ]
+
+    def magazines(count):
+        return [
+            models.Magazine(
+                id=i,
+                name=f"Magazine {i}",
+                description="bench",
+                base_price=10.0,
+                plans=[
+                    models.Plan(
+                        id=i * 3 + tier,
+                        title=f"Plan {tier}",
+                        description="bench",
+                        renewal_period=tier,
+                        tier=tier,
+                        discount=0.1 * tier,
+                        magazine_id=i,
+                    )
+                    for tier in range(3)
+                ],
+            )
+            for i in range(count)
+        ]
+
+    cases = {
+        "subscriptions": (List[schemas.Subscription], subscriptions),
+        "magazines": (List[schemas.Magazine], magazines),
+    }
+    results = {}
+    for name, (annotation, build) in cases.items():
+        adapter = TypeAdapter(annotation)
+        encode = encoder(annotation)
+        for size in args.sizes:
+            items = build(size)
+            assert json.loads(_dumps(encode(items))) == json.loads(
+                adapter.dump_json(adapter.validate_python(items, from_attributes=True))
+            )
+            validating = timed(
+                lambda: adapter.dump_json(
+                    adapter.validate_python(items, from_attributes=True)
+                ),
+                args.repeat,
+            )
+            fast = timed(lambda: _dumps(encode(items)), args.repeat)
+            results[f"{name}[{size}]"] = {
+                "validating_us": validating,
+                "fast_json_us": fast,
+                "speedup": round(validating / fast, 1),
+            }
+            print(json.dumps({f"{name}[{size}]": results[f"{name}[{size}]"]}))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
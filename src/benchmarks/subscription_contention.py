@@ -0,0 +1,134 @@
+"""Subscription creation throughput and duplicates under contention.
+
+Run from ``src/``::
+
+    python -m benchmarks.subscription_contention --combos 50 --repeat 8 --concurrency 64
+
+Every (magazine, plan) combination is posted ``--repeat`` times concurrently
+by the same user. Exactly one post per combination should succeed and the
+rest should get 422, leaving no duplicate rows behind.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import httpx
+from sqlalchemy import text
+
+from benchmarks._harness import (
+    ServerThread,
+    cleanup_bench_database,
+    summarize,
+    use_bench_database,
+)
+
+
+async def run(base_url, args):
+    username, password = f"contention{int(time.time())}", "benchpassword"
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        response = await client.post(
+            "/users/register",
+            json={
+                "username": username,
+                "email": f"{username}@example.com",
+                "password": password,
+            },
+        )
+        user_id = response.json()["id"]
+        response = await client.post(
+            "/token/", data={"username": username, "password": password}
+        )
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        magazine = (
+            await client.post(
+                "/magazines/",
+                json={"name": "Contended", "description": "bench", "base_price": 10},
+            )
+        ).json()
+        plans = [
+            (
+                await client.post(
+                    "/plans/",
+                    json={
+                        "title": f"Contended {i}",
+                        "description": "bench",
+                        "renewal_period": 1,
+                        "tier": 1,
+                        "discount": 0.1,
+                    },
+                )
+            ).json()
+            for i in range(args.combos)
+        ]
+
+        posts = [plan["id"] for plan in plans for _ in range(args.repeat)]
+        random.shuffle(posts)
+        semaphore = asyncio.Semaphore(args.concurrency)
+        samples, statuses = [], {}
+
+        async def subscribe(plan_id):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(
+                    "/subscriptions/",
+                    json={
+                        "user_id": user_id,
+                        "magazine_id": magazine["id"],
+                        "plan_id": plan_id,
+                        "renewal_date": "2030-01-01",
+                    },
+                    headers=headers,
+                )
+                samples.append(time.perf_counter() - started)
+                statuses[response.status_code] = (
+                    statuses.get(response.status_code, 0) + 1
+                )
+
+        started = time.perf_counter()
+        await asyncio.gather(*(subscribe(plan_id) for plan_id in posts))
+        elapsed = time.perf_counter() - started
+    return user_id, {
+        "posts": len(posts),
+        "statuses": statuses,
+        "posts_per_sec": round(len(posts) / elapsed, 1),
+        "latency": summarize(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--combos", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    use_bench_database()
+    from app.db.session import engine
+    from app.main import app
+
+    try:
+        with ServerThread(app) as server:
+            user_id, result = asyncio.run(run(server.base_url, args))
+        with engine.connect() as connection:
+            result["rows"] = connection.execute(
+                text("SELECT count(*) FROM subscriptions WHERE user_id = :user_id"),
+                {"user_id": user_id},
+            ).scalar()
+            result["duplicates"] = connection.execute(
+                text(
+                    "SELECT count(*) FROM (SELECT 1 FROM subscriptions"
+                    " GROUP BY user_id, magazine_id, plan_id HAVING count(*) > 1)"
+                    " AS duplicated"
+                )
+            ).scalar()
+    finally:
+        cleanup_bench_database()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
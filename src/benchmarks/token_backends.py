@@ -0,0 +1,59 @@
+"""Encode/decode ops/sec for each JWT backend and algorithm on one core.
+
+Run from ``src/``::
+
+    python -m benchmarks.token_backends --seconds 1
+
+Backends or algorithms whose libraries are not installed are skipped.
+"""
+
+import argparse
+import json
+
+from app.core.jwt import ASYMMETRIC_ALGORITHMS, BACKENDS, TokenService
+from app.core.keys import generate_private_key
+from benchmarks.jwt_claims_cache import measure
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    results = []
+    for algorithm in ("HS256", "ES256", "EdDSA"):
+        try:
+            if algorithm in ASYMMETRIC_ALGORITHMS:
+                material = generate_private_key(algorithm)
+            else:
+                material = "benchmark-secret-" * 3
+        except ImportError:
+            continue
+        for name, backend_class in BACKENDS.items():
+            if algorithm not in backend_class.algorithms:
+                continue
+            try:
+                service = TokenService(algorithm, material, backend=backend_class())
+            except ImportError:
+                continue
+            token = service.create_access_token({"sub": "benchmark-user"})
+            results.append(
+                {
+                    "backend": name,
+                    "algorithm": algorithm,
+                    "encode_ops_per_sec": round(
+                        measure(
+                            lambda: service.create_access_token({"sub": "u"}),
+                            args.seconds,
+                        )
+                    ),
+                    "decode_ops_per_sec": round(
+                        measure(lambda: service.decode(token), args.seconds)
+                    ),
+                }
+            )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
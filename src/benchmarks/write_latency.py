@@ -0,0 +1,146 @@
+"""Latency and commits per request of the write endpoints.
+
+Run from ``src/``::
+
+    python -m benchmarks.write_latency --requests 300
+
+Each flow is requested ``--requests`` times, one request at a time, against
+the app under uvicorn. Commits are counted on the engine: on a durable
+database each one is a WAL flush (an fsync), so commits per request is the
+number to keep at one.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+from sqlalchemy import event
+
+from benchmarks._harness import (
+    ServerThread,
+    cleanup_bench_database,
+    summarize,
+    use_bench_database,
+)
+
+
+async def run(base_url, args, commits):
+    username, password = f"writer{int(time.time())}", "benchpassword"
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        user_id = (
+            await client.post(
+                "/users/register",
+                json={
+                    "username": username,
+                    "email": f"{username}@example.com",
+                    "password": password,
+                },
+            )
+        ).json()["id"]
+        login = (
+            await client.post(
+                "/users/login", json={"username": username, "password": password}
+            )
+        ).json()
+        headers = {"Authorization": f"Bearer {login['access_token']}"}
+        refresh_token = login["refresh_token"]
+        magazine = (
+            await client.post(
+                "/magazines/",
+                json={"name": "Written", "description": "bench", "base_price": 10},
+            )
+        ).json()
+        plans = [
+            (
+                await client.post(
+                    "/plans/",
+                    json={
+                        "title": f"Written {i}",
+                        "description": "bench",
+                        "renewal_period": 1,
+                        "tier": 1,
+                        "discount": 0.1,
+                    },
+                )
+            ).json()
+            for i in range(args.requests)
+        ]
+
+        async def subscribe(i):
+            return await client.post(
+                "/subscriptions/",
+                json={
+                    "user_id": user_id,
+                    "magazine_id": magazine["id"],
+                    "plan_id": plans[i]["id"],
+                    "renewal_date": "2030-01-01",
+                },
+                headers=headers,
+            )
+
+        async def update_magazine(i):
+            # Every update changes the price, so its subscriptions reprice.
+            return await client.put(
+                f"/magazines/{magazine['id']}",
+                json={"name": "Written", "description": "bench", "base_price": 10 + i},
+            )
+
+        async def refresh(i):
+            nonlocal refresh_token
+            response = await client.post(
+                "/users/token/refresh",
+                headers={"Authorization": f"Bearer {refresh_token}"},
+            )
+            refresh_token = response.json()["refresh_token"]
+            return response
+
+        flows = {
+            "create_subscription": subscribe,
+            "update_magazine": update_magazine,
+            "refresh_token": refresh,
+        }
+        results = {}
+        for name, request in flows.items():
+            samples, committed = [], commits[0]
+            for i in range(args.requests):
+                started = time.perf_counter()
+                response = await request(i)
+                samples.append(time.perf_counter() - started)
+                assert response.status_code == 200, response.text
+            results[name] = {
+                "commits_per_request": round(
+                    (commits[0] - committed) / args.requests, 2
+                ),
+                "latency": summarize(samples),
+            }
+            print(json.dumps({name: results[name]}), flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    use_bench_database()
+    from app.db.session import engine
+    from app.main import app
+
+    commits = [0]
+
+    @event.listens_for(engine, "commit")
+    def count_commit(connection):
+        commits[0] += 1
+
+    try:
+        with ServerThread(app) as server:
+            results = asyncio.run(run(server.base_url, args, commits))
+    finally:
+        cleanup_bench_database()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Throughput and statement count of the crud write paths.
+
+Run from ``src/``::
+
+    python -m benchmarks.writes --count 2000
+
+Each write runs ``--count`` times, every one in its own session as a request
+would, and reports writes per second plus SQL statements per write.
+``create_user`` is left out: password hashing would dominate it.
+
+``--path orm`` measures the baseline the crud writes replaced: add or load the
+object, commit, then refresh it. ``--path returning`` measures crud as it is,
+one INSERT/UPDATE ... RETURNING committed by the unit of work. The default
+runs both, for a before/after comparison on the same database.
+"""
+
+import argparse
+import json
+import time
+
+from sqlalchemy import event
+
+from benchmarks._harness import cleanup_bench_database, use_bench_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--path", choices=["orm", "returning", "both"], default="both")
+    args = parser.parse_args()
+
+    use_bench_database()
+    from app import crud, models, schemas
+    from app.db.session import SessionLocal, engine
+    from app.main import app  # noqa: F401  creates the tables
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a, **kw: statements.append(1))
+
+    def magazine(i):
+        return schemas.MagazineCreate(
+            name=f"Written {i}", description="bench", base_price=10
+        )
+
+    def plan(i):
+        return schemas.PlanCreate(
+            title=f"Written {i}",
+            description="bench",
+            renewal_period=1,
+            tier=1,
+            discount=0.1,
+        )
+
+    def orm_create(db, model, values):
+        instance = model(**values)
+        db.add(instance)
+        db.commit()
+        db.refresh(instance)
+        return instance
+
+    def orm_update(db, model, id, values):
+        instance = db.query(model).filter(model.id == id).first()
+        for field, value in values.items():
+            setattr(instance, field, value)
+        db.commit()
+        db.refresh(instance)
+        return instance
+
+    paths = {
+        "orm": {
+            "create_magazine": lambda db, i: orm_create(
+                db, models.Magazine, magazine(i).model_dump()
+            ),
+            "update_magazine": lambda db, i: orm_update(
+                db, models.Magazine, i % 100 + 1, magazine(i).model_dump()
+            ),
+            "create_plan": lambda db, i: orm_create(
+                db, models.Plan, plan(i).model_dump()
+            ),
+            "update_plan": lambda db, i: orm_update(
+                db, models.Plan, i % 100 + 1, plan(i).model_dump()
+            ),
+        },
+        "returning": {
+            "create_magazine": lambda db, i: crud.create_magazine(db, magazine(i)),
+            "update_magazine": lambda db, i: crud.update_magazine(
+                db, i % 100 + 1, schemas.MagazineUpdate(**magazine(i).model_dump())
+            ),
+            "create_plan": lambda db, i: crud.create_plan(db, plan(i)),
+            "update_plan": lambda db, i: crud.update_plan(
+                db, i % 100 + 1, schemas.PlanUpdate(**plan(i).model_dump())
+            ),
+        },
+    }
+    response_schemas = {
+        "create_magazine": schemas.Magazine,
+        "update_magazine": schemas.Magazine,
+        "create_plan": schemas.Plan,
+        "update_plan": schemas.Plan,
+    }
+    selected = ["orm", "returning"] if args.path == "both" else [args.path]
+    results = {}
+    try:
+        for path in selected:
+            results[path] = {}
+            for name, write in paths[path].items():
+                schema = response_schemas[name]
+                statements.clear()
+                started = time.perf_counter()
+                for i in range(args.count):
+                    with SessionLocal() as db:
+                        # Serialize as the router would, loading what it
+                        # reads, then commit as the request's unit of work
+                        # does (a no-op after the baseline's own commit).
+                        schema.model_validate(write(db, i), from_attributes=True)
+                        db.commit()
+                elapsed = time.perf_counter() - started
+                results[path][name] = {
+                    "writes_per_sec": round(args.count / elapsed, 1),
+                    "statements_per_write": round(len(statements) / args.count, 2),
+                }
+                print(json.dumps({path: {name: results[path][name]}}), flush=True)
+    finally:
+        cleanup_bench_database()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -16,11 +16,12 @@ SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Dependency override for the test database
+# Dependency override for the test database, one unit of work per request
 def override_get_db():
     try:
         db = TestingSessionLocal()
         yield db
+        db.commit()
     finally:
         db.close()
 
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.core.pagination import encode_cursor
+from app.db.session import async_database_url, create_db_engine, get_db
+from app.main import app
+from .conftest import SQLALCHEMY_DATABASE_URL
+from .utils import create_user, login_user, create_plan, create_magazine
+
+
+@pytest.fixture
+def async_db():
+    engine = create_db_engine(async_database_url(SQLALCHEMY_DATABASE_URL), asynchronous=True, poolclass=NullPool)
+    AsyncSessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+            await db.commit()
+
+    previous = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = get_async_db
+    yield
+    if previous is None:
+        del app.dependency_overrides[get_db]
+    else:
+        app.dependency_overrides[get_db] = previous
+
+
+def test_async_database_url():
+    assert async_database_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+    assert (
+        async_database_url("postgresql+psycopg2://app_user:app_password@db/app")
+        == "postgresql+asyncpg://app_user:app_password@db/app"
+    )
+
+
+def test_routers_on_async_session(client, async_db, unique_username, unique_email):
+    user = create_user(client, unique_username, unique_email, "asyncpassword")
+    username = user["username"]
+    token = login_user(client, username, "asyncpassword")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    magazine = create_magazine(client, headers, "async")
+    plan = create_plan(client, headers)
+    cursor = encode_cursor(magazine["id"] - 1)
+    response = client.get("/magazines/", params={"cursor": cursor, "limit": 1}, headers=headers)
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    assert [item["id"] for item in response.json()] == [magazine["id"]]
+
+    response = client.post("/subscriptions/", json={
+        "user_id": user["user_id"],
+        "magazine_id": magazine["id"],
+        "plan_id": plan["id"],
+        "renewal_date": "2024-12-31",
+    }, headers=headers)
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    subscription_id = response.json()["id"]
+
+    response = client.get("/subscriptions/export", params={"user_id": user["user_id"]}, headers=headers)
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == [subscription_id]
+
+    response = client.get("/users/me", headers=headers)
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    assert response.json()["username"] == username
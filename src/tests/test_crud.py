@@ -0,0 +1,65 @@
+from sqlalchemy import event
+
+from .conftest import engine
+from .utils import count_statements, create_magazine, create_plan, create_user, login_user
+
+
+def test_write_statement_counts(client, unique_username, unique_email, monkeypatch):
+    from app.core.config import settings
+
+    # Repricing is counted inline, as part of the update's request
+    monkeypatch.setattr(settings, "reprice_in_background", False)
+    user = create_user(client, unique_username, unique_email, "writepassword")
+    headers = {"Authorization": f"Bearer {login_user(client, user['username'], 'writepassword')}"}
+    client.get("/users/me", headers=headers)
+    magazine = create_magazine(client, headers, "writes", base_price=20)
+    plan = create_plan(client, headers, title="Writes", discount=0.5)
+    subscription = client.post("/subscriptions/", json={
+        "user_id": user["user_id"], "magazine_id": magazine["id"], "plan_id": plan["id"], "renewal_date": "2030-01-01",
+    }, headers=headers).json()
+
+    magazine_body = {"name": "Writes", "description": "writes", "base_price": 30}
+    plan_body = {"title": "Writes", "description": "writes", "renewal_period": 1, "tier": 1, "discount": 0.5}
+    writes = {
+        "register": ("post", "/users/register", {"username": f"{unique_username}w", "email": f"w{unique_email}", "password": "writepassword"}),
+        "create_magazine": ("post", "/magazines/", magazine_body),
+        "update_magazine": ("put", f"/magazines/{magazine['id']}", magazine_body),
+        "create_plan": ("post", "/plans/", plan_body),
+        "update_plan": ("put", f"/plans/{plan['id']}", plan_body),
+        "update_subscription": ("put", f"/subscriptions/{subscription['id']}", {
+            "user_id": user["user_id"], "magazine_id": magazine["id"], "plan_id": plan["id"], "renewal_date": "2031-01-01",
+        }),
+        "deactivate_subscription": ("delete", f"/subscriptions/{subscription['id']}", None),
+    }
+    counts = {}
+    commits = []
+
+    def count_commit(connection):
+        commits.append(connection)
+
+    event.listen(engine, "commit", count_commit)
+    try:
+        for name, (method, path, body) in writes.items():
+            commits.clear()
+            with count_statements(engine) as statements:
+                response = client.request(method, path, json=body, headers=headers)
+            assert response.status_code == 200, f"{name}: Response status code: {response.status_code}, Response body: {response.text}"
+            counts[name] = [statement.split()[0] for statement in statements.statements]
+            # One transaction per request, repricing included
+            assert len(commits) == 1, f"{name} committed {len(commits)} times"
+    finally:
+        event.remove(engine, "commit", count_commit)
+    # One RETURNING statement per write. Updates to pricing inputs first read
+    # the value they replace, and reprice only if it changed: a batch bound,
+    # the deltas, the price UPDATE, and the bound that ends the walk.
+    assert counts == {
+        "register": ["INSERT"],
+        "create_magazine": ["INSERT"],
+        # The magazine response embeds its plans, loaded by one SELECT
+        "update_magazine": ["SELECT", "UPDATE", "SELECT", "SELECT", "SELECT", "UPDATE", "SELECT"],
+        "create_plan": ["INSERT"],
+        # The discount is unchanged, so nothing is repriced
+        "update_plan": ["SELECT", "UPDATE"],
+        "update_subscription": ["UPDATE"],
+        "deactivate_subscription": ["UPDATE"],
+    }
@@ -0,0 +1,178 @@
+import io
+import os
+import re
+from datetime import datetime
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateIndex
+
+from app import crud, models, schemas
+from app.db.base import Base
+from app.services.renewals import renew_batch
+from .utils import count_statements
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), "..")
+# A throwaway PostgreSQL database: the migration test drops its public schema.
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+# Created by Base.metadata.create_all before the project had migrations.
+PRE_MIGRATION_INDEXES = {
+    "ix_users_id",
+    "ix_users_username",
+    "ix_users_email",
+    "ix_magazines_id",
+    "ix_magazines_name",
+    "ix_plans_id",
+    "ix_subscriptions_id",
+}
+# The revision the index migrations (d41c9e7f2b08 onwards) start from.
+BEFORE_INDEX_MIGRATIONS = "b7d2e4f19a63"
+
+
+def alembic_config(url=None, output_buffer=None):
+    config = Config(os.path.join(SRC_DIR, "alembic.ini"), output_buffer=output_buffer)
+    config.set_main_option("script_location", os.path.join(SRC_DIR, "alembic"))
+    if url:
+        config.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    return config
+
+
+def normalize(sql):
+    return re.sub(r"\s+", " ", sql).replace(" CONCURRENTLY", "").strip()
+
+
+def hot_queries(db):
+    """Seed enough rows for the planner to prefer indexes, and return the
+    hot crud paths to explain."""
+    users = [models.User(username=f"indexed{i}", email=f"indexed{i}@example.com", hashed_password="x") for i in range(200)]
+    magazines = [models.Magazine(name=f"Indexed {i}", description="seed", base_price=10) for i in range(200)]
+    db.add_all(users + magazines)
+    db.flush()
+    plans = [
+        models.Plan(title=f"Indexed {i}", description="seed", renewal_period=1, tier=1, discount=0.1, magazine_id=magazines[i % 200].id)
+        for i in range(1000)
+    ]
+    db.add_all(plans)
+    db.flush()
+    db.add_all(
+        models.Subscription(
+            user_id=user.id, magazine_id=plan.magazine_id, plan_id=plan.id, price=9, renewal_date=datetime(2030, 1, 1), is_active=i % 3 > 0
+        )
+        for i, (user, plan) in enumerate((user, plan) for user in users for plan in plans[:10])
+    )
+    db.commit()
+    db.execute(text("ANALYZE"))
+    user, magazine, plan = users[0], magazines[0], plans[-1]
+    subscription = db.query(models.Subscription).filter(models.Subscription.user_id == user.id).first()
+    return {
+        "get_user_by_username": lambda: crud.get_user_by_username(db, user.username),
+        "get_magazines": lambda: crud.get_magazines(db, magazine.id - 1, 10, include_plans=True),
+        "get_plans": lambda: crud.get_plans(db, plan.id - 10, 10),
+        "get_subscription": lambda: crud.get_subscription(db, subscription.id),
+        "get_subscriptions_by_user": lambda: crud.get_subscriptions_by_user(db, user.id),
+        "create_subscription": lambda: crud.create_subscription(
+            db, schemas.SubscriptionCreate(user_id=user.id, magazine_id=plan.magazine_id, plan_id=plan.id, renewal_date=datetime(2030, 1, 1))
+        ),
+        "deactivate_subscription": lambda: crud.deactivate_subscription(db, subscription.id, user.id),
+        "delete_plan": lambda: crud.delete_plan(db, plans[-2].id),
+        "renew_batch": lambda: renew_batch(db, 100, datetime(1999, 1, 1)),
+    }
+
+
+def explain_scans(connection, statement, parameters):
+    """The full table scans in ``statement``'s plan."""
+    if connection.dialect.name == "postgresql":
+        # Tables this small are cheaper to scan; take an index when there is one.
+        connection.exec_driver_sql("SET enable_seqscan = off")
+        rows = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters).all()
+        return [row[0].strip() for row in rows if re.search(r"Seq Scan on \w+", row[0])]
+    # "SCAN t" reads the whole table; an index scan names the index
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [row[-1] for row in rows if re.match(r"SCAN \w+( AS \w+)?$", row[-1])]
+
+
+def sequential_scans(bind, db):
+    scans = {}
+    for name, query in hot_queries(db).items():
+        db.expire_all()
+        with count_statements(bind) as statements:
+            query()
+        for statement, parameters in zip(statements.statements, statements.parameters):
+            if not statement.lstrip().upper().startswith(("SELECT", "INSERT", "UPDATE", "DELETE")):
+                continue
+            with bind.connect() as connection:
+                for scan in explain_scans(connection, statement, parameters):
+                    scans.setdefault(name, []).append(f"{scan} in {statement}")
+    return scans
+
+
+def test_hot_queries_use_indexes(tmp_path):
+    # A database of its own: the seeded rows must not leak into other tests.
+    sqlite_engine = create_engine(f"sqlite:///{tmp_path}/indexes.db")
+    Base.metadata.create_all(bind=sqlite_engine)
+    with sessionmaker(bind=sqlite_engine)() as db:
+        scans = sequential_scans(sqlite_engine, db)
+    sqlite_engine.dispose()
+    assert scans == {}, f"Sequential scans: {scans}"
+
+
+def test_migrations_create_the_model_indexes():
+    # Rendered offline as PostgreSQL DDL, so no database is needed.
+    output = io.StringIO()
+    command.upgrade(alembic_config(output_buffer=output), "head", sql=True)
+    created = {}
+    for statement in output.getvalue().split(";"):
+        statement = normalize(statement)
+        if match := re.match(r"CREATE (UNIQUE )?INDEX (\w+) ", statement):
+            created[match[2]] = statement
+        elif match := re.match(r"DROP INDEX (\w+)", statement):
+            created.pop(match[1], None)
+
+    declared = {
+        index.name: normalize(str(CreateIndex(index).compile(dialect=postgresql.dialect())))
+        for table in Base.metadata.sorted_tables
+        for index in table.indexes
+        if index.name not in PRE_MIGRATION_INDEXES
+    }
+    assert created == declared
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="set TEST_POSTGRES_URL to a throwaway PostgreSQL database")
+def test_postgres_migrations_and_plans():
+    pg_engine = create_engine(POSTGRES_URL)
+    with pg_engine.begin() as connection:
+        connection.execute(text("DROP SCHEMA public CASCADE"))
+        connection.execute(text("CREATE SCHEMA public"))
+    # The base tables predate the migrations: build them, then run the index
+    # migrations down and up again as a deploy would.
+    Base.metadata.create_all(bind=pg_engine)
+    config = alembic_config(POSTGRES_URL)
+    command.stamp(config, "head")
+    command.downgrade(config, BEFORE_INDEX_MIGRATIONS)
+    command.upgrade(config, "head")
+
+    def where(clause):
+        return re.sub(r"[()\s]", "", str(clause)) if clause is not None else None
+
+    inspector = inspect(pg_engine)
+    built = {
+        index["name"]: (tuple(index["column_names"]), index["unique"], where(index.get("dialect_options", {}).get("postgresql_where")))
+        for table in Base.metadata.sorted_tables
+        for index in inspector.get_indexes(table.name)
+        if not index.get("duplicates_constraint")
+    }
+    declared = {
+        index.name: (tuple(column.name for column in index.columns), bool(index.unique), where(index.dialect_options["postgresql"]["where"]))
+        for table in Base.metadata.sorted_tables
+        for index in table.indexes
+    }
+    assert built == declared
+
+    with sessionmaker(bind=pg_engine)() as db:
+        scans = sequential_scans(pg_engine, db)
+    pg_engine.dispose()
+    assert scans == {}, f"Sequential scans: {scans}"
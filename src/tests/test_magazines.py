@@ -57,3 +57,78 @@ def test_delete_magazine(client, unique_username, unique_email):
     # Verify magazine is deleted
     response = client.get(f"/magazines/{magazine['id']}", headers=headers)
     assert response.status_code == 404, f"Response status code: {response.status_code}, Response body: {response.text}"
+
+    # Deleting it again finds nothing to delete
+    response = client.delete(f"/magazines/{magazine['id']}", headers=headers)
+    assert response.status_code == 404, f"Response status code: {response.status_code}, Response body: {response.text}"
+    assert response.json()["detail"] == "Magazine not found"
+
+def test_magazine_list_statement_count_is_constant(client):
+    from app.core.pagination import encode_cursor
+    from .conftest import engine
+    from .utils import count_statements
+
+    magazines = [create_magazine(client, {}, f"eager {i}") for i in range(12)]
+    for magazine in magazines[:3]:
+        create_plan(client, {}, title=f"Plan for {magazine['id']}", magazine_id=magazine["id"])
+    cursor = encode_cursor(magazines[0]["id"] - 1)
+
+    counts = {}
+    for limit in (2, 12):
+        for include in (None, "plans"):
+            with count_statements(engine) as statements:
+                response = client.get("/magazines/", params={"cursor": cursor, "limit": limit, "include": include})
+            assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+            counts[limit, include] = len(statements)
+            body = response.json()
+            assert len(body) == limit
+            if include:
+                assert [plan["title"] for plan in body[0]["plans"]] == [f"Plan for {magazines[0]['id']}"]
+            else:
+                assert "plans" not in body[0]
+
+    # One query for the page, plus one for all of its plans when asked for
+    assert counts[2, None] == counts[12, None]
+    assert counts[2, "plans"] == counts[12, "plans"] == counts[2, None] + 1
+
+    # A single magazine is a summary too unless its plans are asked for
+    assert "plans" not in client.get(f"/magazines/{magazines[0]['id']}").json()
+    response = client.get(f"/magazines/{magazines[0]['id']}", params={"include": "plans"})
+    assert [plan["title"] for plan in response.json()["plans"]] == [f"Plan for {magazines[0]['id']}"]
+
+def test_magazine_list_etag(client):
+    from .conftest import engine
+    from .utils import count_statements
+
+    magazine = create_magazine(client, {}, "etag")
+    params = {"limit": 500}
+    response = client.get("/magazines/", params=params)
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    etag = response.headers["ETag"]
+
+    # A matching conditional request is answered from the cache alone
+    with count_statements(engine) as statements:
+        response = client.get("/magazines/", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert len(statements) == 0
+    with count_statements(engine) as statements:
+        response = client.get("/magazines/", params=params)
+    assert response.status_code == 200 and len(statements) == 0
+
+    # Writes invalidate the cached page, so the next read sees the change
+    updated = {"name": "Renamed etag", "description": magazine["description"], "base_price": 30.0}
+    client.put(f"/magazines/{magazine['id']}", json=updated)
+    response = client.get("/magazines/", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    assert response.headers["ETag"] != etag
+    assert "Renamed etag" in [item["name"] for item in response.json()]
+
+    # Plans embedded in magazine pages are invalidated by plan writes
+    params = {"limit": 500, "include": "plans"}
+    etag = client.get("/magazines/", params=params).headers["ETag"]
+    create_plan(client, {}, title="Plan for etag", magazine_id=magazine["id"])
+    response = client.get("/magazines/", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    plans = next(item["plans"] for item in response.json() if item["id"] == magazine["id"])
+    assert [plan["title"] for plan in plans] == ["Plan for etag"]
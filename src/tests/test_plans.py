@@ -106,3 +106,23 @@ def test_create_plan_with_zero_renewal_period(client, unique_username, unique_em
         "discount": 0.1
     }, headers=headers)
     assert response.status_code == 422, f"Response status code: {response.status_code}, Response body: {response.text}"
+
+def test_plans_keyset_pagination(client):
+    from app.core.pagination import encode_cursor
+    from .utils import create_plan
+
+    plans = [create_plan(client, {}, title=f"Page {i}") for i in range(3)]
+    cursor = encode_cursor(plans[0]["id"] - 1)
+
+    response = client.get("/plans/", params={"cursor": cursor, "limit": 2})
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    assert [plan["id"] for plan in response.json()] == [plan["id"] for plan in plans[:2]]
+
+    response = client.get("/plans/", params={"cursor": response.headers["x-next-cursor"], "limit": 2})
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    assert response.json()[0]["id"] == plans[2]["id"]
+
+    response = client.get("/plans/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400, f"Response status code: {response.status_code}, Response body: {response.text}"
+    response = client.get("/plans/", params={"limit": 100_000})
+    assert response.status_code == 422, f"Response status code: {response.status_code}, Response body: {response.text}"
@@ -0,0 +1,28 @@
+from sqlalchemy import text
+
+from app.db.session import create_db_engine, pool_metrics
+from .utils import create_user, login_user
+
+
+def test_pool_metrics(client, unique_username, unique_email):
+    client.get("/plans/")
+    response = client.get("/metrics/")
+    assert response.status_code == 401, f"Response status code: {response.status_code}, Response body: {response.text}"
+
+    username = create_user(client, unique_username, unique_email, "metricspassword")["username"]
+    token = login_user(client, username, "metricspassword")
+    response = client.get("/metrics/", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    metrics = response.json()
+    assert {"principal_cache", "password_hasher", "login_limiter"} <= metrics.keys()
+
+
+def test_instrumented_pool_records_waits(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/pool.db")
+    with engine.connect() as connection:
+        connection.execute(text("select 1"))
+        assert pool_metrics(engine)["checked_out"] == 1
+    metrics = pool_metrics(engine)
+    assert metrics["checked_out"] == 0
+    assert metrics["checkouts"] == 1
+    assert metrics["wait_max_ms"] >= 0
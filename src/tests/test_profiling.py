@@ -0,0 +1,54 @@
+import json
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.profiling import ProfilingMiddleware, profile_token
+
+
+def test_profiling_middleware(tmp_path):
+    busy_app = FastAPI()
+
+    @busy_app.get("/busy")
+    def busy():
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+        return {"ok": True}
+
+    def profiles():
+        return sorted(path.name for path in tmp_path.glob("*.speedscope.json"))
+
+    client = TestClient(ProfilingMiddleware(busy_app, secret="s3cret", interval=0.001, directory=str(tmp_path)))
+    for token in [None, "bogus", profile_token("other"), profile_token("s3cret", ttl=-10)]:
+        response = client.get("/busy", headers={"X-Profile": token} if token else {})
+        assert response.status_code == 200
+        assert "X-Profile" not in response.headers
+    assert profiles() == []
+
+    response = client.get("/busy", headers={"X-Profile": profile_token("s3cret")})
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile"]
+    # Written by the sampler thread once the response is sent
+    for _ in range(100):
+        if profiles():
+            break
+        time.sleep(0.05)
+    assert profiles() == [f"{profile_id}.speedscope.json"]
+    profile = json.loads((tmp_path / f"{profile_id}.speedscope.json").read_text())
+    assert profile["name"] == "GET /busy"
+    frames = profile["shared"]["frames"]
+    sampled = [
+        frames[index]["name"]
+        for thread in profile["profiles"]
+        for stack in thread["samples"]
+        for index in stack
+    ]
+    assert "busy" in sampled
+    for thread in profile["profiles"]:
+        assert thread["type"] == "sampled"
+        assert len(thread["samples"]) == len(thread["weights"])
+
+    sampled_client = TestClient(ProfilingMiddleware(busy_app, sample_rate=1.0, directory=str(tmp_path)))
+    assert "X-Profile" in sampled_client.get("/busy").headers
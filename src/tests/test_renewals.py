@@ -0,0 +1,80 @@
+import threading
+from datetime import datetime
+
+from app import models
+from app.services.renewals import add_months, run
+from .conftest import TestingSessionLocal
+
+
+def seed(db, name, combinations, renewal_date, renewal_period=1, discount=0.5):
+    """A user subscribed to ``combinations`` magazine/plan pairs, all due at ``renewal_date``."""
+    user = models.User(username=f"renewals_{name}", email=f"renewals_{name}@example.com", hashed_password="x")
+    magazines = [models.Magazine(name=f"Renewals {name} {i}", description="renewals", base_price=20) for i in range(combinations[0])]
+    plans = [
+        models.Plan(title=f"Renewals {name} {i}", description="renewals", renewal_period=renewal_period, tier=1, discount=discount)
+        for i in range(combinations[1])
+    ]
+    db.add_all([user, *magazines, *plans])
+    db.flush()
+    subscriptions = [
+        models.Subscription(user_id=user.id, magazine_id=magazine.id, plan_id=plan.id, price=1.0, renewal_date=renewal_date)
+        for magazine in magazines
+        for plan in plans
+    ]
+    db.add_all(subscriptions)
+    db.commit()
+    return [subscription.id for subscription in subscriptions]
+
+
+def renewal_dates(ids):
+    with TestingSessionLocal() as db:
+        rows = db.query(models.Subscription).filter(models.Subscription.id.in_(ids)).order_by(models.Subscription.id)
+        return [(row.renewal_date, row.price) for row in rows]
+
+
+def test_add_months():
+    assert add_months(datetime(2001, 1, 31, 9, 30), 1) == datetime(2001, 2, 28, 9, 30)
+    assert add_months(datetime(2003, 11, 30), 3) == datetime(2004, 2, 29)
+    assert add_months(datetime(2001, 5, 15), 12) == datetime(2002, 5, 15)
+
+
+def test_renewal_worker():
+    with TestingSessionLocal() as db:
+        monthly = seed(db, "monthly", (1, 1), datetime(2001, 1, 31))
+        annual = seed(db, "annual", (1, 1), datetime(2001, 2, 1), renewal_period=12, discount=0.25)
+        later = seed(db, "later", (1, 1), datetime(2001, 3, 1))
+        inactive = seed(db, "inactive", (1, 1), datetime(2001, 1, 1))
+        db.query(models.Subscription).filter(models.Subscription.id.in_(inactive)).update({"is_active": False})
+        db.commit()
+
+    reports = []
+    stats = run(TestingSessionLocal, batch_size=1, once=True, now=lambda: datetime(2001, 2, 15), report=reports.append)
+
+    assert renewal_dates(monthly) == [(datetime(2001, 2, 28), 10.0)]
+    assert renewal_dates(annual) == [(datetime(2002, 2, 1), 15.0)]
+    assert renewal_dates(later) == [(datetime(2001, 3, 1), 1.0)]
+    assert renewal_dates(inactive) == [(datetime(2001, 1, 1), 1.0)]
+    snapshot = stats.snapshot()
+    assert (snapshot["batches"], snapshot["renewed"], snapshot["skipped"]) == (2, 2, 0)
+    # The oldest due subscription was 15 days overdue when first claimed
+    assert reports[0]["lag_seconds"] == 15 * 24 * 3600
+    assert snapshot["max_lag_seconds"] == 15 * 24 * 3600
+
+
+def test_concurrent_workers_renew_each_subscription_once():
+    with TestingSessionLocal() as db:
+        ids = seed(db, "concurrent", (20, 10), datetime(2000, 6, 10))
+
+    results = []
+
+    def worker():
+        results.append(run(TestingSessionLocal, batch_size=25, once=True, now=lambda: datetime(2000, 6, 20)))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(stats.renewed for stats in results) == len(ids)
+    assert set(renewal_dates(ids)) == {(datetime(2000, 7, 10), 10.0)}
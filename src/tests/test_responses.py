@@ -0,0 +1,80 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional
+
+from fastapi import APIRouter, FastAPI, Response
+from fastapi.testclient import TestClient
+
+from app import models, schemas
+from app.core.config import settings
+from app.core.responses import FastJSONRoute, encoder
+from .conftest import TestingSessionLocal
+
+
+def test_fast_json_route(monkeypatch):
+    with TestingSessionLocal() as db:
+        magazine = models.Magazine(name="Fast JSON", description="fast", base_price=12)
+        magazine.plans = [models.Plan(title="Fast", description="fast", renewal_period=1, tier=1, discount=0.2)]
+        db.add(magazine)
+        db.commit()
+        db.refresh(magazine)
+        db.refresh(magazine.plans[0])
+        db.expunge_all()
+
+    def routes(router):
+        @router.get("/magazine", response_model=schemas.Magazine)
+        def read_magazine():
+            return magazine
+
+        @router.get("/summaries", response_model=List[schemas.MagazineSummary])
+        async def read_summaries(response: Response):
+            response.headers["X-Total"] = "1"
+            return [magazine]
+
+        @router.post("/subscription", response_model=Optional[schemas.Subscription], status_code=201)
+        def create_subscription():
+            return {"id": 1, "user_id": 2, "magazine_id": magazine.id, "plan_id": 3, "price": 9,
+                    "renewal_date": datetime(2030, 1, 1, 12, 30), "is_active": True}
+
+        @router.get("/raw", response_model=schemas.MagazineSummary)
+        def read_raw():
+            return Response("raw", media_type="text/plain")
+
+        return router
+
+    def build():
+        app = FastAPI()
+        app.include_router(routes(APIRouter(route_class=FastJSONRoute)))
+        return TestClient(app)
+
+    validating = build()
+    monkeypatch.setattr(settings, "fast_json", True)
+    fast = build()
+
+    for method, path in [("get", "/magazine"), ("get", "/summaries"), ("post", "/subscription"), ("get", "/raw")]:
+        expected = validating.request(method, path)
+        response = fast.request(method, path)
+        assert response.status_code == expected.status_code, f"Response status code: {response.status_code}, Response body: {response.text}"
+        assert response.headers["content-type"] == expected.headers["content-type"]
+        assert response.headers.get("x-total") == expected.headers.get("x-total")
+        if path == "/raw":
+            assert response.text == "raw"
+        else:
+            # Byte for byte: an integer price must still be sent as 9.0
+            assert response.content == expected.content
+    assert fast.get("/magazine").json()["plans"][0]["title"] == "Fast"
+    assert "plans" not in fast.get("/summaries").json()[0]
+    assert fast.get("/summaries").headers["x-total"] == "1"
+
+    # The response models still document the routes
+    assert fast.get("/openapi.json").json() == validating.get("/openapi.json").json()
+
+    # Defaults fill fields the object does not carry; unknown types pass through
+    assert encoder(schemas.Magazine)({"id": 1, "name": "n", "description": "d", "base_price": 1.0}) == {
+        "name": "n", "description": "d", "base_price": 1.0, "id": 1, "plans": []
+    }
+    assert encoder(Optional[List[int]])(None) is None
+
+    # Declared float and Decimal fields are coerced as validation would
+    assert encoder(Optional[float])(5) == 5.0 and isinstance(encoder(Optional[float])(5), float)
+    assert encoder(Decimal)(1.5) == encoder(Decimal)(Decimal("1.5")) == "1.5"
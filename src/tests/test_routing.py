@@ -0,0 +1,85 @@
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db import session
+from app.db.base import Base
+from app.db.routing import CLIENT, READ_ONLY, ReplicaRouter, RoutingSession
+
+
+def test_replica_routing(client, tmp_path, monkeypatch):
+    # Two files stand in for a primary and its replica; the replica's copy of
+    # the row is named differently so reads show which database served them.
+    primary = create_engine(f"sqlite:///{tmp_path}/primary.db", connect_args={"check_same_thread": False})
+    replica = create_engine(f"sqlite:///{tmp_path}/replica.db", connect_args={"check_same_thread": False})
+    for engine, name in [(replica, "replica"), (primary, "primary")]:
+        Base.metadata.create_all(bind=engine)
+        with sessionmaker(bind=engine)() as db:
+            db.add(models.Magazine(id=1, name=name, description="routing", base_price=10))
+            db.commit()
+
+    lag = [1.0]
+
+    def probe(engine):
+        if lag[0] is None:
+            raise OSError("replica down")
+        return lag[0]
+
+    router = ReplicaRouter(primary, replica, max_lag=5, check_interval=0, probe=probe)
+    RoutingSessionLocal = sessionmaker(autoflush=False, bind=primary, class_=RoutingSession, router=router)
+
+    def read(read_only=True, client="alice"):
+        with RoutingSessionLocal() as db:
+            db.info[READ_ONLY] = read_only
+            db.info[CLIENT] = client
+            return db.get(models.Magazine, 1).name
+
+    # Committing a transaction that only read is not a write
+    with RoutingSessionLocal() as db:
+        db.info[CLIENT] = "alice"
+        db.get(models.Magazine, 1)
+        db.commit()
+    assert read() == "replica"
+
+    # A write committed within the replica's lag is read back from the primary
+    # by the client that wrote it; other clients keep reading the replica
+    with RoutingSessionLocal() as db:
+        db.info[CLIENT] = "alice"
+        db.get(models.Magazine, 1).description = "written"
+        db.commit()
+    with RoutingSessionLocal() as db:
+        db.info[CLIENT] = "carol"
+        db.execute(update(models.Magazine).where(models.Magazine.id == 1).values(base_price=11))
+        db.commit()
+    assert read() == "primary"
+    assert read(client="carol") == "primary"
+    assert read(client="bob") == "replica"
+    lag[0] = 0.0
+    assert read() == "replica"
+    assert read(read_only=False) == "primary"
+    lag[0] = 30.0
+    assert read() == "primary"
+    lag[0] = None
+    assert read() == "primary"
+    assert router.stats() == {"lag_seconds": None, "replica_reads": 3, "primary_reads": 4, "probe_errors": 1}
+
+    # A read-only session that writes reads its own writes from the primary
+    lag[0] = 0.0
+    with RoutingSessionLocal() as db:
+        db.info[READ_ONLY] = True
+        db.add(models.Magazine(id=2, name="added", description="routing", base_price=10))
+        db.flush()
+        assert db.get(models.Magazine, 2, populate_existing=True).name == "added"
+        db.rollback()
+
+    # get_db routes GET requests to the replica and writes to the primary
+    monkeypatch.setattr(session, "SessionLocal", RoutingSessionLocal)
+    monkeypatch.setitem(client.app.dependency_overrides, session.get_db, session.get_sync_db)
+    response = client.get("/magazines/1")
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    assert response.json()["name"] == "replica"
+    response = client.put("/magazines/1", json={"name": "primary", "description": "updated", "base_price": 10})
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    for engine, description in [(primary, "updated"), (replica, "routing")]:
+        with sessionmaker(bind=engine)() as db:
+            assert db.get(models.Magazine, 1).description == description
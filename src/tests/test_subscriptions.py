@@ -337,3 +337,259 @@ def test_unique_subscription_constraint(client, unique_username, unique_email):
     # Assert that the second subscription creation attempt fails
     assert response.status_code == 422, f"Response status code: {response.status_code}, Response body: {response.text}"
     assert "already exists" in response.text, "Expected error message for duplicate subscription not found"
+
+
+def test_unique_subscription_constraint_on_update(client, unique_username, unique_email):
+    username, _, user_id = create_user(client, unique_username, unique_email, "adminpassword").values()
+    token = login_user(client, username, "adminpassword")
+    headers = {"Authorization": f"Bearer {token}"}
+    plans = [create_plan(client, headers, title=generate_random_plan_name()) for _ in range(2)]
+    magazine = create_magazine(client, headers, "unique_sub_update")
+    ids = []
+    for plan in plans:
+        response = client.post("/subscriptions/", json={
+            "user_id": user_id,
+            "magazine_id": magazine["id"],
+            "plan_id": plan["id"],
+            "renewal_date": "2024-12-31"
+        }, headers=headers)
+        assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+        ids.append(response.json()["id"])
+
+    # Moving the second subscription onto the first one's plan is a duplicate
+    response = client.put(f"/subscriptions/{ids[1]}", json={
+        "user_id": user_id,
+        "magazine_id": magazine["id"],
+        "plan_id": plans[0]["id"],
+        "renewal_date": "2025-12-31"
+    }, headers=headers)
+    assert response.status_code == 422, f"Response status code: {response.status_code}, Response body: {response.text}"
+    assert "already exists" in response.text, "Expected error message for duplicate subscription not found"
+    assert client.get(f"/subscriptions/{ids[1]}", headers=headers).json()["plan_id"] == plans[1]["id"]
+
+    # Updating a subscription in place is not a duplicate of itself
+    response = client.put(f"/subscriptions/{ids[0]}", json={
+        "user_id": user_id,
+        "magazine_id": magazine["id"],
+        "plan_id": plans[0]["id"],
+        "renewal_date": "2025-12-31"
+    }, headers=headers)
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+
+
+def test_create_subscription_is_one_statement(client, unique_username, unique_email):
+    from .conftest import engine
+    from .utils import count_statements
+
+    username, _, user_id = create_user(client, unique_username, unique_email, "adminpassword").values()
+    token = login_user(client, username, "adminpassword")
+    headers = {"Authorization": f"Bearer {token}"}
+    plan = create_plan(client, headers, title=generate_random_plan_name(), discount=0.5)
+    magazine = create_magazine(client, headers, "single_statement", base_price=10)
+    client.get("/users/me", headers=headers)
+
+    with count_statements(engine) as statements:
+        response = client.post("/subscriptions/", json={
+            "user_id": user_id,
+            "magazine_id": magazine["id"],
+            "plan_id": plan["id"],
+            "renewal_date": "2024-12-31"
+        }, headers=headers)
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    assert response.json()["price"] == 5.0
+    assert len(statements) == 1, statements.statements
+
+
+def test_bulk_import_subscriptions(client, unique_username, unique_email, monkeypatch):
+    import csv
+    from app.core.config import settings
+
+    username, _, user_id = create_user(client, unique_username, unique_email, "adminpassword").values()
+    token = login_user(client, username, "adminpassword")
+    headers = {"Authorization": f"Bearer {token}"}
+    magazine = create_magazine(client, headers, "bulk_import", base_price=20)
+    plans = [create_plan(client, headers, title=generate_random_plan_name(), discount=0.5) for _ in range(3)]
+    free_plan = create_plan(client, headers, title=generate_random_plan_name(), discount=1.0)
+
+    rows = [
+        f"{user_id},{magazine['id']},{plans[0]['id']},2030-01-01",
+        f"{user_id},{magazine['id']},{plans[1]['id']},2030-01-01",
+        f"{user_id},{magazine['id']},{plans[0]['id']},2030-01-01",
+        f"{user_id},{magazine['id']},999999999,2030-01-01",
+        f"{user_id},{magazine['id']},{free_plan['id']},2030-01-01",
+        f"{user_id},{magazine['id']},{plans[2]['id']},not-a-date",
+    ]
+    body = "user_id,magazine_id,plan_id,renewal_date\n" + "\n".join(rows) + "\n"
+    response = client.post("/subscriptions/import", content=body, headers={**headers, "Content-Type": "text/csv"})
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    result = response.json()
+    assert (result["received"], result["inserted"], result["rejected"]) == (6, 2, 4)
+    assert [(error["row"], error["error"]) for error in result["errors"][:3]] == [
+        (3, "Subscription already exists"),
+        (4, "Magazine or Plan not found"),
+        (5, "Price must be greater than zero"),
+    ]
+    assert result["errors"][3]["row"] == 6 and "renewal_date" in result["errors"][3]["error"]
+
+    # Rows already imported are refused on a second pass
+    body = "\n".join(
+        f'{{"user_id": {user_id}, "magazine_id": {magazine["id"]}, "plan_id": {plan["id"]}, "renewal_date": "2030-01-01"}}'
+        for plan in plans
+    )
+    response = client.post("/subscriptions/import", content=body, headers={**headers, "Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    assert (response.json()["inserted"], response.json()["rejected"]) == (1, 2)
+
+    # A quoted CSV field may span lines; the record still counts as one row
+    plan = create_plan(client, headers, title=generate_random_plan_name(), discount=0.5)
+    body = (
+        "user_id,magazine_id,plan_id,renewal_date,note\n"
+        f'{user_id},{magazine["id"]},{plan["id"]},2030-01-01,"first line\nsecond ""quoted"" line"\n'
+    )
+    response = client.post("/subscriptions/import", content=body, headers={**headers, "Content-Type": "text/csv"})
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    assert (response.json()["received"], response.json()["inserted"]) == (1, 1)
+
+    # A row that never ends is refused rather than buffered
+    body = "user_id,magazine_id,plan_id,renewal_date\n" + "1" * (settings.import_max_row_bytes + 1)
+    response = client.post("/subscriptions/import", content=body, headers={**headers, "Content-Type": "text/csv"})
+    assert response.status_code == 413, f"Response status code: {response.status_code}, Response body: {response.text}"
+
+    # So is a complete row over the limit, even when it arrives in one piece
+    body = "user_id,magazine_id,plan_id,renewal_date\n" + "1" * (4 * settings.import_max_row_bytes) + "\n"
+    response = client.post("/subscriptions/import", content=body, headers={**headers, "Content-Type": "text/csv"})
+    assert response.status_code == 413, f"Response status code: {response.status_code}, Response body: {response.text}"
+
+    # Rows that are not UTF-8, or that the CSV reader refuses (a field over
+    # its size limit), are rejected one by one
+    monkeypatch.setattr(settings, "import_max_row_bytes", 4 * csv.field_size_limit())
+    body = (
+        b"user_id,magazine_id,plan_id,renewal_date\n"
+        b"\xff\xfe,1,1,2030-01-01\n"
+        + b"1" * (2 * csv.field_size_limit()) + b",1,1,2030-01-01\n"
+    )
+    response = client.post("/subscriptions/import", content=body, headers={**headers, "Content-Type": "text/csv"})
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    assert (response.json()["received"], response.json()["rejected"]) == (2, 2)
+    assert [error["row"] for error in response.json()["errors"]] == [1, 2]
+
+
+def test_reprice_subscriptions(client, unique_username, unique_email, monkeypatch):
+    from app import models
+    from app.core.config import settings
+    from app.services import repricing
+    from app.services.repricing import reprice
+    from .conftest import TestingSessionLocal
+
+    username, _, user_id = create_user(client, unique_username, unique_email, "adminpassword").values()
+    token = login_user(client, username, "adminpassword")
+    headers = {"Authorization": f"Bearer {token}"}
+    magazine = create_magazine(client, headers, "reprice", base_price=20)
+    plans = [create_plan(client, headers, title=generate_random_plan_name(), discount=discount) for discount in (0.5, 0.25)]
+    ids = []
+    for plan in plans:
+        response = client.post(
+            "/subscriptions/",
+            json={"user_id": user_id, "magazine_id": magazine["id"], "plan_id": plan["id"], "renewal_date": "2030-01-01"},
+            headers=headers,
+        )
+        ids.append(response.json()["id"])
+
+    def prices():
+        return [client.get(f"/subscriptions/{subscription_id}", headers=headers).json()["price"] for subscription_id in ids]
+
+    # Updating a magazine's price reprices its subscriptions
+    updated = {"name": magazine["name"], "description": magazine["description"], "base_price": 40.0}
+    response = client.put(f"/magazines/{magazine['id']}", json=updated, headers=headers)
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    assert prices() == [20.0, 30.0]
+
+    # A price changed behind the API's back is reported by a dry run, not written
+    with TestingSessionLocal() as db:
+        db.query(models.Magazine).filter(models.Magazine.id == magazine["id"]).update({"base_price": 60.0})
+        db.commit()
+    response = client.post("/subscriptions/reprice", json={"magazine_id": magazine["id"], "dry_run": True}, headers=headers)
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    assert response.json() == {"dry_run": True, "batches": 1, "repriced": 2, "total_delta": 25.0, "min_delta": 10.0, "max_delta": 15.0}
+    assert prices() == [20.0, 30.0]
+
+    # Applied in batches of one subscription each
+    with TestingSessionLocal() as db:
+        result = reprice(db, magazine_id=magazine["id"], batch_size=1)
+    assert (result.batches, result.repriced, result.total_delta) == (2, 2, 25.0)
+    assert prices() == [30.0, 45.0]
+
+    # Renaming leaves prices alone, even ones that are out of date
+    with TestingSessionLocal() as db:
+        db.query(models.Magazine).filter(models.Magazine.id == magazine["id"]).update({"base_price": 70.0})
+        db.commit()
+    renamed = {**updated, "name": f"{magazine['name']} renamed", "base_price": 70.0}
+    response = client.put(f"/magazines/{magazine['id']}", json=renamed, headers=headers)
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    assert prices() == [30.0, 45.0]
+
+    # In the background, on a session of its own once the response is sent.
+    # Requests run on sync test sessions, so the background one is sync too.
+    monkeypatch.setattr(settings, "reprice_in_background", True)
+    monkeypatch.setattr(settings, "database_async", False)
+    monkeypatch.setattr(repricing, "SessionLocal", TestingSessionLocal)
+    updated["base_price"] = 80.0
+    response = client.put(f"/magazines/{magazine['id']}", json=updated, headers=headers)
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    assert prices() == [40.0, 60.0]
+
+    response = client.post("/subscriptions/reprice", json={}, headers=headers)
+    assert response.status_code == 422, f"Response status code: {response.status_code}, Response body: {response.text}"
+
+
+def test_export_subscriptions(client, unique_username, unique_email, monkeypatch):
+    import csv
+    import io
+    import json
+    from . import conftest
+
+    username, _, user_id = create_user(client, unique_username, unique_email, "adminpassword").values()
+    token = login_user(client, username, "adminpassword")
+    headers = {"Authorization": f"Bearer {token}"}
+    magazine = create_magazine(client, headers, "export", base_price=20)
+    ids = []
+    for renewal_date in ("2031-01-01", "2031-02-01", "2031-03-01"):
+        plan = create_plan(client, headers, title=generate_random_plan_name(), discount=0.5)
+        response = client.post(
+            "/subscriptions/",
+            json={"user_id": user_id, "magazine_id": magazine["id"], "plan_id": plan["id"], "renewal_date": renewal_date},
+            headers=headers,
+        )
+        ids.append(response.json()["id"])
+    client.delete(f"/subscriptions/{ids[2]}", headers=headers)
+
+    # Authentication and the stream share one session
+    sessions = []
+    session_factory = conftest.TestingSessionLocal
+
+    def open_session():
+        sessions.append(session_factory())
+        return sessions[-1]
+
+    monkeypatch.setattr(conftest, "TestingSessionLocal", open_session)
+    params = {"user_id": user_id, "magazine_id": magazine["id"]}
+    response = client.get("/subscriptions/export", params=params, headers=headers)
+    monkeypatch.undo()
+    assert len(sessions) == 1
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == ids
+    assert rows[0] == {
+        "id": ids[0], "user_id": user_id, "magazine_id": magazine["id"], "plan_id": rows[0]["plan_id"],
+        "price": 10.0, "renewal_date": "2031-01-01T00:00:00", "is_active": True,
+    }
+
+    params.update({"format": "csv", "is_active": True, "renewal_from": "2031-02-01", "renewal_to": "2031-04-01"})
+    response = client.get("/subscriptions/export", params=params, headers=headers)
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(int(row["id"]), row["renewal_date"]) for row in rows] == [(ids[1], "2031-02-01T00:00:00")]
+
+    response = client.get("/subscriptions/export", params={"format": "xml"}, headers=headers)
+    assert response.status_code == 422
@@ -0,0 +1,82 @@
+import os
+import time
+
+import pytest
+from jose import JWTError
+
+from app.core.jwt import PyJWTBackend, TokenService
+from app.core.keys import KeyRing, write_key
+
+
+def make_service(keys_dir, overlap=3600, activation_delay=0):
+    key_ring = KeyRing.from_directory(
+        str(keys_dir), "EdDSA", overlap=overlap, activation_delay=activation_delay
+    )
+    return TokenService("EdDSA", backend=PyJWTBackend(), key_ring=key_ring)
+
+
+def age_key(keys_dir, kid, seconds):
+    path = os.path.join(keys_dir, f"{kid}.pem")
+    mtime = time.time() - seconds
+    os.utime(path, (mtime, mtime))
+
+
+def test_jwks_endpoint(client):
+    response = client.get("/.well-known/jwks.json")
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    assert "max-age" in response.headers["cache-control"]
+    # The default HS256 secret must never be published
+    assert response.json() == {"keys": []}
+
+    response = client.get("/.well-known/jwks.json", headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+
+
+def test_token_verifies_locally_with_jwks(tmp_path):
+    import jwt
+
+    kid = write_key(str(tmp_path), "EdDSA")
+    service = make_service(tmp_path)
+    token = service.create_access_token({"sub": "mesh-user"})
+    assert jwt.get_unverified_header(token)["kid"] == kid
+
+    # What a gateway would do: pick the key by kid from the JWKS document
+    jwks = service.jwks()
+    jwk = next(key for key in jwks["keys"] if key["kid"] == kid)
+    claims = jwt.decode(token, jwt.PyJWK(jwk).key, algorithms=["EdDSA"])
+    assert claims["sub"] == "mesh-user"
+
+
+def test_key_rotation_overlap(tmp_path):
+    old_kid = write_key(str(tmp_path), "EdDSA")
+    age_key(tmp_path, old_kid, 7200)
+    old_token = make_service(tmp_path).create_access_token({"sub": "rotating-user"})
+
+    new_kid = write_key(str(tmp_path), "EdDSA")
+    age_key(tmp_path, new_kid, 60)
+
+    # Inside the overlap window both keys verify and the new one signs
+    service = make_service(tmp_path, overlap=3600)
+    assert {key["kid"] for key in service.jwks()["keys"]} == {old_kid, new_kid}
+    assert service.decode(old_token)["sub"] == "rotating-user"
+    new_token = service.create_access_token({"sub": "rotating-user"})
+    assert service.decode(new_token)["sub"] == "rotating-user"
+
+    # Once the overlap has passed the old key is withdrawn
+    service = make_service(tmp_path, overlap=30)
+    assert [key["kid"] for key in service.jwks()["keys"]] == [new_kid]
+    with pytest.raises(JWTError):
+        service.decode(old_token)
+
+
+def test_new_key_is_published_before_it_signs(tmp_path):
+    import jwt
+
+    old_kid = write_key(str(tmp_path), "EdDSA")
+    age_key(tmp_path, old_kid, 7200)
+    new_kid = write_key(str(tmp_path), "EdDSA")
+
+    service = make_service(tmp_path, activation_delay=600)
+    assert {key["kid"] for key in service.jwks()["keys"]} == {old_kid, new_kid}
+    token = service.create_access_token({"sub": "rotating-user"})
+    assert jwt.get_unverified_header(token)["kid"] == old_kid
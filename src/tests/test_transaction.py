@@ -0,0 +1,23 @@
+from sqlalchemy import text
+
+from app.db.transaction import after_commit
+from .conftest import TestingSessionLocal
+
+
+def test_after_commit_callbacks():
+    calls = []
+    with TestingSessionLocal() as db:
+        db.execute(text("SELECT 1"))
+        after_commit(db, lambda: calls.append("outer"))
+        with db.begin_nested():
+            after_commit(db, lambda: calls.append("savepoint"))
+        assert calls == []
+        db.commit()
+        assert calls == ["outer", "savepoint"]
+
+        db.execute(text("SELECT 1"))
+        after_commit(db, lambda: calls.append("rolled back"))
+        db.rollback()
+        db.execute(text("SELECT 1"))
+        db.commit()
+    assert calls == ["outer", "savepoint"]
@@ -1,4 +1,7 @@
 import pytest
+from app import models
+from app.core.hashing import build_context, pwd_context
+from .conftest import TestingSessionLocal
 from .utils import create_user, login_user
 from app.core.jwt import create_access_token
 from datetime import timedelta
@@ -74,3 +77,135 @@ def test_token_expiry(client, unique_username, unique_email):
     # Verify token has expired
     response = client.get("/users/me", headers=headers)
     assert response.status_code == 401, f"Response status code: {response.status_code}, Response body: {response.text}"
+
+
+def test_password_hasher_rejects_when_saturated():
+    from fastapi import HTTPException
+    from app.core.hashing import PasswordHasher
+
+    hasher = PasswordHasher(workers=0, queue_depth=0)
+    hasher._acquire()
+    try:
+        with pytest.raises(HTTPException) as exc_info:
+            hasher.hash_sync("password")
+    finally:
+        hasher._release()
+    assert exc_info.value.status_code == 503
+    assert hasher.stats()["rejected"] == 1
+    assert hasher.verify_sync("password", hasher.hash_sync("password"))
+
+
+def test_deactivated_user_is_locked_out(client, unique_username, unique_email):
+    username = create_user(client, unique_username, unique_email, "lockoutpassword")["username"]
+    token = login_user(client, username, "lockoutpassword")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # Populate the principal cache before deactivating
+    response = client.get("/users/me", headers=headers)
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+
+    response = client.delete(f"/users/deactivate/{username}", headers=headers)
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+
+    response = client.get("/users/me", headers=headers)
+    assert response.status_code == 401, f"Response status code: {response.status_code}, Response body: {response.text}"
+
+    # Nor can it log in again for fresh tokens
+    response = client.post("/users/login", json={"username": username, "password": "lockoutpassword"})
+    assert response.status_code == 401, f"Response status code: {response.status_code}, Response body: {response.text}"
+    response = client.post("/token/", data={"username": username, "password": "lockoutpassword"})
+    assert response.status_code == 400, f"Response status code: {response.status_code}, Response body: {response.text}"
+    assert response.json()["detail"] == "Incorrect username or password"
+
+
+def test_token_claims_are_utc():
+    import time
+    from app.core.jwt import token_service
+
+    token = token_service.create_access_token({"sub": "utc-user"}, expires_delta=timedelta(minutes=5))
+    claims = token_service.decode(token)
+    assert claims["sub"] == "utc-user"
+    assert abs(claims["iat"] - time.time()) < 5
+    assert claims["exp"] - claims["iat"] == 300
+
+
+def test_refresh_token_rotation(client, unique_username, unique_email):
+    username = create_user(client, unique_username, unique_email, "rotatepassword")["username"]
+    login_response = client.post("/users/login", json={
+        "username": username,
+        "password": "rotatepassword"
+    })
+    assert login_response.status_code == 200, f"Response status code: {login_response.status_code}, Response body: {login_response.text}"
+    first_refresh = login_response.json()["refresh_token"]
+
+    response = client.post("/users/token/refresh", headers={"Authorization": f"Bearer {first_refresh}"})
+    assert response.status_code == 200, f"Response status code: {response.status_code}, Response body: {response.text}"
+    second_refresh = response.json()["refresh_token"]
+    assert second_refresh != first_refresh
+
+    # Replaying a rotated token fails and revokes the whole family
+    response = client.post("/users/token/refresh", headers={"Authorization": f"Bearer {first_refresh}"})
+    assert response.status_code == 401, f"Response status code: {response.status_code}, Response body: {response.text}"
+    response = client.post("/users/token/refresh", headers={"Authorization": f"Bearer {second_refresh}"})
+    assert response.status_code == 401, f"Response status code: {response.status_code}, Response body: {response.text}"
+
+
+def test_access_token_cannot_refresh(client, unique_username, unique_email):
+    username = create_user(client, unique_username, unique_email, "accesspassword")["username"]
+    token = login_user(client, username, "accesspassword")
+    response = client.post("/users/token/refresh", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401, f"Response status code: {response.status_code}, Response body: {response.text}"
+
+
+def test_revocation_filter_syncs_incrementally():
+    from datetime import datetime
+    from app.core.revocation import RevocationFilter
+
+    revoked = [("jti-1", datetime(2026, 1, 1, 12, 0))]
+    calls = []
+
+    def load(since):
+        calls.append(since)
+        return [entry for entry in revoked if since is None or entry[1] >= since]
+
+    revocations = RevocationFilter(capacity=1000, error_rate=0.001, sync_interval=0)
+    revocations.sync(load)
+    assert revocations.might_be_revoked("jti-1")
+    assert not revocations.might_be_revoked("jti-2")
+
+    revoked.append(("jti-2", datetime(2026, 1, 1, 12, 5)))
+    revocations.maybe_sync(load)
+    assert revocations.might_be_revoked("jti-2")
+    # The first sync loads everything, later ones only what is new
+    assert calls[0] is None and calls[1] is not None
+
+
+def test_login_is_throttled_per_account(client, unique_username):
+    from app.core.ratelimit import login_limiter
+
+    _, burst = login_limiter.limits["account"]
+    rejected = login_limiter.stats()["rejected"]["account"]
+    # Unknown usernames never reach bcrypt, so this costs no hashing
+    for _ in range(burst):
+        response = client.post("/users/login", json={"username": unique_username, "password": "wrong"})
+        assert response.status_code == 401, f"Response status code: {response.status_code}, Response body: {response.text}"
+    response = client.post("/users/login", json={"username": unique_username, "password": "wrong"})
+    assert response.status_code == 429, f"Response status code: {response.status_code}, Response body: {response.text}"
+    assert int(response.headers["retry-after"]) >= 1
+    assert login_limiter.stats()["rejected"]["account"] == rejected + 1
+
+
+def test_outdated_password_hash_is_upgraded_on_login(client, unique_username, unique_email):
+    username = create_user(client, unique_username, unique_email, "rehashpassword")["username"]
+    cheap = build_context(["bcrypt"], bcrypt_rounds=4, argon2_time_cost=1, argon2_memory_cost=1024, argon2_parallelism=1)
+    with TestingSessionLocal() as db:
+        user = db.query(models.User).filter(models.User.username == username).one()
+        user.hashed_password = cheap.hash("rehashpassword")
+        db.commit()
+        assert pwd_context.needs_update(user.hashed_password)
+
+    login_user(client, username, "rehashpassword")
+    with TestingSessionLocal() as db:
+        user = db.query(models.User).filter(models.User.username == username).one()
+        assert not pwd_context.needs_update(user.hashed_password)
+        assert pwd_context.verify("rehashpassword", user.hashed_password)
@@ -1,4 +1,5 @@
 import random
+from sqlalchemy import event
 from app.schemas.user import UserCreate
 from app.schemas.magazine import MagazineCreate
 
@@ -30,10 +31,12 @@ def create_plan(
     renewal_period=1,
     discount=0.0,
     tier=1,
+    magazine_id=None,
 ):
     response = client.post(
         "/plans/",
         json={
+            "magazine_id": magazine_id,
             "title": title,
             "description": description,
             "renewal_period": renewal_period,
@@ -70,3 +73,26 @@ def generate_random_plan_name():
     random_words = ["Silver", "Gold", "Platinum", "Diamond", "Titanium"]
     random_suffix = random.randint(1000, 9999)
     return f"{random.choice(random_words)} Plan {random_suffix}"
+
+
+class count_statements:
+    """Counts SQL statements sent through ``engine`` inside the block."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+        self.parameters = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+        self.parameters.append(parameters)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+    def __len__(self):
+        return len(self.statements)